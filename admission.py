@@ -0,0 +1,272 @@
+# --- START OF FILE admission.py ---
+"""
+무거운 연산(필터/메이크업/가상 피팅/동영상) 입장 제어 - 동시 실행 작업 수 상한 + 세션별 공정 대기열 + 과부하 시 빠른 실패/미리보기 해상도
+
+버튼이 눌릴 때마다 바로 연산을 시작하면 모두가 함께 느려지므로, 작업마다 (메가픽셀 × 연산 종류) 로 비용(예상 초)을 추정해
+- 동시에 MAX_ACTIVE_JOBS 개까지만 실행하고 나머지는 대기열에 넣음
+- 대기열은 세션마다 따로 두고 세션을 돌아가며 하나씩 입장 (한 세션이 여러 작업을 몰아 넣어도 다른 세션이 밀리지 않음)
+- 대기 중인 작업의 예상 비용 합이 MAX_BACKLOG_SECONDS 를 넘으면 정책에 따라
+  "reject": AdmissionRejected 로 즉시 실패, "degrade": 미리보기 해상도(PREVIEW_MAX_SIDE)로 줄인 작업으로 입장
+- 추정 비용은 실제 소요 시간으로 보정 (지수 이동 평균), 대기 위치와 예상 대기 시간은 on_wait 콜백으로 전달
+
+환경 변수:
+    AI_STYLER_MAX_JOBS=N           동시에 실행할 무거운 작업 수 (기본: 코어 예산 / 연산당 스레드 수)
+    AI_STYLER_MAX_BACKLOG=S        대기열 예상 비용 상한 (초, 기본 30)
+    AI_STYLER_OVERLOAD=degrade     상한 초과 시 정책: degrade(미리보기 해상도) 또는 reject(즉시 실패)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from PIL import Image
+
+import metrics
+from compute_budget import CORE_BUDGET, THREADS_PER_CALL
+
+# --- ⚙️ 입장 제어 설정 ---
+MAX_ACTIVE_JOBS = max(1, int(os.environ.get("AI_STYLER_MAX_JOBS", CORE_BUDGET // THREADS_PER_CALL)))
+MAX_BACKLOG_SECONDS = float(os.environ.get("AI_STYLER_MAX_BACKLOG", 30.0))
+OVERLOAD_POLICY = os.environ.get("AI_STYLER_OVERLOAD", "degrade").lower() # "degrade" 또는 "reject"
+PREVIEW_MAX_SIDE = 1024       # degrade 정책에서 처리할 이미지의 긴 변 (px)
+WAIT_POLL_INTERVAL = 0.5      # 대기 중 on_wait 콜백 호출 간격 (초)
+
+# 단계별 예상 비용 (초) = 고정 비용 + 메가픽셀당 비용 - 실제 소요 시간으로 보정되므로 상대 비율이 중요
+STAGE_BASE_COST = {"filter": 0.02, "makeup": 0.08, "makeup_transfer": 0.15, "tryon": 0.03}
+STAGE_COST_PER_MP = {"filter": 0.03, "makeup": 0.04, "makeup_transfer": 0.06, "tryon": 0.02}
+CALIBRATION_ALPHA = 0.2       # 보정 계수 이동 평균 가중치
+VIDEO_UNKNOWN_FRAMES = 300    # 프레임 수를 알 수 없는 동영상의 비용 추정용 프레임 수
+
+
+class AdmissionRejected(Exception):
+    """대기열이 MAX_BACKLOG_SECONDS 를 넘어 reject 정책으로 작업을 받지 않은 경우"""
+
+
+def estimate_cost(stages, megapixels):
+    """단계 이름 목록과 이미지 메가픽셀로 보정 전 예상 비용(초) 계산 (알 수 없는 단계는 makeup 수준으로 간주)"""
+    return sum(
+        STAGE_BASE_COST.get(stage, STAGE_BASE_COST["makeup"]) + STAGE_COST_PER_MP.get(stage, STAGE_COST_PER_MP["makeup"]) * megapixels
+        for stage in stages
+    )
+
+
+def estimate_video_cost(frame_count, megapixels):
+    """동영상 작업의 보정 전 예상 비용(초) = 프레임 수 × 프레임당 메이크업 비용 (프레임 수를 모르면 VIDEO_UNKNOWN_FRAMES)"""
+    return (frame_count or VIDEO_UNKNOWN_FRAMES) * estimate_cost(["makeup"], megapixels)
+
+
+def image_megapixels(img_pil):
+    return img_pil.width * img_pil.height / 1_000_000
+
+
+def preview_megapixels(img_pil, max_side=PREVIEW_MAX_SIDE):
+    """preview_image() 결과의 메가픽셀 (이미지를 만들지 않고 계산, 이미 작으면 None - degrade 할 수 없음)"""
+    scale = max_side / max(img_pil.size)
+    if scale >= 1:
+        return None
+    return image_megapixels(img_pil) * scale * scale
+
+
+def preview_image(img_pil, max_side=PREVIEW_MAX_SIDE):
+    """긴 변을 max_side 로 줄인 사본 (이미 작으면 원본 그대로)"""
+    if max(img_pil.size) <= max_side:
+        return img_pil
+    preview = img_pil.copy()
+    preview.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return preview
+
+
+class _Job:
+    __slots__ = ("session_id", "cost", "admitted", "enqueued")
+
+    def __init__(self, session_id, cost):
+        self.session_id = session_id
+        self.cost = cost
+        self.admitted = False
+        self.enqueued = time.perf_counter()
+
+
+class Admission:
+    """입장 결과 - degraded 이면 호출자는 미리보기 해상도로 처리해야 함"""
+    __slots__ = ("degraded", "cost", "waited")
+
+    def __init__(self, degraded, cost, waited):
+        self.degraded = degraded
+        self.cost = cost
+        self.waited = waited
+
+
+class AdmissionController:
+    """무거운 작업의 동시 실행 수 제한 + 세션 라운드 로빈 대기열 (프로세스 전체 공유)
+
+    비용은 estimate_cost() 의 추정치에 보정 계수(실제/추정 소요 시간의 이동 평균)를 곱한 예상 초 단위.
+    비용이 0 인 작업(모든 단계가 캐시에 있음)은 대기 없이 바로 실행.
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE_JOBS, max_backlog=MAX_BACKLOG_SECONDS, policy=OVERLOAD_POLICY):
+        if policy not in ("degrade", "reject"):
+            raise ValueError(f"Unknown overload policy: {policy}")
+        self.max_active = max(1, int(max_active))
+        self.max_backlog = max_backlog
+        self.policy = policy
+        self._cond = threading.Condition()
+        self._queues = OrderedDict() # session_id -> deque[_Job] (순서 = 다음 입장 차례)
+        self._active = 0
+        self._active_cost = 0.0
+        self._queued_cost = 0.0
+        self._scale = 1.0            # 실제/추정 소요 시간 보정 계수
+        self.stats = {"admitted": 0, "queued": 0, "peak_queued": 0, "waited": 0, "rejected": 0, "degraded": 0,
+                      "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def expected_seconds(self, cost):
+        """추정 비용을 보정된 예상 초로 변환"""
+        return cost * self._scale
+
+    def _dispatch(self):
+        """self._cond 보유 상태에서 호출 - 빈 자리만큼 세션을 돌아가며 대기열 맨 앞 작업을 입장시킴"""
+        while self._active < self.max_active and self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session_id) # 같은 세션의 다음 작업은 다른 세션들 뒤로
+            else:
+                del self._queues[session_id]
+            self._queued_cost -= job.cost
+            self.stats["queued"] -= 1
+            self._start(job)
+        if not self._queues:
+            self._queued_cost = 0.0 # 부동소수 누적 오차 제거
+        self._cond.notify_all()
+
+    def _start(self, job):
+        job.admitted = True
+        self._active += 1
+        self._active_cost += job.cost
+
+    def _ahead_of(self, job):
+        """self._cond 보유 상태에서 호출 - (대기 순번, 앞선 작업들의 비용 합) 라운드 로빈 순서 기준"""
+        sessions = list(self._queues)
+        own_index = list(self._queues[job.session_id]).index(job)
+        own_rank = sessions.index(job.session_id)
+        ahead = own_index
+        ahead_cost = sum(j.cost for j in list(self._queues[job.session_id])[:own_index])
+        for rank, session_id in enumerate(sessions):
+            if session_id == job.session_id:
+                continue
+            # 앞 순서 세션은 같은 라운드에서 먼저 입장하므로 한 작업 더
+            count = min(len(self._queues[session_id]), own_index + (1 if rank < own_rank else 0))
+            ahead += count
+            ahead_cost += sum(j.cost for j in list(self._queues[session_id])[:count])
+        return ahead + 1, ahead_cost
+
+    @contextmanager
+    def admit(self, session_id, cost, preview_cost=None, on_wait=None):
+        """with 문 안의 작업을 입장 제어 아래 실행
+
+        Args:
+            session_id: 공정 대기열 단위 (Streamlit 세션 ID)
+            cost (float): estimate_cost() 로 계산한 작업 비용
+            preview_cost (float): 미리보기 해상도로 줄였을 때의 비용 (None 이면 degrade 불가 - reject 로 처리)
+            on_wait (callable): 대기 중 주기적으로 on_wait(순번, 예상 대기 초) 호출 (Streamlit 표시 갱신용)
+
+        Yields:
+            Admission: degraded 이면 미리보기 해상도로 처리해야 함
+
+        Raises:
+            AdmissionRejected: 대기열이 상한을 넘었고 degrade 할 수 없는 경우
+        """
+        if cost <= 0:
+            yield Admission(False, 0.0, 0.0)
+            return
+
+        degraded = False
+        with self._cond:
+            busy = self._active >= self.max_active or bool(self._queues)
+            if busy and self.expected_seconds(self._queued_cost + cost) > self.max_backlog:
+                if self.policy == "reject" or preview_cost is None:
+                    self.stats["rejected"] += 1
+                    raise AdmissionRejected(
+                        f"처리 대기 중인 작업이 많습니다 (예상 대기 {self.expected_seconds(self._queued_cost):.1f}초)."
+                    )
+                degraded = True
+                cost = preview_cost
+                self.stats["degraded"] += 1
+            job = _Job(session_id, cost)
+            if not busy:
+                self._start(job)
+            else:
+                self._queues.setdefault(session_id, deque()).append(job)
+                self._queued_cost += cost
+                self.stats["queued"] += 1
+                self.stats["peak_queued"] = max(self.stats["peak_queued"], self.stats["queued"])
+
+        try:
+            while True:
+                with self._cond:
+                    if not job.admitted:
+                        self._cond.wait(WAIT_POLL_INTERVAL)
+                    if job.admitted:
+                        break
+                    position, ahead_cost = self._ahead_of(job)
+                    eta = self.expected_seconds(ahead_cost + self._active_cost / 2) / self.max_active
+                if on_wait is not None:
+                    on_wait(position, eta) # 잠금 밖에서 호출 (UI 갱신 중 예외가 나도 대기열 정리는 finally 에서)
+        except BaseException:
+            with self._cond:
+                if not job.admitted:
+                    queue = self._queues.get(session_id)
+                    queue.remove(job)
+                    if not queue:
+                        del self._queues[session_id]
+                    self._queued_cost -= job.cost
+                    self.stats["queued"] -= 1
+                    raise
+            self._finish(job, None) # 입장 직후 예외 - 자리만 반납
+            raise
+
+        waited = time.perf_counter() - job.enqueued
+        with self._cond:
+            self.stats["admitted"] += 1
+            self.stats["wait_seconds"] += waited
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+            if waited >= 0.001:
+                self.stats["waited"] += 1
+        if metrics.ENABLED:
+            metrics.record("admission.wait", waited)
+
+        started = time.perf_counter()
+        try:
+            yield Admission(degraded, cost, waited)
+        finally:
+            self._finish(job, time.perf_counter() - started)
+
+    def _finish(self, job, elapsed):
+        with self._cond:
+            self._active -= 1
+            self._active_cost -= job.cost
+            if elapsed is not None and job.cost > 0:
+                # 추정 비용 보정 (캐시 적중 등으로 아주 짧은 실행은 보정 폭을 제한)
+                ratio = min(max(elapsed / job.cost, 0.1), 10.0)
+                self._scale += CALIBRATION_ALPHA * (ratio - self._scale)
+            self._dispatch()
+
+    def snapshot(self):
+        """입장 제어 현황 사본 {active, max_active, queued_sessions, backlog_seconds, scale, policy, ...stats}"""
+        with self._cond:
+            return {
+                "active": self._active,
+                "max_active": self.max_active,
+                "queued_sessions": len(self._queues),
+                "backlog_seconds": self.expected_seconds(self._queued_cost),
+                "scale": self._scale,
+                "policy": self.policy,
+                **self.stats,
+            }
+
+
+# 프로세스 전체에서 하나만 사용 (모든 세션 공유)
+ADMISSION = AdmissionController()
+
+# --- END OF FILE admission.py ---
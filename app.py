@@ -1,29 +1,51 @@
 # --- START OF FILE app.py ---
 
+import compute_budget # 가장 먼저 - BLAS/OpenMP 스레드 수 고정 (streamlit 이 이미 numpy 를 로드했으면 threadpoolctl 로 적용)
 import streamlit as st
 import os
 from PIL import Image, UnidentifiedImageError
 import io
+import tempfile
+import threading
+import time
+import re
+import uuid
 from datetime import datetime
 from streamlit_option_menu import option_menu # 상단 메뉴 UI
-from streamlit_image_comparison import image_comparison # 이미지 비교 컴포넌트
-import openai # OpenAI 라이브러리 추가
+# openai, streamlit_image_comparison 은 실제로 필요한 화면에서 처음 임포트 (get_openai_client, image_comparison)
 
 # --- 로컬 유틸리티 및 스타일 함수 임포트 ---
-from utils import (
-    load_image, apply_makeup, apply_fashion_filter, virtual_try_on,
-    create_assets_folder, detect_face_landmarks, change_clothing_color,
-    apply_makeup_transfer # 메이크업 전송 함수 추가
+from utils import load_image, create_assets_folder, warm_up
+from pipeline import RenderPipeline # 필터/메이크업/가상 피팅 연산은 파이프라인을 통해 실행
+from admission import ( # 무거운 연산 입장 제어
+    ADMISSION, AdmissionRejected, estimate_cost, estimate_video_cost, image_megapixels, preview_image, preview_megapixels
 )
+from result_cache import ResultCache
+from asset_pack import open_asset_pack
+from example_warmup import ExampleWarmUp
+from worker_pool import WorkerPool
+from video import probe_video, process_video
 from style_transfer import (
     prepare_clothing_samples, prepare_makeup_style_samples, MAKEUP_STYLES_INFO
 )
+from gallery import GalleryStore
+from display import get_display_image, get_display_bytes
+from image_store import ImageStore
+import metrics # 구간 계측 (AI_STYLER_METRICS=1 일 때 디버그 패널/Prometheus 파일)
+from metrics import span
+from recommendation import (
+    RecommendationCache, RecommendationBusyError, RecommendationTimeoutError, build_system_message, stream_recommendation,
+    REQUEST_LIMITER
+)
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # --- OpenAI API Key 설정 (Streamlit Secrets 사용) ---
 # 로컬 테스트 시: secrets.toml 파일에 OPENAI_API_KEY = "sk-..." 형식으로 저장
 # 배포 시: Streamlit Community Cloud의 Secrets 설정에 추가
 try:
-    openai.api_key = st.secrets["OPENAI_API_KEY"]
+    OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
+    # 다른 엔드포인트 사용 시 (선택, 예: 로컬 테스트 서버 tools/fake_openai_server.py): OPENAI_BASE_URL = "http://127.0.0.1:8765/v1"
+    OPENAI_BASE_URL = st.secrets.get("OPENAI_BASE_URL")
 except FileNotFoundError:
     st.error("⚠️ OpenAI API Key를 찾을 수 없습니다. .streamlit/secrets.toml 파일을 확인하거나 Streamlit Cloud Secrets 설정을 확인하세요.")
     st.stop() # API 키 없으면 앱 중단
@@ -32,7 +54,25 @@ except KeyError:
     st.stop()
 
 
+@st.cache_resource
+def get_openai_client():
+    """openai 모듈을 처음 필요할 때 임포트하고 설정 (홈/갤러리만 보는 세션은 임포트 비용 없음)"""
+    import openai
+    openai.api_key = OPENAI_API_KEY
+    if OPENAI_BASE_URL:
+        openai.base_url = OPENAI_BASE_URL.rstrip("/") + "/" # 모듈 클라이언트는 끝 "/" 기준으로 경로를 붙임
+    openai.max_retries = 0 # 재시도/백오프는 recommendation.RecommendationStream 이 담당
+    return openai
+
+
+def image_comparison(**kwargs):
+    """streamlit_image_comparison 을 결과 비교 화면에서 처음 임포트해 호출"""
+    from streamlit_image_comparison import image_comparison as _image_comparison
+    return _image_comparison(**kwargs)
+
+
 # --- ⚙️ 앱 설정 및 초기화 ⚙️ ---
+SCRIPT_RUN_STARTED = time.perf_counter() # 스크립트 실행 1회 소요 시간 계측용
 st.set_page_config(
     page_title="✨ AI 스타일리스트 ✨ - Pro",
     page_icon="💎",
@@ -54,18 +94,46 @@ ASSETS_DIR = "assets"
 EXAMPLES_DIR = os.path.join(ASSETS_DIR, "examples")
 CLOTHES_DIR = os.path.join(ASSETS_DIR, "clothes")
 MAKEUP_STYLES_DIR = os.path.join(ASSETS_DIR, "makeup_styles")
+GALLERY_DIR = os.environ.get("AI_STYLER_GALLERY_DIR", "user_gallery") # 부하 테스트 등에서는 임시 폴더 지정
+ASSET_PACK_PATH = os.path.join(".cache", "assets.pack") # 디코딩된 의상/스타일 이미지 팩 (호스트의 모든 프로세스가 메모리 맵으로 공유)
+
+# --- 🖥️ 화면 표시 너비 (표시용 프록시 해상도 기준) ---
+COMPARISON_WIDTH = 700     # image_comparison 컴포넌트 너비
+PREVIEW_WIDTH = 400        # 결과 영역의 원본 미리보기
+HOME_PREVIEW_WIDTH = 500   # 홈 화면 원본 미리보기
+SIDE_PANEL_WIDTH = 480     # 옵션 영역(좁은 열)의 스타일/의상 미리보기
+GALLERY_VIEW_WIDTH = 1200  # 갤러리 원본 보기
 
 # --- 🚀 앱 시작 시 초기화 작업 ---
 create_assets_folder()
 
 # --- 🖼️ 리소스 로드 (캐싱 활용) ---
+def load_packed_assets():
+    """에셋 팩에서 의상/메이크업 스타일 로드 (디코딩 없음) - 팩이 없거나 오래됐거나 로컬 의상이 없으면 None
+
+    팩은 여기서 다시 만들지 않음 (python asset_pack.py build 로 배포 시 생성) - None 이면 파일별로 로드.
+    """
+    try:
+        pack = open_asset_pack(ASSET_PACK_PATH, {"clothing": CLOTHES_DIR, "makeup_styles": MAKEUP_STYLES_DIR})
+        if pack is None:
+            return None
+        clothing = pack.images("clothing")
+        if not clothing:
+            return None # 로컬 의상이 없으면 URL 다운로드 경로 사용
+        print(f"Mapped asset pack: {ASSET_PACK_PATH} ({pack.nbytes / 1024**2:.1f}MB)")
+        return {"clothing": clothing, "makeup_styles": pack.images("makeup_styles")}
+    except Exception as e:
+        print(f"Failed to load asset pack, decoding assets instead: {e}")
+        return None
+
 @st.cache_resource
 def load_resources():
     print("Loading resources...")
+    packed = load_packed_assets()
     resources = {
         "examples": {},
-        "clothing": prepare_clothing_samples(use_local=True, local_dir=CLOTHES_DIR),
-        "makeup_styles": prepare_makeup_style_samples(local_dir=MAKEUP_STYLES_DIR)
+        "clothing": packed["clothing"] if packed else prepare_clothing_samples(use_local=True, local_dir=CLOTHES_DIR),
+        "makeup_styles": packed["makeup_styles"] if packed else prepare_makeup_style_samples(local_dir=MAKEUP_STYLES_DIR)
     }
     # 예제 이미지 로드
     if os.path.isdir(EXAMPLES_DIR):
@@ -81,10 +149,203 @@ def load_resources():
     return resources
 
 RESOURCES = load_resources()
+
+# --- 🖼️ 갤러리 저장소 (user_gallery + SQLite 인덱스, 프로세스 전체 공유) ---
+GALLERY_OWNER_TTL_DAYS = int(os.environ.get("AI_STYLER_GALLERY_TTL_DAYS", 30)) # 이 기간 방문 없는 갤러리는 삭제 (0 이면 유지)
+
+@st.cache_resource
+def load_gallery_store():
+    store = GalleryStore(GALLERY_DIR, owner_ttl_days=GALLERY_OWNER_TTL_DAYS)
+    store.sweep_expired()
+    return store
+
+GALLERY = load_gallery_store()
+GALLERY_PAGE_SIZE = 12 # 한 페이지에 표시할 썸네일 수 (4열 x 3행)
+
+# --- 🧠 이미지 저장소 (세션 간 동일 이미지 공유 + 세션별 메모리 집계) ---
+SESSION_IMAGE_LIMIT_MB = 256 # 세션당 이미지 메모리 한도, 초과 시 파생 결과부터 제거
+
+@st.cache_resource
+def load_image_store():
+    return ImageStore(session_limit_bytes=SESSION_IMAGE_LIMIT_MB * 1024 * 1024)
+
+IMAGE_STORE = load_image_store()
+
+# --- ⚙️ 워커 풀 (무거운 단계를 별도 프로세스에서 실행, 프로세스 전체 공유) ---
+# AI_STYLER_WORKERS=0 이면 Streamlit 프로세스 안에서 직접 실행 (코어가 1개면 기본값 0)
+# 기본값은 Streamlit 용 코어 하나를 뺀 예산에 들어가는 동시 연산 수 (워커가 더 많아도 코어 예산 때문에 놀게 됨)
+WORKER_PROCESSES = int(os.environ.get(
+    "AI_STYLER_WORKERS", min(4, (compute_budget.CORE_BUDGET - 1) // compute_budget.THREADS_PER_CALL)
+))
+
+@st.cache_resource
+def load_worker_pool():
+    if WORKER_PROCESSES <= 0:
+        return None
+    print(f"Starting worker pool ({WORKER_PROCESSES} processes)...")
+    pool = WorkerPool(processes=WORKER_PROCESSES)
+    pool.start() # 워커 생성/FaceMesh 초기화는 백그라운드에서 - 첫 렌더가 기다리지 않도록
+    return pool
+
+WORKER_POOL = load_worker_pool()
+
+# --- ♻️ 연산 결과 캐시 (세션 간 공유 - 같은 예제에 같은 필터/메이크업/의상이면 다시 계산하지 않음) ---
+RESULT_CACHE_LIMIT_MB = 512 # 결과 캐시 전체 한도, 초과 시 오래 사용하지 않은 결과부터 제거
+
+@st.cache_resource
+def load_result_cache():
+    return ResultCache(max_bytes=RESULT_CACHE_LIMIT_MB * 1024 * 1024)
+
+RESULT_CACHE = load_result_cache()
+
+def get_session_id():
+    """현재 Streamlit 세션 ID (스크립트 컨텍스트 밖에서는 'default')
+
+    AppTest 로 띄운 세션은 모두 같은 ID를 쓰므로 부하 테스트(tools/load_test.py)는 세션 상태 load_test_session_id 로 구분.
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return "default"
+    return st.session_state.get("load_test_session_id", ctx.session_id)
+
+SESSION_ID = get_session_id()
+IMAGE_STORE.touch(SESSION_ID)
+IMAGE_STORE.sweep_idle() # 오래 접근 없는 세션의 이미지 참조 정리
+
+GALLERY_OWNER_PARAM = "gallery" # 갤러리 소유자 토큰을 담는 URL 쿼리 파라미터
+GALLERY_OWNER_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+def get_gallery_owner():
+    """갤러리 소유자 토큰 - 세션 ID 는 새로고침마다 바뀌므로 임의 토큰을 URL(?gallery=...)에 보관
+
+    같은 URL(북마크)로 다시 열면 같은 갤러리를 보고, 링크를 아는 사람은 누구나 그 갤러리에 접근 가능.
+    부하 테스트 세션은 세션 ID 를 그대로 사용.
+    """
+    if "load_test_session_id" in st.session_state or get_script_run_ctx() is None:
+        return SESSION_ID
+    owner = st.session_state.get("gallery_owner")
+    if owner is None:
+        owner = st.query_params.get(GALLERY_OWNER_PARAM)
+        if not owner or not GALLERY_OWNER_PATTERN.fullmatch(owner):
+            owner = uuid.uuid4().hex
+        st.session_state.gallery_owner = owner
+        GALLERY.touch(owner) # 세션마다 한 번 - 만료 기준 방문 시각
+        GALLERY.sweep_expired()
+    if st.query_params.get(GALLERY_OWNER_PARAM) != owner:
+        st.query_params[GALLERY_OWNER_PARAM] = owner
+    return owner
+
+GALLERY_OWNER = get_gallery_owner()
+
+def set_session_image(slot, img, digest=None):
+    """세션 이미지 슬롯 갱신 - 저장소의 공유본을 보관하고, 한도 초과로 제거된 슬롯은 비움"""
+    if img is None:
+        IMAGE_STORE.release(SESSION_ID, slot)
+        st.session_state[slot] = None
+        return
+    shared_img, evicted_slots = IMAGE_STORE.put(SESSION_ID, slot, img, digest)
+    st.session_state[slot] = shared_img
+    for evicted_slot in evicted_slots:
+        st.session_state[evicted_slot] = None
+        print(f"Session image limit exceeded. Evicted '{evicted_slot}' for session {SESSION_ID}.")
+
+# --- 🎬 동영상 결과 파일 (세션 상태에는 경로만 보관, 화면에 표시하는 동안만 읽음) ---
+VIDEO_RESULT_DIR = os.path.join(tempfile.gettempdir(), "ai_styler_videos")
+VIDEO_RESULT_MAX_AGE = 60 * 60 # 이 시간(초)이 지난 결과 파일은 삭제 (세션이 끝나도 남은 파일 정리)
+
+def drop_video_result():
+    """현재 세션의 동영상 결과 파일 삭제"""
+    path = st.session_state.get("video_result_path")
+    st.session_state.video_result_path = None
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def sweep_video_results():
+    """VIDEO_RESULT_MAX_AGE 보다 오래된 결과 파일 삭제"""
+    cutoff = time.time() - VIDEO_RESULT_MAX_AGE
+    try:
+        entries = list(os.scandir(VIDEO_RESULT_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+# --- 🔗 렌더 파이프라인 (필터 → 메이크업 → 가상 피팅) ---
+PIPELINE_STEPS = ("filter", "makeup", "tryon") # 모드별 단계 (메이크업은 직접/스타일 전송 중 하나)
+STAGE_LABELS = {"filter": "필터", "makeup": "메이크업", "makeup_transfer": "스타일 전송", "tryon": "가상 피팅"}
+
+def render_with_pipeline(step, stage, params, spinner_text):
+    """현재 모드의 단계를 기록하고 실행 - '단계 연결'이 켜져 있으면 앞 단계들의 마지막 설정 위에 적용
+
+    캐시에 없는 단계가 있으면 입장 제어(ADMISSION)를 거쳐 실행 - 대기 중에는 대기 순번을, 실행 중에는 spinner_text 를 표시.
+    서버가 혼잡하면(대기열 상한 초과) 정책에 따라 미리보기 해상도로 처리하거나 AdmissionRejected 발생.
+
+    Returns:
+        tuple: (결과 이미지, 현재 단계 성공 여부, 캡션 접미사)
+    """
+    st.session_state.pipeline_stages[step] = (stage, params)
+    stages = []
+    if st.session_state.stack_stages:
+        for upstream in PIPELINE_STEPS[:PIPELINE_STEPS.index(step)]:
+            if upstream in st.session_state.pipeline_stages:
+                stages.append(st.session_state.pipeline_stages[upstream])
+    stages.append((stage, params))
+
+    source_img = st.session_state.original_image
+    pipeline = st.session_state.render_pipeline
+    pending = pipeline.pending_stages(source_img, stages)
+    cost = estimate_cost(pending, image_megapixels(source_img))
+    preview_mp = preview_megapixels(source_img) # 축소본은 실제로 degrade 될 때만 만듦
+    preview_cost = estimate_cost(pending, preview_mp) if preview_mp is not None else None
+
+    queue_placeholder = st.empty()
+    def on_wait(position, eta_seconds):
+        queue_placeholder.info(f"⏳ 처리 대기 중: {position}번째 (예상 대기 약 {eta_seconds:.0f}초)")
+
+    with ADMISSION.admit(SESSION_ID, cost, preview_cost, on_wait) as admission:
+        queue_placeholder.empty()
+        if admission.degraded:
+            source_img = preview_image(source_img) # 혼잡 시 미리보기 해상도로 처리
+        with st.spinner(spinner_text), span(f"app.render.{step}"):
+            result_img, infos = pipeline.render(source_img, stages)
+    caption_suffix = ""
+    if len(infos) > 1:
+        caption_suffix = f" [+ {' → '.join(STAGE_LABELS[info['stage']] for info in infos[:-1])}]"
+    if admission.degraded:
+        caption_suffix += f" (미리보기 해상도 {result_img.width}x{result_img.height})"
+        st.warning("⚠️ 서버가 혼잡해 미리보기 해상도로 처리했습니다. 원본 해상도 결과는 잠시 후 다시 적용해주세요.")
+    reused = [STAGE_LABELS[info["stage"]] for info in infos if info["cached"]]
+    if reused:
+        st.caption(f"♻️ 캐시된 단계 재사용: {', '.join(reused)}")
+    return result_img, infos[-1]["success"], caption_suffix
 AVAILABLE_CLOTHING_TYPES = list(RESOURCES["clothing"].keys())
 AVAILABLE_MAKEUP_STYLES = list(RESOURCES["makeup_styles"].keys())
 AVAILABLE_EXAMPLE_NAMES = ["이미지 업로드"] + list(RESOURCES["examples"].keys())
 AVAILABLE_FASHION_STYLES = ["casual", "vintage", "elegant", "monochrome"] # Define available fashion styles
+DEFAULT_FILTER_INTENSITY = 0.7
+DEFAULT_MAKEUP_OPTIONS = {
+    'intensity': 0.6, 'apply_lips': True, 'lip_color': '#E64E6B', 'lip_intensity': 0.7,
+    'apply_eyeshadow': True, 'eyeshadow_color': '#8A5A94', 'eyeshadow_intensity': 0.5,
+    'apply_blush': False, 'blush_color': '#F08080', 'blush_intensity': 0.4,
+}
+
+# --- 🔥 예제 캐시 워밍업 준비 (시작은 스크립트 끝에서, 첫 화면을 그린 뒤) ---
+@st.cache_resource
+def load_example_warm_up():
+    # 예제를 고른 첫 사용자가 기본 설정으로 적용하면 바로 캐시 적중
+    presets = [("filter", {"style": style, "intensity": DEFAULT_FILTER_INTENSITY}) for style in AVAILABLE_FASHION_STYLES]
+    presets.append(("makeup", dict(DEFAULT_MAKEUP_OPTIONS)))
+    pipeline = RenderPipeline(result_cache=RESULT_CACHE, worker_pool=WORKER_POOL)
+    return ExampleWarmUp(RESOURCES["examples"], IMAGE_STORE, pipeline, presets)
+
+EXAMPLE_WARMUP = load_example_warm_up()
 
 
 # --- 📌 세션 상태 관리 ---
@@ -108,16 +369,16 @@ def initialize_session_state():
     # 현재 적용된 결과 캡션
     if "result_caption" not in st.session_state:
         st.session_state.result_caption = ""
-    # 갤러리
-    if "gallery" not in st.session_state:
-        st.session_state.gallery = [] # {'image': PIL Image, 'caption': str} list
+    # 갤러리 (항목 자체는 GALLERY 저장소에, 세션에는 현재 페이지/선택 항목만)
+    if "gallery_page" not in st.session_state:
+        st.session_state.gallery_page = 0
+    if "gallery_selected" not in st.session_state:
+        st.session_state.gallery_selected = None # 원본 보기로 선택된 항목 ID
+    if "gallery_selected_image" not in st.session_state:
+        st.session_state.gallery_selected_image = None # (항목 ID, 원본 PIL Image) - 재실행마다 디스크에서 다시 읽지 않도록
     # 메이크업 옵션
     if "makeup_options" not in st.session_state:
-        st.session_state.makeup_options = {
-            'intensity': 0.6, 'apply_lips': True, 'lip_color': '#E64E6B', 'lip_intensity': 0.7,
-            'apply_eyeshadow': True, 'eyeshadow_color': '#8A5A94', 'eyeshadow_intensity': 0.5,
-            'apply_blush': False, 'blush_color': '#F08080', 'blush_intensity': 0.4,
-        }
+        st.session_state.makeup_options = dict(DEFAULT_MAKEUP_OPTIONS)
     # 가상 피팅 옵션
     if "tryon_options" not in st.session_state:
         st.session_state.tryon_options = {
@@ -129,13 +390,27 @@ def initialize_session_state():
         st.session_state.recommendation_prompt = ""
     if "recommendation_result" not in st.session_state:
         st.session_state.recommendation_result = ""
+    # 렌더 파이프라인 (단계 연결 및 단계별 결과 캐시)
+    if "render_pipeline" not in st.session_state:
+        st.session_state.render_pipeline = RenderPipeline(result_cache=RESULT_CACHE, worker_pool=WORKER_POOL)
+    if "pipeline_stages" not in st.session_state:
+        st.session_state.pipeline_stages = {} # {"filter"/"makeup"/"tryon": (단계 이름, 파라미터)} 마지막 적용 값
+    if "stack_stages" not in st.session_state:
+        st.session_state.stack_stages = False # True면 이전 단계 결과 위에 이어서 적용
+    if "recommendation_timing" not in st.session_state:
+        st.session_state.recommendation_timing = None # 마지막 요청의 첫 토큰/전체 소요 시간
+    # 동영상 메이크업 결과 (인코딩된 파일 바이트) 및 처리 통계
+    if "video_result_path" not in st.session_state:
+        st.session_state.video_result_path = None # 처리된 동영상 파일 (바이트는 세션에 두지 않음)
+    if "video_stats" not in st.session_state:
+        st.session_state.video_stats = None
 
 initialize_session_state()
 
 # --- ✨ 상단 네비게이션 메뉴 ---
 # "AI 추천" 메뉴 추가
-menu_options = ["홈", "패션 필터", "메이크업", "가상 피팅", "AI 추천", "갤러리"]
-menu_icons = ['house-door-fill', 'palette-fill', 'magic', 'person-standing-dress', 'robot', 'images']
+menu_options = ["홈", "패션 필터", "메이크업", "가상 피팅", "동영상", "AI 추천", "갤러리"]
+menu_icons = ['house-door-fill', 'palette-fill', 'magic', 'person-standing-dress', 'camera-reels-fill', 'robot', 'images']
 
 selected_mode = option_menu(
     menu_title=None,
@@ -159,9 +434,10 @@ selected_mode = option_menu(
 if selected_mode:
     # 모드가 변경되면 이전 결과 이미지를 초기화하여 혼동 방지 (AI 추천 결과는 유지 가능)
     if st.session_state.app_mode != selected_mode and selected_mode != "AI 추천":
-        st.session_state.filtered_image = None
-        st.session_state.makeup_image = None
-        st.session_state.tryon_image = None
+        set_session_image("filtered_image", None)
+        set_session_image("makeup_image", None)
+        set_session_image("tryon_image", None)
+        drop_video_result()
         st.session_state.result_caption = ""
         # 추천 프롬프트/결과는 유지할지 초기화할지 선택 (여기서는 유지)
         # st.session_state.recommendation_prompt = ""
@@ -174,6 +450,11 @@ if selected_mode:
 # ... (코드 생략) ...
 with st.expander("📂 이미지 선택 및 업로드", expanded=(st.session_state.original_image is None)): # 이미지가 없으면 기본 확장
     image_source = st.selectbox("이미지 소스 선택:", AVAILABLE_EXAMPLE_NAMES, index=0, key="image_source_select")
+    st.checkbox(
+        "🔗 단계 연결: 필터 → 메이크업 → 가상 피팅 결과를 이어서 적용",
+        key="stack_stages",
+        help="켜면 각 모드가 원본 대신 앞 단계(마지막으로 적용한 설정)의 결과 위에 적용됩니다. 앞 단계 결과는 캐시에서 재사용됩니다."
+    )
 
     if image_source == "이미지 업로드":
         uploaded_file = st.file_uploader(
@@ -189,22 +470,23 @@ with st.expander("📂 이미지 선택 및 업로드", expanded=(st.session_sta
                      # 새 이미지 로드 시 현재 이미지와 다른 경우에만 업데이트 (중복 로딩 방지)
                     current_caption = f"업로드: {uploaded_file.name}"
                     if st.session_state.original_image is None or st.session_state.original_image_caption != current_caption:
-                        st.session_state.original_image = loaded_image
+                        set_session_image("original_image", loaded_image)
+                        st.session_state.pipeline_stages = {} # 새 이미지에는 이전 단계 설정을 이어 붙이지 않음
                         st.session_state.original_image_caption = current_caption
                         # 새 이미지 로드 시 이전 결과 초기화
-                        st.session_state.filtered_image = None
-                        st.session_state.makeup_image = None
-                        st.session_state.tryon_image = None
+                        set_session_image("filtered_image", None)
+                        set_session_image("makeup_image", None)
+                        set_session_image("tryon_image", None)
                         st.session_state.result_caption = ""
                         st.success("✅ 이미지가 성공적으로 업로드되었습니다.")
                         # st.image(st.session_state.original_image, caption="업로드된 원본 이미지", width=300) # Expander 내부에서는 생략 가능
                         st.rerun() # 새 이미지 로드 후 UI 즉시 갱신
                 else:
                     st.error("이미지 로드에 실패했습니다.")
-                    st.session_state.original_image = None
+                    set_session_image("original_image", None)
             except Exception as e:
                 st.error(f"이미지 처리 오류: {e}")
-                st.session_state.original_image = None
+                set_session_image("original_image", None)
     else: # 예제 이미지 선택
         example_path = RESOURCES["examples"].get(image_source)
         if example_path and os.path.exists(example_path):
@@ -213,64 +495,77 @@ with st.expander("📂 이미지 선택 및 업로드", expanded=(st.session_sta
                 current_caption = f"예제: {image_source}"
                 # 현재 이미지와 다를 경우에만 업데이트
                 if st.session_state.original_image is None or st.session_state.original_image_caption != current_caption:
-                    loaded_image = load_image(example_path)
+                    loaded_image, example_digest = IMAGE_STORE.load_file(example_path, load_image) # 다른 세션에 이미 있으면 디코딩 생략
                     if loaded_image:
-                        st.session_state.original_image = loaded_image
+                        set_session_image("original_image", loaded_image, example_digest)
+                        st.session_state.pipeline_stages = {}
                         st.session_state.original_image_caption = current_caption
-                        st.session_state.filtered_image = None
-                        st.session_state.makeup_image = None
-                        st.session_state.tryon_image = None
+                        set_session_image("filtered_image", None)
+                        set_session_image("makeup_image", None)
+                        set_session_image("tryon_image", None)
                         st.session_state.result_caption = ""
                         st.success(f"✅ '{image_source}' 예제 이미지가 선택되었습니다.")
                         # st.image(st.session_state.original_image, caption="선택된 원본 이미지", width=300) # Expander 내부에서는 생략 가능
                         st.rerun() # 새 이미지 로드 후 UI 즉시 갱신
                     else:
                         st.error(f"'{image_source}' 예제 이미지 로드 실패.")
-                        st.session_state.original_image = None
+                        set_session_image("original_image", None)
             except Exception as e:
                 st.error(f"예제 이미지 처리 오류: {e}")
-                st.session_state.original_image = None
+                set_session_image("original_image", None)
 
 
 # --- 🤖 GPT 기반 추천 함수 ---
-def get_style_recommendation(user_prompt):
-    """GPT API를 호출하여 스타일 추천을 받는 함수"""
+RECOMMENDATION_CACHE_PATH = os.path.join(".cache", "recommendations.json") # None이면 메모리에만 캐시
+
+@st.cache_resource
+def load_recommendation_cache():
+    return RecommendationCache(persist_path=RECOMMENDATION_CACHE_PATH)
+
+RECOMMENDATION_CACHE = load_recommendation_cache()
+
+def get_style_recommendation(user_prompt, result_placeholder):
+    """GPT API를 스트리밍으로 호출하여 추천을 토큰 단위로 표시하는 함수 (동일/유사 프롬프트는 캐시에서 응답)
+
+    받은 내용은 즉시 st.session_state.recommendation_result에 반영되므로 도중에 오류가 나도 유지됨.
+    API 호출은 백그라운드 스레드에서 진행되고 이 함수는 받은 조각만 표시 - 최대 RESPONSE_DEADLINE 초 안에 반환.
+    Returns:
+        RecommendationStream: 누적 텍스트와 타이밍 정보 (입력이 없으면 None)
+    """
     if not user_prompt:
-        return "추천을 받으려면 설명을 입력해주세요."
+        return None
 
     # 시스템 메시지: GPT의 역할과 응답 방향 정의
-    system_message = f"""
-    당신은 전문 패션 & 뷰티 AI 스타일리스트입니다. 사용자의 설명(피부톤, 선호 스타일, 상황 등)을 바탕으로 구체적이고 실용적인 스타일링 추천을 제공해주세요.
-    추천 내용은 다음 요소들을 포함할 수 있습니다:
-    - 메이크업: 어울리는 립, 아이섀도우, 블러셔 색상 및 스타일 (예: '쿨톤 피부에는 핑크 계열 립스틱과 회갈색 아이섀도우가 잘 어울립니다.')
-    - 패션 필터: 사용자가 앱에서 선택할 수 있는 필터 추천 ({', '.join(AVAILABLE_FASHION_STYLES)}) (예: '차분한 느낌을 원하시면 'elegant' 필터를 적용해보세요.')
-    - 의상 종류/색상: 사용자가 앱에서 선택할 수 있는 의상 종류 ({', '.join(AVAILABLE_CLOTHING_TYPES)}) 또는 일반적인 의상 색상 추천 (예: '중요한 자리라면 'formal_dress'를 시도해보거나, 네이비 색상의 블라우스가 좋습니다.')
-    - 추천 이유를 간략하게 설명해주세요.
-    - 응답은 친절하고 이해하기 쉬운 한국어로 작성해주세요.
-    - 마크다운 형식을 활용하여 가독성을 높여주세요 (예: 항목별 리스트 사용).
-    """
+    system_message = build_system_message(AVAILABLE_FASHION_STYLES, AVAILABLE_CLOTHING_TYPES)
+    openai = get_openai_client()
+    stream = stream_recommendation(openai, user_prompt, system_message, cache=RECOMMENDATION_CACHE)
 
+    result_placeholder.markdown("🧠 AI가 열심히 추천 내용을 생성 중입니다...")
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # 또는 "gpt-4" 등 사용 가능한 모델
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7, # 약간의 창의성 허용
-            max_tokens=300 # 응답 길이 제한
-        )
-        recommendation = response.choices[0].message.content.strip()
-        return recommendation
+        for _ in stream:
+            st.session_state.recommendation_result = stream.text
+            result_placeholder.markdown(stream.text + " ▌")
     except openai.AuthenticationError:
         st.error("❌ OpenAI API 인증 오류: API 키가 유효하지 않거나 설정되지 않았습니다.")
-        return None # 오류 발생 시 None 반환
     except openai.RateLimitError:
-        st.error("❌ OpenAI API 호출 한도 초과: 잠시 후 다시 시도해주세요.")
-        return None
+        st.error(f"❌ OpenAI API 호출 한도 초과 ({stream.retries}회 재시도 후): 잠시 후 다시 시도해주세요.")
+    except (openai.APITimeoutError, RecommendationTimeoutError):
+        st.error("❌ OpenAI API 응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.")
+    except RecommendationBusyError as e:
+        st.error(f"❌ {e} 잠시 후 다시 시도해주세요.")
     except Exception as e:
         st.error(f"❌ GPT API 호출 중 오류 발생: {e}")
-        return None
+
+    if stream.text:
+        st.session_state.recommendation_result = stream.text
+        result_placeholder.markdown(stream.text)
+        if not stream.completed:
+            st.warning("⚠️ 응답이 중간에 끊겼습니다. 지금까지 받은 내용만 표시합니다.")
+    elif st.session_state.recommendation_result:
+        result_placeholder.markdown(st.session_state.recommendation_result) # 오류 시 이전 결과 유지
+    else:
+        result_placeholder.empty()
+    return stream
 
 
 # --- 📌 메인 콘텐츠 영역 ---
@@ -285,41 +580,108 @@ if st.session_state.app_mode == "홈":
     st.info("✨ **Tip:** 각 기능별로 다양한 옵션을 조절하여 자신만의 스타일을 만들어보세요!")
     if st.session_state.original_image:
          st.success("✅ 원본 이미지가 준비되었습니다. 상단 메뉴를 이용해 스타일링을 시작하거나 AI 추천을 받아보세요!")
-         st.image(st.session_state.original_image, caption=st.session_state.original_image_caption, width=500)
+         st.image(get_display_bytes(st.session_state.original_image, HOME_PREVIEW_WIDTH), caption=st.session_state.original_image_caption, width=HOME_PREVIEW_WIDTH)
+    # 이미지 메모리 사용량 (세션 / 프로세스 전체)
+    store_totals = IMAGE_STORE.totals()
+    st.caption(
+        f"🧠 이미지 메모리: 현재 세션 {IMAGE_STORE.session_bytes(SESSION_ID) / 1024**2:.1f}MB / 한도 {SESSION_IMAGE_LIMIT_MB}MB · "
+        f"전체 {store_totals['unique_bytes'] / 1024**2:.1f}MB (이미지 {store_totals['unique_images']}개, 세션 {store_totals['sessions']}개, "
+        f"공유로 절약 {store_totals['saved_bytes'] / 1024**2:.1f}MB)"
+    )
+    warmup_progress = EXAMPLE_WARMUP.progress()
+    if warmup_progress["started"] and not warmup_progress["finished"]:
+        st.progress(
+            warmup_progress["done"] / warmup_progress["total"],
+            text=f"🔥 예제 미리 준비 중... {warmup_progress['done']}/{warmup_progress['total']} {warmup_progress['current']}"
+        )
+    cache_totals = RESULT_CACHE.totals()
+    st.caption(
+        f"♻️ 결과 캐시: {cache_totals['entries']}개 {cache_totals['bytes'] / 1024**2:.1f}MB / 한도 {RESULT_CACHE_LIMIT_MB}MB · "
+        f"재사용 {cache_totals['hits'] + cache_totals['coalesced']}회 (동시 요청 합류 {cache_totals['coalesced']}회), 계산 {cache_totals['misses']}회"
+    )
 
 
 elif st.session_state.app_mode == "갤러리":
     # (이전 갤러리 코드와 동일)
     # ... (코드 생략) ...
     st.header("🖼️ 나의 스타일 갤러리")
-    if not st.session_state.gallery:
+    st.caption(f"🔗 지금 주소(?{GALLERY_OWNER_PARAM}=...)를 북마크하면 새로고침하거나 다시 방문해도 같은 갤러리를 볼 수 있습니다. 주소를 아는 사람은 누구나 볼 수 있고, {GALLERY_OWNER_TTL_DAYS}일 동안 방문하지 않으면 삭제됩니다.")
+    total_items = GALLERY.count(GALLERY_OWNER)
+    if total_items == 0:
         st.info("아직 갤러리에 저장된 이미지가 없습니다. 스타일 적용 후 결과 하단의 '갤러리에 저장' 버튼을 눌러 추가해보세요.")
     else:
-        st.success(f"총 {len(st.session_state.gallery)}개의 스타일 이미지가 저장되어 있습니다.")
+        st.success(f"총 {total_items}개의 스타일 이미지가 저장되어 있습니다.")
+        page_count = (total_items + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+        st.session_state.gallery_page = min(st.session_state.gallery_page, page_count - 1)
+
+        # 선택된 항목은 원본 해상도로 필요할 때만 로드
+        if st.session_state.gallery_selected:
+            selected_item = GALLERY.get(GALLERY_OWNER, st.session_state.gallery_selected)
+            if selected_item is None:
+                st.session_state.gallery_selected = None
+                st.session_state.gallery_selected_image = None
+            else:
+                # 같은 객체를 재사용해야 표시 프록시 메모((id(image), 너비) 키)가 재실행 사이에 적중
+                cached_selected = st.session_state.gallery_selected_image
+                if cached_selected is not None and cached_selected[0] == selected_item["id"]:
+                    full_img = cached_selected[1]
+                else:
+                    full_img = GALLERY.load_image(GALLERY_OWNER, selected_item["id"])
+                    st.session_state.gallery_selected_image = (selected_item["id"], full_img) if full_img else None
+                if full_img:
+                    st.image(get_display_bytes(full_img, GALLERY_VIEW_WIDTH), caption=selected_item["caption"], use_container_width=True)
+                view_col1, view_col2 = st.columns(2)
+                with view_col1:
+                    image_bytes = GALLERY.read_image_bytes(GALLERY_OWNER, selected_item["id"])
+                    if image_bytes:
+                        caption = selected_item["caption"]
+                        st.download_button(
+                            "💾 원본 다운로드",
+                            data=image_bytes,
+                            file_name=f"gallery_{caption.replace(' ', '_').replace(':', '_').replace('/', '_')}_{selected_item['id'][:8]}.png", # 파일명 유효 문자 처리
+                            mime="image/png",
+                            key="gallery_download_selected",
+                            use_container_width=True
+                        )
+                with view_col2:
+                    if st.button("✖️ 닫기", key="gallery_close_selected", use_container_width=True):
+                        st.session_state.gallery_selected = None
+                        st.session_state.gallery_selected_image = None
+                        st.rerun()
+                st.divider()
+
+        # 현재 페이지의 썸네일만 로드
+        page_items = GALLERY.list_page(GALLERY_OWNER, st.session_state.gallery_page, GALLERY_PAGE_SIZE)
         cols = st.columns(4) # 4열로 표시
-        for i, img_data in enumerate(st.session_state.gallery):
-            img = img_data['image']
-            caption = img_data['caption']
+        for i, item in enumerate(page_items):
+            index = st.session_state.gallery_page * GALLERY_PAGE_SIZE + i
             with cols[i % 4]:
-                st.image(img, caption=f"{i+1}: {caption}", use_container_width=True)
-                buf = io.BytesIO()
-                save_img_gal = img.convert('RGB') if img.mode == 'RGBA' else img
-                try:
-                    save_img_gal.save(buf, format="PNG")
-                    st.download_button(
-                        label="💾", # 아이콘 형태 버튼
-                        data=buf.getvalue(),
-                        file_name=f"gallery_{caption.replace(' ', '_').replace(':', '_').replace('/', '_')}_{i}.png", # 파일명 유효 문자 처리
-                        mime="image/png",
-                        key=f"gallery_download_{i}",
-                        use_container_width=True,
-                        help="다운로드"
-                    )
-                except Exception as e:
-                    st.error(f"이미지 저장 오류: {e}")
+                st.image(item["thumb_path"], caption=f"{index+1}: {item['caption']}", use_container_width=True)
+                st.caption(item["created_at"].replace("T", " "))
+                if st.button("🔍", key=f"gallery_view_{item['id']}", use_container_width=True, help="원본 보기 / 다운로드"):
+                    st.session_state.gallery_selected = item["id"]
+                    st.rerun()
+
+        # 페이지 이동
+        if page_count > 1:
+            nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+            with nav_col1:
+                if st.button("◀ 이전", key="gallery_prev", use_container_width=True, disabled=(st.session_state.gallery_page == 0)):
+                    st.session_state.gallery_page -= 1
+                    st.rerun()
+            with nav_col2:
+                st.markdown(f"<div style='text-align: center'>{st.session_state.gallery_page + 1} / {page_count} 페이지</div>", unsafe_allow_html=True)
+            with nav_col3:
+                if st.button("다음 ▶", key="gallery_next", use_container_width=True, disabled=(st.session_state.gallery_page >= page_count - 1)):
+                    st.session_state.gallery_page += 1
+                    st.rerun()
+
         st.divider()
         if st.button("🗑️ 갤러리 모두 비우기", use_container_width=True, type="primary"):
-            st.session_state.gallery = []
+            GALLERY.clear(GALLERY_OWNER)
+            st.session_state.gallery_page = 0
+            st.session_state.gallery_selected = None
+            st.session_state.gallery_selected_image = None
             st.success("갤러리가 비워졌습니다.")
             st.rerun()
 
@@ -342,21 +704,121 @@ elif st.session_state.app_mode == "AI 추천":
     )
 
     # 추천 받기 버튼
-    if st.button("✨ AI에게 추천 받기", key="get_recommendation", type="primary", use_container_width=True):
-        if st.session_state.recommendation_prompt:
-            with st.spinner("🧠 AI가 열심히 추천 내용을 생성 중입니다..."):
-                recommendation = get_style_recommendation(st.session_state.recommendation_prompt)
-                if recommendation: # 오류가 아닐 경우에만 결과 업데이트
-                    st.session_state.recommendation_result = recommendation
-                # 오류 발생 시에는 get_style_recommendation 함수 내에서 st.error로 메시지 표시됨
-        else:
-            st.warning("⚠️ 추천을 받으려면 설명을 입력해주세요.")
+    recommend_clicked = st.button("✨ AI에게 추천 받기", key="get_recommendation", type="primary", use_container_width=True)
+    if recommend_clicked and not st.session_state.recommendation_prompt:
+        st.warning("⚠️ 추천을 받으려면 설명을 입력해주세요.")
+        recommend_clicked = False
 
-    # 추천 결과 표시
-    if st.session_state.recommendation_result:
+    # 추천 결과 표시 (요청 중에는 토큰 단위로 갱신)
+    if recommend_clicked or st.session_state.recommendation_result:
         st.divider()
         st.subheader("💡 AI 추천 결과")
-        st.markdown(st.session_state.recommendation_result)
+        result_placeholder = st.empty()
+        if recommend_clicked:
+            st.session_state.recommendation_timing = None # 이전 요청의 시간이 이번 결과(특히 오류)에 남지 않도록
+            stream = get_style_recommendation(st.session_state.recommendation_prompt, result_placeholder)
+            if stream:
+                st.session_state.recommendation_timing = {
+                    "time_to_first_token": stream.time_to_first_token,
+                    "total_time": stream.total_time,
+                    "from_cache": stream.from_cache,
+                    "completed": stream.completed,
+                    "retries": stream.retries,
+                }
+            # 오류 발생 시에는 get_style_recommendation 함수 내에서 st.error로 메시지 표시됨
+        else:
+            result_placeholder.markdown(st.session_state.recommendation_result)
+
+        timing = st.session_state.recommendation_timing
+        timing_text = ""
+        if timing:
+            first_text = f"{timing['time_to_first_token']:.2f}초" if timing["time_to_first_token"] is not None else "없음"
+            total_text = f"{timing['total_time']:.2f}초" if timing["completed"] else "중단됨"
+            retry_text = f" · 재시도 {timing['retries']}회" if timing["retries"] else ""
+            timing_text = f"첫 응답 {first_text} · 전체 {total_text}{' (캐시)' if timing['from_cache'] else ''}{retry_text} · "
+        cache_stats = RECOMMENDATION_CACHE.stats
+        st.caption(f"{timing_text}추천 캐시: 적중 {cache_stats['hits']} / 미적중 {cache_stats['misses']} (적중률 {RECOMMENDATION_CACHE.hit_rate():.0%}, {len(RECOMMENDATION_CACHE)}개 저장) · "
+                   f"진행 중 API 호출 {REQUEST_LIMITER.stats['in_flight']}/{REQUEST_LIMITER.max_concurrent}")
+
+
+# --- 🎬 동영상 메이크업 모드 (이미지 입력 불필요) ---
+elif st.session_state.app_mode == "동영상":
+    st.header("🎬 동영상 메이크업")
+    st.caption("FaceMesh 추적 모드와 랜드마크 스무딩으로 프레임마다 메이크업을 적용합니다. 프레임은 스트리밍으로 처리되며 오디오는 포함되지 않습니다.")
+    col1_vid, col2_vid = st.columns([1, 3]) # 옵션 영역 / 결과 영역
+
+    with col1_vid:
+        st.subheader("동영상 옵션")
+        video_file = st.file_uploader("동영상 파일 업로드", type=["mp4", "mov", "avi", "mkv"], key="video_uploader")
+        # 메이크업 옵션은 '메이크업' 메뉴와 공유
+        st.session_state.makeup_options['intensity'] = st.slider("전체 강도", 0.1, 1.0, st.session_state.makeup_options['intensity'], 0.05, key="vid_intensity")
+        st.session_state.makeup_options['apply_lips'] = st.checkbox("💄 입술", value=st.session_state.makeup_options['apply_lips'], key="vid_apply_lips")
+        if st.session_state.makeup_options['apply_lips']:
+            st.session_state.makeup_options['lip_color'] = st.color_picker('립 색상', st.session_state.makeup_options['lip_color'], key="vid_lip_color")
+        st.session_state.makeup_options['apply_eyeshadow'] = st.checkbox("✨ 아이섀도우", value=st.session_state.makeup_options['apply_eyeshadow'], key="vid_apply_eyeshadow")
+        if st.session_state.makeup_options['apply_eyeshadow']:
+            st.session_state.makeup_options['eyeshadow_color'] = st.color_picker('섀도우 색상', st.session_state.makeup_options['eyeshadow_color'], key="vid_eyeshadow_color")
+        st.session_state.makeup_options['apply_blush'] = st.checkbox("😊 블러셔", value=st.session_state.makeup_options['apply_blush'], key="vid_apply_blush")
+        smoothing = st.slider("떨림 보정 (랜드마크 스무딩)", 0.0, 0.9, 0.6, 0.05, key="vid_smoothing", help="높을수록 메이크업 위치가 안정적이지만 빠른 움직임을 늦게 따라갑니다.")
+        apply_video_btn = st.button("🎬 동영상 처리", key="apply_video", use_container_width=True, type="primary", disabled=video_file is None)
+
+    with col2_vid:
+        st.subheader("결과")
+        if apply_video_btn and video_file is not None:
+            progress_bar = st.progress(0.0, text="동영상 처리 준비 중...")
+
+            def on_progress(stats):
+                total = stats["total_frames"]
+                fraction = min(1.0, stats["frames"] / total) if total else 0.0
+                progress_bar.progress(fraction, text=f"{stats['frames']}{'/' + str(total) if total else ''} 프레임 · {stats['fps']:.1f} fps ({stats['realtime_factor']:.2f}x 실시간)")
+
+            drop_video_result()
+            sweep_video_results()
+            queue_placeholder = st.empty()
+            def on_wait(position, eta_seconds):
+                queue_placeholder.info(f"⏳ 처리 대기 중: {position}번째 (예상 대기 약 {eta_seconds:.0f}초)")
+
+            input_path = output_path = None
+            try:
+                with tempfile.NamedTemporaryFile(suffix=os.path.splitext(video_file.name)[1], delete=False) as tmp_in:
+                    tmp_in.write(video_file.getbuffer())
+                    input_path = tmp_in.name
+                os.makedirs(VIDEO_RESULT_DIR, exist_ok=True)
+                with tempfile.NamedTemporaryFile(suffix=".mp4", dir=VIDEO_RESULT_DIR, delete=False) as tmp_out:
+                    output_path = tmp_out.name
+                info = probe_video(input_path)
+                cost = estimate_video_cost(info["frames"], info["width"] * info["height"] / 1_000_000)
+                # 동영상은 미리보기 해상도로 줄일 수 없으므로 대기열이 가득 차면 거절
+                with ADMISSION.admit(SESSION_ID, cost, None, on_wait):
+                    queue_placeholder.empty()
+                    with span("app.video"):
+                        stats = process_video(input_path, output_path, dict(st.session_state.makeup_options), smoothing, progress_callback=on_progress)
+                st.session_state.video_result_path, output_path = output_path, None # 결과 파일은 표시하는 동안 유지
+                st.session_state.video_stats = {**stats, "name": video_file.name}
+                st.success("✅ 동영상 처리 완료!")
+            except AdmissionRejected as e:
+                queue_placeholder.empty()
+                progress_bar.empty()
+                st.warning(f"⏳ {e} 잠시 후 다시 시도해주세요.")
+            except Exception as e:
+                st.error(f"동영상 처리 중 오류 발생: {e}")
+            finally:
+                for path in (input_path, output_path):
+                    if path and os.path.exists(path):
+                        os.remove(path)
+
+        video_path = st.session_state.video_result_path
+        if video_path and not os.path.exists(video_path): # 오래되어 정리된 결과
+            st.session_state.video_result_path = video_path = None
+        if video_path:
+            video_stats = st.session_state.video_stats
+            st.video(video_path)
+            st.caption(f"{video_stats['frames']} 프레임 ({video_stats['width']}x{video_stats['height']}) · 처리 {video_stats['seconds']:.1f}초 · "
+                       f"{video_stats['fps']:.1f} fps ({video_stats['realtime_factor']:.2f}x 실시간) · 얼굴 감지 {video_stats['frames_with_faces']} 프레임")
+            with open(video_path, "rb") as video_result_file:
+                st.download_button("💾 결과 다운로드", video_result_file, f"makeup_{os.path.splitext(video_stats['name'])[0]}.mp4", "video/mp4", use_container_width=True)
+        else:
+            st.info("👈 동영상을 업로드하고 '동영상 처리' 버튼을 누르세요.")
 
 
 # --- 이미지 입력이 필요한 모드 ---
@@ -376,31 +838,35 @@ else: # 원본 이미지가 로드된 경우에만 실행
         with col1: # 옵션 설정
             st.subheader("필터 옵션")
             selected_style = st.selectbox("스타일 선택:", ["선택 안함"] + AVAILABLE_FASHION_STYLES, key="filter_style")
-            intensity = st.slider("효과 강도:", 0.0, 1.0, 0.7, 0.05, key="filter_intensity", help="0.0은 원본, 1.0은 최대 효과")
+            intensity = st.slider("효과 강도:", 0.0, 1.0, DEFAULT_FILTER_INTENSITY, 0.05, key="filter_intensity", help="0.0은 원본, 1.0은 최대 효과")
             apply_filter_btn = st.button("✨ 필터 적용", key="apply_filter", use_container_width=True, type="primary", disabled=(selected_style=="선택 안함"))
 
             if apply_filter_btn:
-                with st.spinner("🎨 필터 적용 중..."):
-                    try:
-                        st.session_state.filtered_image = apply_fashion_filter(st.session_state.original_image, selected_style, intensity)
-                        st.session_state.result_caption = f"{selected_style} 필터 (강도: {intensity:.2f})"
-                        st.success("✅ 필터 적용 완료!")
-                    except Exception as e:
-                        st.error(f"필터 적용 중 오류 발생: {e}")
-                        st.session_state.filtered_image = None # 오류 시 결과 초기화
+                try:
+                    result_img, _, stack_suffix = render_with_pipeline("filter", "filter", {"style": selected_style, "intensity": intensity}, "🎨 필터 적용 중...")
+                    set_session_image("filtered_image", result_img)
+                    st.session_state.result_caption = f"{selected_style} 필터 (강도: {intensity:.2f}){stack_suffix}"
+                    st.success("✅ 필터 적용 완료!")
+                except AdmissionRejected as e:
+                    st.warning(f"⏳ {e} 잠시 후 다시 시도해주세요.") # 이전 결과는 유지
+                except Exception as e:
+                    st.error(f"필터 적용 중 오류 발생: {e}")
+                    set_session_image("filtered_image", None) # 오류 시 결과 초기화
 
         with col2: # 결과 표시
             st.subheader("결과 미리보기")
             if st.session_state.filtered_image:
-                image_comparison(
-                    img1=st.session_state.original_image,
-                    img2=st.session_state.filtered_image,
-                    label1="원본",
-                    label2=st.session_state.result_caption,
-                    width=700, # 비교 컴포넌트 너비
-                    starting_position=50,
-                    show_labels=True
-                )
+                with span("app.image_comparison"):
+                    image_comparison(
+                        img1=get_display_image(st.session_state.original_image, COMPARISON_WIDTH),
+                        img2=get_display_image(st.session_state.filtered_image, COMPARISON_WIDTH),
+                        label1="원본",
+                        label2=st.session_state.result_caption,
+                        width=COMPARISON_WIDTH, # 비교 컴포넌트 너비
+                        starting_position=50,
+                        show_labels=True,
+                        in_memory=True # 임시 파일(temp/) 대신 메모리에서 인코딩
+                    )
                 # 결과 저장 버튼
                 st.divider()
                 save_col1, save_col2 = st.columns(2)
@@ -408,22 +874,23 @@ else: # 원본 이미지가 로드된 경우에만 실행
                     try:
                         buf = io.BytesIO()
                         save_img_fil = st.session_state.filtered_image.convert('RGB') if st.session_state.filtered_image.mode == 'RGBA' else st.session_state.filtered_image
-                        save_img_fil.save(buf, format="PNG")
+                        with span("app.png_encode"):
+                            save_img_fil.save(buf, format="PNG")
                         st.download_button("💾 결과 다운로드", buf.getvalue(), f"filter_{st.session_state.result_caption.replace(' ', '_').replace(':', '_').replace('/', '_')}.png", "image/png", use_container_width=True)
                     except Exception as e:
                         st.error(f"파일 저장 준비 중 오류: {e}")
                 with save_col2:
                      if st.button("🖼️ 갤러리에 저장", key="save_filter_gallery", use_container_width=True):
-                         st.session_state.gallery.append({'image': st.session_state.filtered_image, 'caption': st.session_state.result_caption})
+                         GALLERY.add(GALLERY_OWNER, st.session_state.filtered_image, st.session_state.result_caption)
                          st.success("갤러리에 저장됨!")
             elif apply_filter_btn: # 버튼은 눌렀지만 결과가 없을 때 (오류 발생 등)
                 st.info("필터 적용 결과를 기다리거나 적용에 실패했습니다.")
-                st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
             elif selected_style != "선택 안함":
                 st.info("👈 '필터 적용' 버튼을 눌러 결과를 확인하세요.")
-                st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
             else:
-                 st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                 st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
 
 
     # --- 💄 메이크업 모드 ---
@@ -463,55 +930,59 @@ else: # 원본 이미지가 로드된 경우에만 실행
                                                            st.session_state.makeup_options['apply_blush']))
 
                 if apply_makeup_btn:
-                    with st.spinner("🧠 얼굴 분석 및 메이크업 적용 중..."):
-                        try:
-                            result_img, success = apply_makeup(st.session_state.original_image, st.session_state.makeup_options)
-                            if success:
-                                st.session_state.makeup_image = result_img
-                                applied_list = [k.split('_')[1].capitalize() for k, v in st.session_state.makeup_options.items() if k.startswith('apply_') and v]
-                                st.session_state.result_caption = f"직접 메이크업 ({', '.join(applied_list)})"
-                                st.success("✅ 메이크업 적용 완료!")
-                            else:
-                                st.error("⚠️ 얼굴 감지 실패 또는 메이크업 적용에 문제가 발생했습니다.")
-                                # Optionally keep the previous makeup image or reset it
-                                # st.session_state.makeup_image = None
-                        except Exception as e:
-                             st.error(f"메이크업 적용 중 오류 발생: {e}")
-                             st.session_state.makeup_image = None
+                    try:
+                        result_img, success, stack_suffix = render_with_pipeline("makeup", "makeup", dict(st.session_state.makeup_options), "🧠 얼굴 분석 및 메이크업 적용 중...")
+                        if success:
+                            set_session_image("makeup_image", result_img)
+                            applied_list = [k.split('_')[1].capitalize() for k, v in st.session_state.makeup_options.items() if k.startswith('apply_') and v]
+                            st.session_state.result_caption = f"직접 메이크업 ({', '.join(applied_list)}){stack_suffix}"
+                            st.success("✅ 메이크업 적용 완료!")
+                        else:
+                            st.error("⚠️ 얼굴 감지 실패 또는 메이크업 적용에 문제가 발생했습니다.")
+                            # Optionally keep the previous makeup image or reset it
+                            # st.session_state.makeup_image = None
+                    except AdmissionRejected as e:
+                         st.warning(f"⏳ {e} 잠시 후 다시 시도해주세요.") # 이전 결과는 유지
+                    except Exception as e:
+                         st.error(f"메이크업 적용 중 오류 발생: {e}")
+                         set_session_image("makeup_image", None)
 
             with col2_mu: # 결과 표시
                 st.subheader("결과 미리보기 (직접)")
                 # 결과 표시 조건 수정: 현재 모드가 '메이크업'이고, '직접 메이크업' 결과가 있을 때
                 if st.session_state.makeup_image and st.session_state.result_caption.startswith("직접 메이크업"):
-                    image_comparison(
-                        img1=st.session_state.original_image,
-                        img2=st.session_state.makeup_image,
-                        label1="원본",
-                        label2=st.session_state.result_caption,
-                        width=700,
-                        starting_position=50,
-                        show_labels=True
-                    )
+                    with span("app.image_comparison"):
+                        image_comparison(
+                            img1=get_display_image(st.session_state.original_image, COMPARISON_WIDTH),
+                            img2=get_display_image(st.session_state.makeup_image, COMPARISON_WIDTH),
+                            label1="원본",
+                            label2=st.session_state.result_caption,
+                            width=COMPARISON_WIDTH,
+                            starting_position=50,
+                            show_labels=True,
+                            in_memory=True
+                        )
                     st.divider()
                     save_col1, save_col2 = st.columns(2)
                     with save_col1:
                         try:
                             buf = io.BytesIO()
                             save_img_mu = st.session_state.makeup_image.convert('RGB') if st.session_state.makeup_image.mode == 'RGBA' else st.session_state.makeup_image
-                            save_img_mu.save(buf, format="PNG")
+                            with span("app.png_encode"):
+                                save_img_mu.save(buf, format="PNG")
                             st.download_button("💾 결과 다운로드", buf.getvalue(), f"makeup_manual_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png", "image/png", use_container_width=True)
                         except Exception as e:
                             st.error(f"파일 저장 준비 중 오류: {e}")
                     with save_col2:
                         if st.button("🖼️ 갤러리에 저장", key="save_makeup_gallery", use_container_width=True):
-                            st.session_state.gallery.append({'image': st.session_state.makeup_image, 'caption': st.session_state.result_caption})
+                            GALLERY.add(GALLERY_OWNER, st.session_state.makeup_image, st.session_state.result_caption)
                             st.success("갤러리에 저장됨!")
                 elif apply_makeup_btn: # 버튼 눌렀는데 아직 결과가 없다면 (오류 상황 등)
                     st.info("메이크업 결과를 기다리는 중이거나 적용에 실패했습니다.")
-                    st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                    st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
                 else:
                      st.info("👈 옵션을 선택하고 '메이크업 적용' 버튼을 누르세요.")
-                     st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                     st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
 
         # --- ✨ 스타일 전송 탭 ---
         with tab_transfer:
@@ -533,7 +1004,7 @@ else: # 원본 이미지가 로드된 경우에만 실행
                 if selected_style_name and selected_style_name != "스타일 선택...":
                     style_image_pil = RESOURCES["makeup_styles"].get(selected_style_name)
                     if style_image_pil:
-                        st.image(style_image_pil, caption=f"선택된 스타일: {selected_style_name}", use_container_width=True)
+                        st.image(get_display_bytes(style_image_pil, SIDE_PANEL_WIDTH), caption=f"선택된 스타일: {selected_style_name}", use_container_width=True)
                         # 스타일 설명 표시 (있으면)
                         style_info = MAKEUP_STYLES_INFO.get(selected_style_name)
                         if style_info:
@@ -550,54 +1021,58 @@ else: # 원본 이미지가 로드된 경우에만 실행
                 )
 
                 if apply_transfer_btn and style_image_pil:
-                    with st.spinner("🎨 스타일 분석 및 메이크업 전송 중..."):
-                        try:
-                            result_img, success = apply_makeup_transfer(st.session_state.original_image, style_image_pil)
-                            if success:
-                                st.session_state.makeup_image = result_img # 결과 이미지 업데이트 (메이크업 모드 공통 사용)
-                                st.session_state.result_caption = f"메이크업 스타일 전송: {selected_style_name}"
-                                st.success("✅ 메이크업 스타일 전송 완료!")
-                            else:
-                                st.error("⚠️ 얼굴 감지 실패 또는 스타일 전송에 문제가 발생했습니다.")
-                                # Optionally keep the previous makeup image or reset it
-                                # st.session_state.makeup_image = None
-                        except Exception as e:
-                            st.error(f"메이크업 전송 중 오류 발생: {e}")
-                            st.session_state.makeup_image = None
+                    try:
+                        result_img, success, stack_suffix = render_with_pipeline("makeup", "makeup_transfer", {"style_image": style_image_pil}, "🎨 스타일 분석 및 메이크업 전송 중...")
+                        if success:
+                            set_session_image("makeup_image", result_img) # 결과 이미지 업데이트 (메이크업 모드 공통 사용)
+                            st.session_state.result_caption = f"메이크업 스타일 전송: {selected_style_name}{stack_suffix}"
+                            st.success("✅ 메이크업 스타일 전송 완료!")
+                        else:
+                            st.error("⚠️ 얼굴 감지 실패 또는 스타일 전송에 문제가 발생했습니다.")
+                            # Optionally keep the previous makeup image or reset it
+                            # st.session_state.makeup_image = None
+                    except AdmissionRejected as e:
+                        st.warning(f"⏳ {e} 잠시 후 다시 시도해주세요.") # 이전 결과는 유지
+                    except Exception as e:
+                        st.error(f"메이크업 전송 중 오류 발생: {e}")
+                        set_session_image("makeup_image", None)
 
             with col2_tr:
                 st.subheader("결과 미리보기 (스타일 전송)")
                 # 결과 표시 조건 수정: 현재 모드가 '메이크업'이고, '스타일 전송' 결과가 있을 때
                 if st.session_state.makeup_image and st.session_state.result_caption.startswith("메이크업 스타일 전송"):
-                    image_comparison(
-                        img1=st.session_state.original_image,
-                        img2=st.session_state.makeup_image,
-                        label1="원본",
-                        label2=st.session_state.result_caption,
-                        width=700,
-                        starting_position=50,
-                        show_labels=True
-                    )
+                    with span("app.image_comparison"):
+                        image_comparison(
+                            img1=get_display_image(st.session_state.original_image, COMPARISON_WIDTH),
+                            img2=get_display_image(st.session_state.makeup_image, COMPARISON_WIDTH),
+                            label1="원본",
+                            label2=st.session_state.result_caption,
+                            width=COMPARISON_WIDTH,
+                            starting_position=50,
+                            show_labels=True,
+                            in_memory=True
+                        )
                     st.divider()
                     save_col1_tr, save_col2_tr = st.columns(2)
                     with save_col1_tr:
                         try:
                             buf = io.BytesIO()
                             save_img_tr = st.session_state.makeup_image.convert('RGB') if st.session_state.makeup_image.mode == 'RGBA' else st.session_state.makeup_image
-                            save_img_tr.save(buf, format="PNG")
+                            with span("app.png_encode"):
+                                save_img_tr.save(buf, format="PNG")
                             st.download_button("💾 결과 다운로드", buf.getvalue(), f"makeup_transfer_{selected_style_name}.png", "image/png", use_container_width=True)
                         except Exception as e:
                              st.error(f"파일 저장 준비 중 오류: {e}")
                     with save_col2_tr:
                         if st.button("🖼️ 갤러리에 저장", key="save_transfer_gallery", use_container_width=True):
-                            st.session_state.gallery.append({'image': st.session_state.makeup_image, 'caption': st.session_state.result_caption})
+                            GALLERY.add(GALLERY_OWNER, st.session_state.makeup_image, st.session_state.result_caption)
                             st.success("갤러리에 저장됨!")
                 elif apply_transfer_btn: # 버튼 눌렀는데 결과가 없다면
                     st.info("스타일 전송 결과를 기다리는 중이거나 적용에 실패했습니다.")
-                    st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                    st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
                 else:
                      st.info("👈 참고할 스타일을 선택하고 '스타일 적용하기' 버튼을 누르세요.")
-                     st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                     st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
 
 
     # --- 👕 가상 피팅 모드 ---
@@ -625,7 +1100,7 @@ else: # 원본 이미지가 로드된 경우에만 실행
             if selected_clothing_type and selected_clothing_type != "의상 선택...":
                 clothing_image_pil = RESOURCES["clothing"].get(selected_clothing_type)
                 if clothing_image_pil:
-                    st.image(clothing_image_pil, caption=f"선택된 의상: {selected_clothing_type}", use_container_width=True)
+                    st.image(get_display_bytes(clothing_image_pil, SIDE_PANEL_WIDTH), caption=f"선택된 의상: {selected_clothing_type}", use_container_width=True)
                     st.session_state.tryon_options['selected_clothing'] = selected_clothing_type # 선택된 의상 저장
                 else:
                     st.error(f"'{selected_clothing_type}' 의상 이미지를 로드할 수 없습니다.")
@@ -666,62 +1141,149 @@ else: # 원본 이미지가 로드된 경우에만 실행
             )
 
             if apply_tryon_btn and clothing_image_pil:
-                with st.spinner("👔 의상 위치 조정 및 합성 중..."):
-                    try:
-                        current_clothing_img = clothing_image_pil.copy()
-                        caption_suffix = ""
-
-                        # 색상 변경 적용
-                        if st.session_state.tryon_options['color_change']:
-                            target_color = st.session_state.tryon_options['target_color']
-                            current_clothing_img = change_clothing_color(current_clothing_img, target_color)
-                            caption_suffix += f" (색상: {target_color})"
-                            # st.info(f"의상 색상을 {target_color}(으)로 변경합니다.") # 스피너 중에 표시 잘 안될 수 있음
-
-                        # 가상 피팅 적용
-                        position = (st.session_state.tryon_options['pos_x'], st.session_state.tryon_options['pos_y'])
-                        scale = st.session_state.tryon_options['scale']
-                        result_img = virtual_try_on(st.session_state.original_image, current_clothing_img, position, scale)
-
-                        st.session_state.tryon_image = result_img
-                        st.session_state.result_caption = f"가상 피팅: {selected_clothing_type}{caption_suffix}"
-                        st.success("✅ 가상 피팅 적용 완료!")
-
-                    except Exception as e:
-                        st.error(f"가상 피팅 중 오류 발생: {e}")
-                        st.session_state.tryon_image = None
+                try:
+                    caption_suffix = ""
+                    tryon_params = {
+                        "garment": clothing_image_pil,
+                        "position": (st.session_state.tryon_options['pos_x'], st.session_state.tryon_options['pos_y']),
+                        "scale": st.session_state.tryon_options['scale'],
+                    }
+
+                    # 색상 변경 적용 (파이프라인 안에서 변경된 의상도 캐시)
+                    if st.session_state.tryon_options['color_change']:
+                        target_color = st.session_state.tryon_options['target_color']
+                        tryon_params["color"] = target_color
+                        caption_suffix += f" (색상: {target_color})"
+
+                    # 가상 피팅 적용
+                    result_img, _, stack_suffix = render_with_pipeline("tryon", "tryon", tryon_params, "👔 의상 위치 조정 및 합성 중...")
+
+                    set_session_image("tryon_image", result_img)
+                    st.session_state.result_caption = f"가상 피팅: {selected_clothing_type}{caption_suffix}{stack_suffix}"
+                    st.success("✅ 가상 피팅 적용 완료!")
+
+                except AdmissionRejected as e:
+                    st.warning(f"⏳ {e} 잠시 후 다시 시도해주세요.") # 이전 결과는 유지
+                except Exception as e:
+                    st.error(f"가상 피팅 중 오류 발생: {e}")
+                    set_session_image("tryon_image", None)
 
         with col2_vt: # 결과 표시
             st.subheader("결과 미리보기")
             if st.session_state.tryon_image:
-                image_comparison(
-                    img1=st.session_state.original_image,
-                    img2=st.session_state.tryon_image,
-                    label1="원본",
-                    label2=st.session_state.result_caption,
-                    width=700,
-                    starting_position=50,
-                    show_labels=True
-                )
+                with span("app.image_comparison"):
+                    image_comparison(
+                        img1=get_display_image(st.session_state.original_image, COMPARISON_WIDTH),
+                        img2=get_display_image(st.session_state.tryon_image, COMPARISON_WIDTH),
+                        label1="원본",
+                        label2=st.session_state.result_caption,
+                        width=COMPARISON_WIDTH,
+                        starting_position=50,
+                        show_labels=True,
+                        in_memory=True
+                    )
                 st.divider()
                 save_col1_vt, save_col2_vt = st.columns(2)
                 with save_col1_vt:
                     try:
                         buf = io.BytesIO()
                         save_img_vt = st.session_state.tryon_image.convert('RGB') if st.session_state.tryon_image.mode == 'RGBA' else st.session_state.tryon_image
-                        save_img_vt.save(buf, format="PNG")
+                        with span("app.png_encode"):
+                            save_img_vt.save(buf, format="PNG")
                         st.download_button("💾 결과 다운로드", buf.getvalue(), f"tryon_{selected_clothing_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png", "image/png", use_container_width=True)
                     except Exception as e:
                         st.error(f"파일 저장 준비 중 오류: {e}")
                 with save_col2_vt:
                     if st.button("🖼️ 갤러리에 저장", key="save_tryon_gallery", use_container_width=True):
-                        st.session_state.gallery.append({'image': st.session_state.tryon_image, 'caption': st.session_state.result_caption})
+                        GALLERY.add(GALLERY_OWNER, st.session_state.tryon_image, st.session_state.result_caption)
                         st.success("갤러리에 저장됨!")
             elif apply_tryon_btn: # 버튼 눌렀는데 결과가 없다면
                 st.info("가상 피팅 결과를 기다리는 중이거나 적용에 실패했습니다.")
-                st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
             else:
                  st.info("👈 의상을 선택하고 옵션을 조정한 뒤 '가상 피팅 적용' 버튼을 누르세요.")
-                 st.image(st.session_state.original_image, caption="원본 이미지", width=400)
+                 st.image(get_display_bytes(st.session_state.original_image, PREVIEW_WIDTH), caption="원본 이미지", width=PREVIEW_WIDTH)
+
+
+# --- 🩺 성능 계측 디버그 패널 (AI_STYLER_METRICS=1 일 때만 표시) ---
+if metrics.ENABLED:
+    metrics.record("app.script_run", time.perf_counter() - SCRIPT_RUN_STARTED)
+    metrics.write_prometheus() # AI_STYLER_METRICS_FILE 이 설정된 경우에만 기록
+    with st.expander("🩺 성능 계측 (디버그)", expanded=False):
+        summary = metrics.snapshot()
+        if summary:
+            st.dataframe(
+                [
+                    {
+                        "구간": name,
+                        "횟수": s["count"],
+                        "평균(ms)": round(s["mean_s"] * 1000, 1),
+                        "p50(ms)": round(s["p50_s"] * 1000, 1),
+                        "p95(ms)": round(s["p95_s"] * 1000, 1),
+                        "최대(ms)": round(s["max_s"] * 1000, 1),
+                        "합계(s)": round(s["total_s"], 2),
+                    }
+                    for name, s in summary.items()
+                ],
+                use_container_width=True, hide_index=True
+            )
+            st.caption("p50/p95는 히스토그램 버킷 상한 기준 근사값입니다. 프로세스 전체(모든 세션) 누적.")
+        else:
+            st.caption("아직 기록된 구간이 없습니다.")
+        budget = compute_budget.COMPUTE_BUDGET.stats()
+        st.caption(
+            f"코어 예산: {budget['busy']}/{budget['cores']} 코어 사용 중 (연산당 {compute_budget.THREADS_PER_CALL} 스레드), "
+            f"대기 {budget['queued']}건 (최대 {budget['peak_queued']}), 실행 {budget['runs']}회 중 대기 {budget['waited']}회, "
+            f"최대 대기 {budget['max_wait_seconds'] * 1000:.0f}ms, 사용률 {budget['utilization']:.0%}"
+        )
+        admission = ADMISSION.snapshot()
+        st.caption(
+            f"입장 제어: 실행 {admission['active']}/{admission['max_active']}건, 대기 {admission['queued']}건 "
+            f"({admission['queued_sessions']}세션, 예상 {admission['backlog_seconds']:.1f}초, 최대 {admission['peak_queued']}건), "
+            f"입장 {admission['admitted']}회 중 대기 {admission['waited']}회, 최대 대기 {admission['max_wait_seconds'] * 1000:.0f}ms, "
+            f"거절 {admission['rejected']}회, 미리보기 처리 {admission['degraded']}회 (정책: {admission['policy']}, 보정 x{admission['scale']:.2f})"
+        )
+        if WORKER_POOL is not None:
+            st.caption(f"워커 풀 ({WORKER_POOL.processes} 프로세스): {WORKER_POOL.stats}")
+        debug_col1, debug_col2 = st.columns(2)
+        with debug_col1:
+            st.download_button("📥 Prometheus 텍스트", metrics.prometheus_text(), "ai_styler_metrics.prom", "text/plain", use_container_width=True)
+        with debug_col2:
+            if st.button("🧹 계측 초기화", key="reset_metrics", use_container_width=True):
+                metrics.reset()
+                st.rerun()
+
+
+# --- 🔥 백그라운드 워밍업 (첫 화면을 그린 뒤, 프로세스당 한 번) ---
+# AI_STYLER_WARMUP=0 이면 끄고, 각 모듈은 실제 사용 시점에 임포트됨
+WARMUP_ENABLED = os.environ.get("AI_STYLER_WARMUP", "1") != "0"
+
+def _background_warm_up():
+    started = time.perf_counter()
+    try:
+        with span("app.warm_up"):
+            if WORKER_POOL is None:
+                warm_up() # OpenCV/MediaPipe 임포트 + FaceMesh 생성 (워커 풀이 있으면 FaceMesh 는 워커에서만 사용)
+            import openai # noqa: F401
+            import streamlit_image_comparison # noqa: F401
+        print(f"Background warm-up finished in {time.perf_counter() - started:.2f}s.")
+    except Exception as e:
+        print(f"Background warm-up failed: {e}")
+
+@st.cache_resource
+def start_background_warm_up():
+    thread = threading.Thread(target=_background_warm_up, name="ai-styler-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+if WARMUP_ENABLED:
+    start_background_warm_up()
+
+# --- 🔥 예제 캐시 워밍업 (예제 디코딩 + 랜드마크 + 기본 필터/메이크업 결과를 공유 캐시에 미리 준비) ---
+# AI_STYLER_EXAMPLE_WARMUP=0 이면 끄고, 첫 사용자가 예제마다 직접 계산
+EXAMPLE_WARMUP_ENABLED = WARMUP_ENABLED and os.environ.get("AI_STYLER_EXAMPLE_WARMUP", "1") != "0"
+
+if EXAMPLE_WARMUP_ENABLED and RESOURCES["examples"]:
+    EXAMPLE_WARMUP.start()
 
 # --- END OF FILE app.py ---
\ No newline at end of file
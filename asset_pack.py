@@ -0,0 +1,273 @@
+# --- START OF FILE asset_pack.py ---
+"""
+디코딩된 에셋 팩 - 의상/메이크업 스타일 이미지를 RGBA 원시 픽셀로 한 파일에 모아 두고 읽기 전용 메모리 맵으로 사용
+
+같은 호스트의 여러 서버 프로세스(Streamlit 복제본, 워커)가 같은 파일을 매핑하면 픽셀은 OS 페이지 캐시에
+한 번만 올라가고, 시작 시 이미지 디코딩도 하지 않음.
+
+파일 구조:
+    MAGIC(8바이트) | 인덱스 길이(8바이트, little-endian) | 인덱스 JSON | (페이지 정렬) 픽셀 버퍼들
+    픽셀 버퍼 오프셋은 인덱스 뒤 첫 정렬 위치(data_start) 기준
+    인덱스: {"version", "sources": {폴더: {파일명: [mtime_ns, size]}}, "groups": {그룹: {이름: {offset, width, height, mode}}}}
+    의상(clothing) 그룹은 prepare_garment 로 전처리한 premultiplied 픽셀 (배경 제거 + 크롭) 이고 항목에 garment_offset 과
+    premultiplied 표시가 추가됨. 모드는 "RGBA" 로 기록 - PIL 은 RGBa 버퍼를 메모리 맵으로 쓰지 못하고 복사하므로,
+    RGBA 로 맵한 뒤 info 의 premultiplied 표시로 구분 (virtual_try_on 등이 그대로 premultiplied 로 사용)
+
+앱은 팩을 만들지 않음 (서버 프로세스에서 모든 의상을 디코딩/전처리하지 않도록) - 없거나 오래된 팩이면 파일별 로드로 대체하므로
+배포/에셋 변경 시 build 를 먼저 실행.
+
+사용 예:
+    python asset_pack.py build               # assets/ 로부터 .cache/assets.pack 생성 (배포 시 미리 생성)
+    python asset_pack.py build --if-stale    # 없거나 원본이 바뀐 경우에만 생성
+    python asset_pack.py info
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: # Windows - 잠금 없이 임시 파일 + 교체만으로 보호
+    fcntl = None
+
+from PIL import Image
+
+from utils import GARMENT_OFFSET_KEY, PREMULTIPLIED_KEY, prepare_garment
+
+MAGIC = b"AIPACK01"
+PACK_VERSION = 3 # 2: 의상 그룹을 전처리된 RGBa 로 저장, 3: premultiplied 의상을 RGBA 모드 + 표시로 저장 (복사 없는 맵)
+ALIGNMENT = 4096 # 이미지 버퍼 시작 위치 정렬 (페이지 단위)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+DEFAULT_PACK_PATH = os.path.join(".cache", "assets.pack")
+DEFAULT_GROUPS = {
+    "clothing": os.path.join("assets", "clothes"),
+    "makeup_styles": os.path.join("assets", "makeup_styles"),
+}
+GARMENT_GROUPS = ("clothing",) # 가상 피팅 의상 그룹 - 팩을 만들 때 전처리 (피팅 요청마다 하지 않음)
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _data_start(index_length):
+    return _align(len(MAGIC) + 8 + index_length)
+
+
+def _image_files(folder):
+    """폴더의 이미지 파일 {파일명: [mtime_ns, size]} (빈 파일 제외, 폴더가 없으면 빈 dict)"""
+    if not os.path.isdir(folder):
+        return {}
+    files = {}
+    for filename in sorted(os.listdir(folder)):
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            stat = os.stat(os.path.join(folder, filename))
+            if stat.st_size > 0:
+                files[filename] = [stat.st_mtime_ns, stat.st_size]
+    return files
+
+
+def source_signature(groups):
+    """원본 폴더 상태 (팩이 최신인지 비교용)"""
+    return {folder: _image_files(folder) for folder in groups.values()}
+
+
+@contextmanager
+def _build_lock(pack_path):
+    """같은 팩을 여러 프로세스가 동시에 만들지 않도록 {pack_path}.lock 에 배타 잠금"""
+    folder = os.path.dirname(pack_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(f"{pack_path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def build_asset_pack(pack_path=DEFAULT_PACK_PATH, groups=None):
+    """원본 폴더들의 이미지를 RGBA로 디코딩해 팩 파일 생성 (잠금 아래 임시 파일에 쓴 뒤 교체 - 다른 프로세스와 경쟁해도 안전)
+
+    Args:
+        pack_path (str): 출력 경로
+        groups (dict): {그룹 이름: 폴더 경로} (None이면 DEFAULT_GROUPS)
+
+    Returns:
+        dict: 기록한 인덱스
+    """
+    with _build_lock(pack_path):
+        return _build(pack_path, groups or DEFAULT_GROUPS)
+
+
+def _build(pack_path, groups):
+    """build_asset_pack 본체 (_build_lock 보유 상태에서 호출)"""
+    sources = source_signature(groups)
+    decoded = {}
+    for group, folder in groups.items():
+        decoded[group] = {}
+        for filename in sources[folder]:
+            try:
+                img = Image.open(os.path.join(folder, filename)).convert('RGBA')
+            except Exception as e:
+                print(f"Failed to load image for asset pack: {filename}, Error: {e}")
+                continue
+            if group in GARMENT_GROUPS:
+                img = prepare_garment(img)
+            decoded[group][os.path.splitext(filename)[0]] = img # 파일명이 스타일 이름 (load_images_from_folder 와 동일)
+
+    index = {"version": PACK_VERSION, "sources": sources, "groups": {}}
+    relative = 0
+    for group, images in decoded.items():
+        index["groups"][group] = {}
+        for name, img in images.items():
+            entry = {"offset": relative, "width": img.width, "height": img.height, "mode": img.mode}
+            if img.mode == "RGBa": # 바이트는 premultiplied 그대로, 모드만 맵 가능한 RGBA 로
+                entry["mode"] = "RGBA"
+                entry[PREMULTIPLIED_KEY] = True
+            if GARMENT_OFFSET_KEY in img.info:
+                entry[GARMENT_OFFSET_KEY] = list(img.info[GARMENT_OFFSET_KEY])
+            index["groups"][group][name] = entry
+            relative = _align(relative + img.width * img.height * 4)
+    index_bytes = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    data_start = _data_start(len(index_bytes))
+
+    folder = os.path.dirname(pack_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{pack_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(index_bytes)))
+            f.write(index_bytes)
+            for group, images in decoded.items():
+                for name, img in images.items():
+                    f.seek(data_start + index["groups"][group][name]["offset"])
+                    f.write(img.tobytes())
+            f.truncate(max(f.tell(), data_start)) # 이미지가 없어도 헤더 크기는 유지
+        os.replace(tmp_path, pack_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    count = sum(len(images) for images in decoded.values())
+    print(f"Built asset pack: {pack_path} ({count} images, {os.path.getsize(pack_path) / 1024**2:.1f}MB)")
+    return index
+
+
+class AssetPack:
+    """읽기 전용 메모리 맵 에셋 팩 - 이미지는 맵 위에 복사 없이 만든 PIL Image (readonly, 수정하면 PIL이 사본을 만듦)"""
+
+    def __init__(self, pack_path):
+        self.pack_path = pack_path
+        with open(pack_path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not an asset pack: {pack_path}")
+            (index_length,) = struct.unpack("<Q", f.read(8))
+            self.index = json.loads(f.read(index_length).decode("utf-8"))
+            self.data_start = _data_start(index_length)
+            if self.index.get("version") != PACK_VERSION:
+                raise ValueError(f"Unsupported asset pack version: {self.index.get('version')}")
+            # 파일을 닫아도 맵은 유지됨. 이미지가 맵을 참조하므로 프로세스가 끝날 때까지 닫지 않음
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._images = {}
+
+    def is_stale(self, groups=None):
+        """원본 폴더가 팩을 만든 뒤 바뀌었는지 (파일 추가/삭제/수정)"""
+        return self.index.get("sources") != source_signature(groups or DEFAULT_GROUPS)
+
+    def image(self, group, name):
+        """그룹의 이미지 (없으면 None)"""
+        key = (group, name)
+        if key not in self._images:
+            entry = self.index["groups"].get(group, {}).get(name)
+            if entry is None:
+                return None
+            start = self.data_start + entry["offset"]
+            size = (entry["width"], entry["height"])
+            nbytes = size[0] * size[1] * len(entry["mode"])
+            img = Image.frombuffer(entry["mode"], size, self._view[start:start + nbytes], "raw", entry["mode"], 0, 1)
+            if GARMENT_OFFSET_KEY in entry:
+                img.info[GARMENT_OFFSET_KEY] = tuple(entry[GARMENT_OFFSET_KEY])
+            if entry.get(PREMULTIPLIED_KEY):
+                img.info[PREMULTIPLIED_KEY] = True
+            self._images[key] = img
+        return self._images[key]
+
+    def images(self, group):
+        """그룹의 모든 이미지 {이름: PIL Image} (prepare_clothing_samples 등과 같은 모양)"""
+        return {name: self.image(group, name) for name in self.index["groups"].get(group, {})}
+
+    @property
+    def nbytes(self):
+        return len(self._map)
+
+
+def open_asset_pack(pack_path=DEFAULT_PACK_PATH, groups=None, rebuild=False):
+    """최신 팩이면 AssetPack 반환, 없거나 원본이 바뀌었으면 None
+
+    rebuild=True 면 대신 잠금 아래 다시 만든 뒤 반환 (오프라인 도구용 - 잠금을 기다리는 동안 다른 프로세스가 만들었으면 그대로 사용).
+    """
+    groups = groups or DEFAULT_GROUPS
+    pack, problem = _open_if_fresh(pack_path, groups)
+    if pack is not None:
+        return pack
+    if not rebuild:
+        print(f"{problem}: {pack_path} (build it with: python asset_pack.py build)")
+        return None
+    with _build_lock(pack_path):
+        pack, problem = _open_if_fresh(pack_path, groups)
+        if pack is None:
+            print(f"{problem}, rebuilding: {pack_path}")
+            _build(pack_path, groups)
+            pack = AssetPack(pack_path)
+    return pack
+
+
+def _open_if_fresh(pack_path, groups):
+    """(최신 AssetPack, None) 또는 (None, 사용할 수 없는 이유)"""
+    if not os.path.exists(pack_path):
+        return None, "Asset pack not found"
+    try:
+        pack = AssetPack(pack_path)
+    except Exception as e:
+        return None, f"Failed to open asset pack ({e})"
+    if pack.is_stale(groups):
+        return None, "Asset pack is out of date"
+    return pack, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="디코딩된 에셋 팩 생성/확인")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--pack", default=DEFAULT_PACK_PATH, help="팩 파일 경로")
+    parser.add_argument("--if-stale", action="store_true", help="build: 없거나 원본이 바뀐 경우에만 생성")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if args.if_stale:
+            open_asset_pack(args.pack, rebuild=True)
+        else:
+            build_asset_pack(args.pack)
+        return 0
+    pack = AssetPack(args.pack)
+    print(f"{args.pack}: {pack.nbytes / 1024**2:.1f}MB, {'stale' if pack.is_stale() else 'up to date'}")
+    for group, entries in pack.index["groups"].items():
+        for name, entry in entries.items():
+            premultiplied = " (premultiplied)" if entry.get(PREMULTIPLIED_KEY) else ""
+            print(f"  {group:14s} {name:24s} {entry['width']}x{entry['height']} {entry['mode']}{premultiplied}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE asset_pack.py ---
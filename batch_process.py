@@ -0,0 +1,257 @@
+# --- START OF FILE batch_process.py ---
+"""
+헤드리스 일괄 처리 CLI - Streamlit 없이 폴더의 이미지들에 필터/메이크업/가상 피팅을 적용
+
+사용 예:
+    python batch_process.py portraits/ previews/ --filter vintage --makeup --garment assets/clothes/casual_tshirt.png --position 50 100 --scale 0.8
+    python batch_process.py portraits/ previews/ --spec catalog_spec.json --workers 8
+
+작업 명세(JSON) 형식 - 있는 단계만 아래 순서(필터 → 메이크업 → 스타일 전송 → 가상 피팅)로 적용:
+    {
+      "filter": {"style": "vintage", "intensity": 0.7},
+      "makeup": {"apply_lips": true, "lip_color": "#E64E6B", "apply_eyeshadow": true, "intensity": 0.6},
+      "makeup_transfer": {"style_image": "assets/makeup_styles/Smoky_Eye.png"},
+      "tryon": {"garment": "assets/clothes/casual_tshirt.png", "position": [50, 100], "scale": 1.0, "color": "#FF5733"}
+    }
+
+중단 후 같은 명령을 다시 실행하면 출력 폴더의 매니페스트(_batch_manifest.jsonl)를 보고 이미 끝난 이미지는 건너뜀.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import compute_budget # numpy 임포트 전에 BLAS/OpenMP 스레드 수 고정 (spawn 워커가 환경 변수를 상속)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+MANIFEST_NAME = "_batch_manifest.jsonl"
+
+# 앱의 기본 메이크업 옵션과 동일
+DEFAULT_MAKEUP_OPTIONS = {
+    'intensity': 0.6, 'apply_lips': True, 'lip_color': '#E64E6B', 'lip_intensity': 0.7,
+    'apply_eyeshadow': True, 'eyeshadow_color': '#8A5A94', 'eyeshadow_intensity': 0.5,
+    'apply_blush': False, 'blush_color': '#F08080', 'blush_intensity': 0.4,
+}
+
+# --- 워커 프로세스 상태 (프로세스마다 한 번 초기화) ---
+_worker = {}
+
+
+def load_references(spec):
+    """명세의 의상/스타일 참조 이미지를 한 번만 읽고 준비 (garment, style_image) - 잘못된 경로는 풀 시작 전에 실패
+
+    Raises:
+        OSError: 파일이 없거나 이미지로 읽을 수 없는 경우
+    """
+    import utils
+    from PIL import Image
+    garment = style_image = None
+    if "tryon" in spec:
+        tryon = spec["tryon"]
+        with Image.open(tryon["garment"]) as garment_file:
+            garment = utils.prepare_garment(garment_file.convert("RGBA")) # 배경 제거/크롭은 부모에서 한 번
+        if tryon.get("color"):
+            garment = utils.change_clothing_color(garment, tryon["color"])
+    if "makeup_transfer" in spec:
+        with Image.open(spec["makeup_transfer"]["style_image"]) as style_file:
+            style_image = style_file.convert("RGB")
+    return garment, style_image
+
+
+def _init_worker(spec, garment, style_image):
+    """워커 초기화 - 프로세스별 FaceMesh 생성, 의상/스타일 이미지는 부모가 디코딩한 것을 받음"""
+    import utils
+    utils.warm_up() # 첫 이미지 처리 시간에 FaceMesh 생성 비용이 섞이지 않도록
+    _worker["utils"] = utils
+    _worker["spec"] = spec
+    _worker["garment"] = garment
+    _worker["style_image"] = style_image
+
+
+def render_image(img, spec, utils, garment=None, style_image=None):
+    """작업 명세에 따라 한 장의 이미지 처리 (결과 이미지, 경고 메시지 리스트)"""
+    warnings = []
+    if "filter" in spec:
+        f = spec["filter"]
+        img = utils.apply_fashion_filter(img, f.get("style", "casual"), f.get("intensity", 0.7))
+    if "makeup" in spec:
+        img, success = utils.apply_makeup(img, {**DEFAULT_MAKEUP_OPTIONS, **spec["makeup"]})
+        if not success:
+            warnings.append("makeup: face not detected")
+    if "makeup_transfer" in spec:
+        img, success = utils.apply_makeup_transfer(img, style_image)
+        if not success:
+            warnings.append("makeup_transfer: failed")
+    if "tryon" in spec:
+        t = spec["tryon"]
+        img = utils.virtual_try_on(img, garment, tuple(t.get("position", (0, 0))), t.get("scale", 1.0))
+    return img, warnings
+
+
+def _process_one(task):
+    """워커에서 실행 - 입력 한 장 처리 후 결과 저장 (임시 파일에 쓴 뒤 교체)"""
+    rel_path, input_path, output_path, output_format = task
+    started = time.perf_counter()
+    try:
+        img = _worker["utils"].load_image(input_path)
+        if img is None:
+            raise ValueError("이미지를 읽을 수 없습니다")
+        result, warnings = render_image(img, _worker["spec"], _worker["utils"], _worker.get("garment"), _worker.get("style_image"))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        save_kwargs = {"quality": 90} if output_format == "JPEG" else {}
+        result.convert("RGB").save(tmp_path, format=output_format, **save_kwargs)
+        os.replace(tmp_path, output_path)
+        return {"input": rel_path, "status": "ok", "warnings": warnings, "seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {"input": rel_path, "status": "error", "error": str(e), "seconds": time.perf_counter() - started}
+
+
+def spec_hash(spec):
+    """작업 명세 해시 - 명세가 바뀌면 이전 결과를 재사용하지 않음"""
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def load_manifest(manifest_path, current_spec_hash):
+    """같은 명세로 이미 성공한 입력(상대 경로) 집합"""
+    done = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue # 중단 시 잘린 마지막 줄 무시
+            if entry.get("spec") == current_spec_hash and entry.get("status") == "ok":
+                done.add(entry["input"])
+    return done
+
+
+def find_images(input_dir, exclude_dir=None):
+    """입력 폴더(하위 폴더 포함)의 이미지 상대 경로 목록 (정렬, 출력 폴더가 안에 있으면 제외)"""
+    paths = []
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude_dir]
+        for filename in files:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(root, filename), input_dir))
+    return sorted(paths)
+
+
+def output_paths(rel_paths, output_dir, extension):
+    """입력 상대 경로 -> 출력 경로 (확장자만 바꿈)
+
+    a.png 와 a.jpg 처럼 확장자를 바꾸면 같은 이름이 되는 입력은 원래 확장자를 이름에 남겨 구분 (a_png.png, a_jpg.png).
+    """
+    stems = {}
+    for rel in rel_paths:
+        stem = os.path.splitext(rel)[0].lower() # 대소문자 구분 없는 파일 시스템에서도 겹치지 않도록
+        stems[stem] = stems.get(stem, 0) + 1
+    paths = {}
+    for rel in rel_paths:
+        stem, source_ext = os.path.splitext(rel)
+        if stems[stem.lower()] > 1:
+            stem = f"{stem}_{source_ext[1:].lower()}"
+        paths[rel] = os.path.join(output_dir, f"{stem}.{extension}")
+    return paths
+
+
+def build_spec(args):
+    """--spec JSON과 개별 옵션을 합쳐 작업 명세 생성 (개별 옵션이 우선)"""
+    spec = {}
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+    if args.filter:
+        spec["filter"] = {"style": args.filter, "intensity": args.filter_intensity}
+    if args.makeup or args.makeup_options:
+        spec["makeup"] = json.loads(args.makeup_options) if args.makeup_options else {}
+    if args.makeup_style:
+        spec["makeup_transfer"] = {"style_image": args.makeup_style}
+    if args.garment:
+        spec["tryon"] = {"garment": args.garment, "position": list(args.position), "scale": args.scale}
+        if args.garment_color:
+            spec["tryon"]["color"] = args.garment_color
+    return spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI 스타일리스트 일괄 처리 (프로세스 풀)")
+    parser.add_argument("input_dir", help="입력 이미지 폴더")
+    parser.add_argument("output_dir", help="결과 저장 폴더 (입력과 같은 하위 구조)")
+    parser.add_argument("--spec", help="작업 명세 JSON 파일")
+    parser.add_argument("--filter", choices=["casual", "vintage", "elegant", "monochrome"], help="패션 필터 스타일")
+    parser.add_argument("--filter-intensity", type=float, default=0.7)
+    parser.add_argument("--makeup", action="store_true", help="기본 옵션으로 메이크업 적용")
+    parser.add_argument("--makeup-options", help="메이크업 옵션 JSON 문자열 (기본 옵션에 덮어씀)")
+    parser.add_argument("--makeup-style", help="메이크업 스타일 전송용 참조 이미지 경로")
+    parser.add_argument("--garment", help="가상 피팅 의상 이미지 경로")
+    parser.add_argument("--garment-color", help="의상 색상 변경 (#RRGGBB)")
+    parser.add_argument("--position", type=int, nargs=2, default=(0, 0), metavar=("X", "Y"))
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--format", choices=["png", "jpg"], default="png", help="출력 형식")
+    parser.add_argument("--workers", type=int, default=max(1, compute_budget.CORE_BUDGET // compute_budget.THREADS_PER_CALL),
+                        help="워커 프로세스 수 (기본: 코어 예산 / 연산당 스레드 수)")
+    parser.add_argument("--no-resume", action="store_true", help="매니페스트를 무시하고 모두 다시 처리")
+    args = parser.parse_args(argv)
+
+    spec = build_spec(args)
+    if not spec:
+        parser.error("적용할 작업이 없습니다. --spec 또는 --filter/--makeup/--makeup-style/--garment 중 하나 이상을 지정하세요.")
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"입력 폴더가 없습니다: {args.input_dir}")
+    try:
+        garment, style_image = load_references(spec)
+    except OSError as e:
+        parser.error(f"참조 이미지를 읽을 수 없습니다: {e}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    current_spec_hash = spec_hash(spec)
+    done = set() if args.no_resume else load_manifest(manifest_path, current_spec_hash)
+
+    output_format = "JPEG" if args.format == "jpg" else "PNG"
+    all_inputs = find_images(args.input_dir, exclude_dir=args.output_dir)
+    outputs = output_paths(all_inputs, args.output_dir, args.format)
+    tasks = [
+        (rel, os.path.join(args.input_dir, rel), outputs[rel], output_format)
+        for rel in all_inputs if rel not in done
+    ]
+    print(f"Found {len(all_inputs)} images, {len(all_inputs) - len(tasks)} already done, {len(tasks)} to process with {args.workers} workers.", flush=True)
+    if not tasks:
+        return 0
+
+    ok_count = error_count = 0
+    started = time.perf_counter()
+    # spawn: 부모 프로세스 상태(MediaPipe 그래프 등)를 물려받지 않고 워커마다 새로 초기화
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=args.workers, initializer=_init_worker, initargs=(spec, garment, style_image)) as pool, \
+            open(manifest_path, "a", encoding="utf-8") as manifest:
+        for i, result in enumerate(pool.imap_unordered(_process_one, tasks), start=1):
+            result["spec"] = current_spec_hash
+            manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+            manifest.flush() # 중단되어도 여기까지의 진행 상황 보존
+            if result["status"] == "ok":
+                ok_count += 1
+            else:
+                error_count += 1
+            elapsed = time.perf_counter() - started
+            detail = result.get("error") or "; ".join(result.get("warnings", []))
+            print(f"[{i}/{len(tasks)}] {result['status']:5s} {result['input']} ({result['seconds']:.2f}s) "
+                  f"| {i / elapsed:.2f} img/s{' | ' + detail if detail else ''}", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {ok_count} ok, {error_count} failed in {elapsed:.1f}s ({len(tasks) / elapsed:.2f} img/s).", flush=True)
+    return 1 if error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE batch_process.py ---
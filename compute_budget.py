@@ -0,0 +1,153 @@
+# --- START OF FILE compute_budget.py ---
+"""
+프로세스 CPU 코어 예산 - 라이브러리 스레드 수 고정 + 무거운 연산의 동시 실행 수 제한
+
+OpenCV/BLAS(NumPy)는 호출마다 자체 스레드 풀을 쓰므로, 세션이 많으면 코어 수보다 훨씬 많은 스레드가 경쟁해
+꼬리 지연이 커짐. 이 모듈은 두 가지로 이를 막음:
+- 라이브러리 스레드 수: 연산 하나가 쓰는 스레드를 THREADS_PER_CALL 개로 고정
+  (BLAS/OpenMP 는 환경 변수로 지정하고 워커 프로세스는 그대로 상속. 환경 변수는 라이브러리가 로드될 때만 읽히므로
+  이미 numpy 가 로드된 프로세스(streamlit run 은 앱 스크립트 전에 numpy 를 임포트함)에는 threadpoolctl 로 실행 중에 적용,
+  threadpoolctl 이 없으면 그 프로세스의 BLAS 는 제한되지 않음. cv2 는 lazy_module 로드 시점에 setNumThreads,
+  타일 엔진 스레드 수도 같은 값)
+- 코어 예산: compute_slot() 으로 감싼 연산은 사용 중 코어 + 요청 코어 <= CORE_BUDGET 일 때만 실행되고 나머지는 도착 순서대로 대기.
+  MediaPipe(FaceMesh)는 스레드 수를 바꾸는 API가 없으므로 감지 호출 자체를 예산 안에서 실행.
+  같은 스레드 안에서 중첩된 compute_slot() 은 바깥 슬롯을 그대로 사용 (단계 안의 랜드마크 감지 등 - 교착 없음)
+
+환경 변수:
+    AI_STYLER_CORE_BUDGET=N        동시에 쓸 코어 수 (기본: CPU 코어 수)
+    AI_STYLER_THREADS_PER_CALL=N   연산 하나가 쓰는 스레드 수 (기본: 2, 코어가 1개면 1)
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+# --- ⚙️ 코어 예산 설정 ---
+CORE_BUDGET = max(1, int(os.environ.get("AI_STYLER_CORE_BUDGET", os.cpu_count() or 1)))
+THREADS_PER_CALL = max(1, min(CORE_BUDGET, int(os.environ.get("AI_STYLER_THREADS_PER_CALL", 2))))
+# BLAS/OpenMP 구현별 스레드 수 환경 변수 (이미 지정되어 있으면 그 값을 존중)
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def limit_library_threads(threads=THREADS_PER_CALL):
+    """BLAS/OpenMP 스레드 수 제한 - 환경 변수 설정(이후 로드되는 라이브러리와 자식 프로세스) + 이미 로드된 라이브러리는 실행 중 적용
+
+    Returns:
+        bool: 현재 프로세스에 적용되었는지 (numpy 가 이미 로드되었고 threadpoolctl 이 없으면 False)
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    if "numpy" not in sys.modules:
+        return True # 환경 변수가 numpy(BLAS) 로드 시점에 적용됨
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        print("compute_budget: numpy was imported before thread limits were set and threadpoolctl is not installed; "
+              "BLAS limits apply to child processes only.")
+        return False
+    threadpool_limits(limits=threads) # with 문 없이 호출하면 프로세스 전체에 계속 적용
+    return True
+
+
+def configure_cv2(cv2_module):
+    """OpenCV 내부 병렬 처리 스레드 수 고정 (lazy_module 의 on_load 로 사용)"""
+    cv2_module.setNumThreads(THREADS_PER_CALL)
+
+
+class ComputeBudget:
+    """코어 단위 세마포어 - 요청 코어 수만큼 예산이 빌 때까지 도착 순서대로 대기 (큰 요청이 굶지 않음)
+
+    stats() 로 대기열 길이, 대기 시간, 사용률(예산 대비 사용 코어·초)을 읽을 수 있음.
+    AI_STYLER_METRICS=1 이면 대기 시간은 metrics 히스토그램 "budget.wait" 에도 기록.
+    """
+
+    def __init__(self, cores=CORE_BUDGET):
+        self.cores = max(1, int(cores))
+        self._cond = threading.Condition()
+        self._queue = deque()       # 대기 중인 요청 표식 (도착 순서)
+        self._local = threading.local()
+        self._busy = 0              # 현재 사용 중인 코어 수
+        self._started = time.perf_counter()
+        self._last_change = self._started
+        self._busy_seconds = 0.0    # 사용 코어 수를 시간에 대해 적분한 값
+        self._stats = {"runs": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "peak_queued": 0}
+
+    def _account(self, now):
+        self._busy_seconds += self._busy * (now - self._last_change)
+        self._last_change = now
+
+    @contextmanager
+    def slot(self, cores=1):
+        """with 문 안의 연산을 예산 안에서 실행 (중첩 호출은 바깥 슬롯 사용)"""
+        if getattr(self._local, "depth", 0):
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        cores = min(max(1, int(cores)), self.cores)
+        ticket = object()
+        requested = time.perf_counter()
+        with self._cond:
+            self._queue.append(ticket)
+            self._stats["peak_queued"] = max(self._stats["peak_queued"], len(self._queue))
+            while self._queue[0] is not ticket or self._busy + cores > self.cores:
+                self._cond.wait()
+            self._queue.popleft()
+            now = time.perf_counter()
+            self._account(now)
+            self._busy += cores
+            waited = now - requested
+            self._stats["runs"] += 1
+            self._stats["wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+            if waited >= 0.001:
+                self._stats["waited"] += 1
+            self._cond.notify_all() # 다음 대기자도 남은 예산에 들어갈 수 있음
+        if metrics.ENABLED:
+            metrics.record("budget.wait", waited)
+
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._cond:
+                self._account(time.perf_counter())
+                self._busy -= cores
+                self._cond.notify_all()
+
+    def stats(self):
+        """예산 현황 사본 {cores, busy, queued, peak_queued, runs, waited, wait_seconds, max_wait_seconds, utilization}"""
+        with self._cond:
+            now = time.perf_counter()
+            self._account(now)
+            elapsed = max(now - self._started, 1e-9)
+            return {
+                "cores": self.cores,
+                "busy": self._busy,
+                "queued": len(self._queue),
+                **self._stats,
+                "utilization": self._busy_seconds / (self.cores * elapsed),
+            }
+
+
+# 프로세스 전체에서 하나만 사용 (모든 세션/스레드 공유)
+COMPUTE_BUDGET = ComputeBudget()
+
+
+def compute_slot(cores=THREADS_PER_CALL):
+    """공유 예산의 슬롯 (기본은 연산 하나가 쓰는 스레드 수만큼 코어 요청)"""
+    return COMPUTE_BUDGET.slot(cores)
+
+
+limit_library_threads()
+
+# --- END OF FILE compute_budget.py ---
@@ -0,0 +1,81 @@
+# --- START OF FILE display.py ---
+
+import io
+import threading
+import weakref
+from collections import OrderedDict
+from PIL import Image
+
+from metrics import span
+
+# --- 🖥️ 화면 표시용 프록시 설정 ---
+# 화면에는 표시 너비에 맞춘 축소/압축본만 보내고, 원본 해상도는 다운로드에만 사용
+DISPLAY_JPEG_QUALITY = 85   # 표시용 JPEG 품질
+MAX_CACHED_PROXIES = 64     # 메모이즈할 (이미지, 너비) 조합 최대 개수
+
+_proxy_cache = OrderedDict() # (id(image), width) -> (proxy PIL Image, JPEG bytes)
+_tracked_images = set()      # 소멸 시 캐시 정리를 등록한 이미지 id
+_lock = threading.Lock()
+
+
+def _forget_image(image_id):
+    """원본 이미지가 GC되면 해당 이미지의 프록시를 모두 제거 (id 재사용으로 인한 오염 방지)"""
+    with _lock:
+        _tracked_images.discard(image_id)
+        for key in [k for k in _proxy_cache if k[0] == image_id]:
+            del _proxy_cache[key]
+
+
+def _build_proxy(img_pil, width):
+    """표시 너비에 맞춘 RGB 축소본과 JPEG 바이트 생성 (확대는 하지 않음)"""
+    if img_pil.mode == 'RGBA' and img_pil.info.get("premultiplied"): # 에셋 팩의 전처리된 의상 (utils.PREMULTIPLIED_KEY)
+        img_pil = Image.frombytes('RGBa', img_pil.size, img_pil.tobytes())
+    if img_pil.mode in ('RGBA', 'RGBa', 'LA', 'P'):
+        # 투명 영역은 흰 배경 위에 합성 (JPEG에는 알파가 없으므로)
+        rgba = img_pil.convert('RGBA')
+        proxy = Image.alpha_composite(Image.new('RGBA', rgba.size, (255, 255, 255, 255)), rgba).convert('RGB')
+    else:
+        proxy = img_pil.convert('RGB') if img_pil.mode != 'RGB' else img_pil
+    if proxy.width > width:
+        new_height = max(1, round(proxy.height * width / proxy.width))
+        proxy = proxy.resize((width, new_height), Image.Resampling.LANCZOS)
+    elif proxy is img_pil:
+        proxy = img_pil.copy() # 원본과 캐시가 같은 객체를 공유하지 않도록
+    buf = io.BytesIO()
+    proxy.save(buf, format="JPEG", quality=DISPLAY_JPEG_QUALITY, optimize=True)
+    return proxy, buf.getvalue()
+
+
+def _get_proxy(img_pil, width):
+    key = (id(img_pil), int(width))
+    with _lock:
+        cached = _proxy_cache.get(key)
+        if cached is not None:
+            _proxy_cache.move_to_end(key)
+            return cached
+
+    with span("display.proxy_encode"):
+        proxy = _build_proxy(img_pil, int(width))
+
+    with _lock:
+        if key[0] not in _tracked_images:
+            _tracked_images.add(key[0])
+            weakref.finalize(img_pil, _forget_image, key[0])
+        _proxy_cache[key] = proxy
+        while len(_proxy_cache) > MAX_CACHED_PROXIES:
+            _proxy_cache.popitem(last=False)
+    return proxy
+
+
+def get_display_image(img_pil, width):
+    """image_comparison 등 PIL 입력을 받는 컴포넌트용 표시 프록시 (PIL Image)"""
+    if img_pil is None: return None
+    return _get_proxy(img_pil, width)[0]
+
+
+def get_display_bytes(img_pil, width):
+    """st.image용 표시 프록시 (압축된 JPEG 바이트)"""
+    if img_pil is None: return None
+    return _get_proxy(img_pil, width)[1]
+
+# --- END OF FILE display.py ---
@@ -0,0 +1,99 @@
+# --- START OF FILE example_warmup.py ---
+
+import threading
+import time
+
+from metrics import span
+from utils import detect_face_landmarks, load_image, warm_up
+
+
+class ExampleWarmUp:
+    """예제 이미지 캐시 워밍업 - 디코딩(공유 저장소에 고정), 랜드마크 감지, 기본 설정 결과 미리 렌더링
+
+    랜드마크 감지 결과는 감지한 프로세스에만 남으므로, 렌더를 워커 풀에서 실행하는 파이프라인이면 이 프로세스에서는
+    감지하지 않음 (워커는 precompute_landmarks 사이드카를 읽거나 메이크업 프리셋 렌더 중 직접 감지해 캐시).
+    백그라운드 스레드에서 예제를 하나씩 처리하므로 첫 화면 렌더링을 막지 않음.
+    진행 상황은 progress() 로 언제든 읽을 수 있음 (UI 표시용).
+    """
+
+    def __init__(self, examples, image_store, pipeline, stage_presets):
+        """
+        Args:
+            examples (dict): {예제 이름: 파일 경로}
+            image_store (ImageStore): 디코딩한 예제를 고정해 둘 공유 이미지 저장소
+            pipeline (RenderPipeline): 결과를 공유 결과 캐시에 남길 파이프라인
+            stage_presets (list): [(단계 이름, 파라미터 dict), ...] - 예제마다 미리 렌더링할 단일 단계 설정
+        """
+        self.examples = dict(examples)
+        self.image_store = image_store
+        self.pipeline = pipeline
+        self.stage_presets = list(stage_presets)
+        self.warm_landmarks = getattr(pipeline, "worker_pool", None) is None # 렌더가 이 프로세스에서 실행될 때만 의미 있음
+        self._steps_per_example = 1 + int(self.warm_landmarks) + len(self.stage_presets) # 디코딩 + 랜드마크 + 프리셋
+        self._lock = threading.Lock()
+        self._thread = None
+        self._state = {
+            "total": len(self.examples) * self._steps_per_example,
+            "done": 0, "current": "", "errors": 0, "started": False, "finished": False, "seconds": 0.0,
+        }
+
+    def _advance(self):
+        with self._lock:
+            self._state["done"] += 1
+
+    def _run(self):
+        started = time.perf_counter()
+        if self.warm_landmarks: # 워커 풀이 있으면 FaceMesh 는 워커가 각자 만듦
+            try:
+                warm_up() # OpenCV/MediaPipe 임포트 + FaceMesh 생성
+            except Exception as e:
+                print(f"Example warm-up: FaceMesh warm-up failed: {e}")
+        for index, name in enumerate(self.examples):
+            try:
+                with self._lock:
+                    self._state["current"] = name
+                with span("warmup.decode"):
+                    img, _ = self.image_store.pin_file(self.examples[name], load_image)
+                if img is None:
+                    raise ValueError(f"Failed to load example image: {self.examples[name]}")
+                self._advance()
+                if self.warm_landmarks:
+                    with span("warmup.landmarks"):
+                        detect_face_landmarks(img, self.pipeline.digest_of(img))
+                    self._advance()
+                for stage, params in self.stage_presets:
+                    with span(f"warmup.render.{stage}"):
+                        self.pipeline.render(img, [(stage, params)])
+                    self._advance()
+            except Exception as e:
+                print(f"Example warm-up failed for '{name}': {e}")
+                with self._lock:
+                    self._state["errors"] += 1
+                    self._state["done"] = (index + 1) * self._steps_per_example # 남은 단계는 건너뜀
+        with self._lock:
+            self._state["finished"] = True
+            self._state["current"] = ""
+            self._state["seconds"] = time.perf_counter() - started
+        landmarks_note = "" if self.warm_landmarks else ", landmarks left to worker processes"
+        print(f"Example warm-up finished: {len(self.examples)} examples in {self._state['seconds']:.1f}s "
+              f"({self._state['errors']} failed{landmarks_note}).")
+
+    def start(self):
+        """백그라운드 스레드 시작 (이미 시작했으면 무시)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="ai-styler-example-warm-up", daemon=True)
+            self._state["started"] = True
+        self._thread.start()
+
+    def progress(self):
+        """진행 상황 사본 (total, done, current, errors, started, finished, seconds)"""
+        with self._lock:
+            return dict(self._state)
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+# --- END OF FILE example_warmup.py ---
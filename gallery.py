@@ -0,0 +1,201 @@
+# --- START OF FILE gallery.py ---
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+from PIL import Image
+
+# --- 📁 갤러리 경로 및 설정 ---
+GALLERY_DIR = "user_gallery"
+GALLERY_DB_NAME = "gallery.db"
+THUMBNAIL_SIZE = (320, 320) # 썸네일 최대 크기 (비율 유지)
+THUMBNAIL_QUALITY = 80      # 썸네일 JPEG 품질
+OWNER_TTL_DAYS = 30         # 이 기간 동안 방문하지 않은 소유자의 항목은 파일과 인덱스에서 삭제 (0 이면 삭제 안 함)
+SWEEP_INTERVAL = 60 * 60    # 만료 소유자 정리 최소 간격(초)
+LEGACY_OWNER = "legacy"     # 소유자 열이 생기기 전에 저장된 항목의 소유자 (?gallery=legacy 로 접근)
+
+
+class GalleryStore:
+    """user_gallery 폴더에 이미지를 저장하고 SQLite 인덱스(캡션, 시각, 썸네일 경로)로 관리
+
+    저장소는 프로세스 전체가 공유하므로 항목마다 소유자(owner, 브라우저에 보관되는 갤러리 토큰)를 기록하고
+    조회/삭제는 모두 소유자 기준으로만 수행 (다른 방문자의 항목은 보이지 않음).
+    owner_ttl_days 동안 touch() 되지 않은 소유자의 항목은 sweep_expired() 가 정리.
+    """
+
+    def __init__(self, root_dir=GALLERY_DIR, owner_ttl_days=OWNER_TTL_DAYS):
+        self.root_dir = root_dir
+        self.owner_ttl_days = owner_ttl_days
+        self._last_sweep = None
+        self.images_dir = os.path.join(root_dir, "images")
+        self.thumbs_dir = os.path.join(root_dir, "thumbs")
+        self.db_path = os.path.join(root_dir, GALLERY_DB_NAME)
+        self._lock = threading.Lock() # 여러 세션에서 동시에 쓰는 경우 보호
+        for folder in (self.root_dir, self.images_dir, self.thumbs_dir):
+            os.makedirs(folder, exist_ok=True)
+        with self._db() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS gallery_items (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL DEFAULT '',
+                    caption TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    image_path TEXT NOT NULL,
+                    thumb_path TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(gallery_items)")}
+            if "owner" not in columns: # 소유자 열이 없던 이전 인덱스
+                conn.execute("ALTER TABLE gallery_items ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            legacy = conn.execute("UPDATE gallery_items SET owner = ? WHERE owner = ''", (LEGACY_OWNER,)).rowcount
+            if legacy:
+                print(f"Moved {legacy} gallery items without an owner to '{LEGACY_OWNER}' (open the app with ?gallery={LEGACY_OWNER}).")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_gallery_owner_created ON gallery_items (owner, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS gallery_owners (
+                    owner TEXT PRIMARY KEY,
+                    last_seen TEXT NOT NULL
+                )
+            """)
+            # 방문 기록이 없는 소유자(이전 버전의 세션 ID, legacy)는 지금부터 만료 기간을 셈
+            conn.execute(
+                "INSERT OR IGNORE INTO gallery_owners (owner, last_seen) SELECT DISTINCT owner, ? FROM gallery_items",
+                (datetime.now().isoformat(timespec="seconds"),)
+            )
+
+    @contextmanager
+    def _db(self):
+        """연결을 열고 트랜잭션 커밋(예외 시 롤백) 후 항상 닫음"""
+        with closing(sqlite3.connect(self.db_path, timeout=10)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    def touch(self, owner):
+        """소유자의 마지막 방문 시각 갱신 (세션 시작 시 호출 - 만료 기준)"""
+        with self._lock, self._db() as conn:
+            conn.execute(
+                "INSERT INTO gallery_owners (owner, last_seen) VALUES (?, ?) ON CONFLICT(owner) DO UPDATE SET last_seen = excluded.last_seen",
+                (owner, datetime.now().isoformat(timespec="seconds"))
+            )
+
+    def sweep_expired(self, force=False):
+        """owner_ttl_days 동안 방문하지 않은 소유자의 항목(파일 + 인덱스)을 삭제하고 정리한 소유자 수 반환
+
+        SWEEP_INTERVAL 안에 다시 호출되면 건너뜀 (force=True 면 항상 실행).
+        """
+        if self.owner_ttl_days <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_sweep is not None and now - self._last_sweep < SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+        cutoff = (datetime.now() - timedelta(days=self.owner_ttl_days)).isoformat(timespec="seconds")
+        with self._db() as conn:
+            expired = [row[0] for row in conn.execute("SELECT owner FROM gallery_owners WHERE last_seen < ?", (cutoff,)).fetchall()]
+        for owner in expired:
+            self.clear(owner)
+            with self._lock, self._db() as conn:
+                conn.execute("DELETE FROM gallery_owners WHERE owner = ? AND last_seen < ?", (owner, cutoff))
+        if expired:
+            print(f"Removed gallery items of {len(expired)} owners not seen for {self.owner_ttl_days} days.")
+        return len(expired)
+
+    def add(self, owner, img_pil, caption):
+        """이미지를 원본(PNG) + 썸네일(JPEG)로 저장하고 인덱스에 등록, 항목 ID 반환"""
+        item_id = uuid.uuid4().hex
+        created_at = datetime.now().isoformat(timespec="seconds")
+        image_rel = os.path.join("images", f"{item_id}.png")
+        thumb_rel = os.path.join("thumbs", f"{item_id}.jpg")
+
+        save_img = img_pil.convert('RGB') if img_pil.mode != 'RGB' else img_pil
+        save_img.save(os.path.join(self.root_dir, image_rel), format="PNG")
+        thumb = save_img.copy()
+        thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        thumb.save(os.path.join(self.root_dir, thumb_rel), format="JPEG", quality=THUMBNAIL_QUALITY)
+
+        with self._lock, self._db() as conn:
+            conn.execute(
+                "INSERT INTO gallery_items (id, owner, caption, created_at, image_path, thumb_path, width, height) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (item_id, owner, caption, created_at, image_rel, thumb_rel, save_img.width, save_img.height)
+            )
+        return item_id
+
+    def count(self, owner):
+        """소유자의 저장된 항목 수"""
+        with self._db() as conn:
+            return conn.execute("SELECT COUNT(*) FROM gallery_items WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def list_page(self, owner, page, page_size):
+        """소유자의 항목을 최신순으로 한 페이지 분량 반환 (메타데이터 dict 리스트) - 이미지는 로드하지 않음"""
+        offset = max(0, page) * page_size
+        with self._db() as conn:
+            rows = conn.execute(
+                "SELECT * FROM gallery_items WHERE owner = ? ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+                (owner, page_size, offset)
+            ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def get(self, owner, item_id):
+        """ID로 소유자의 항목 메타데이터 조회 (없거나 다른 소유자의 항목이면 None)"""
+        with self._db() as conn:
+            row = conn.execute("SELECT * FROM gallery_items WHERE id = ? AND owner = ?", (item_id, owner)).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def _row_to_item(self, row):
+        item = dict(row)
+        item["image_path"] = os.path.join(self.root_dir, item["image_path"])
+        item["thumb_path"] = os.path.join(self.root_dir, item["thumb_path"])
+        return item
+
+    def load_image(self, owner, item_id):
+        """원본 해상도 이미지를 필요할 때만 로드"""
+        item = self.get(owner, item_id)
+        if item is None:
+            return None
+        try:
+            return Image.open(item["image_path"]).convert('RGB')
+        except Exception as e:
+            print(f"Error loading gallery image {item_id}: {e}")
+            return None
+
+    def read_image_bytes(self, owner, item_id):
+        """다운로드용 원본 PNG 바이트 (재인코딩 없이 파일 그대로)"""
+        item = self.get(owner, item_id)
+        if item is None:
+            return None
+        try:
+            with open(item["image_path"], "rb") as f:
+                return f.read()
+        except OSError as e:
+            print(f"Error reading gallery image {item_id}: {e}")
+            return None
+
+    def delete(self, owner, item_id):
+        """소유자의 항목 하나 삭제 (파일 + 인덱스)"""
+        item = self.get(owner, item_id)
+        if item is None:
+            return
+        with self._lock, self._db() as conn:
+            conn.execute("DELETE FROM gallery_items WHERE id = ? AND owner = ?", (item_id, owner))
+        for path in (item["image_path"], item["thumb_path"]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self, owner):
+        """소유자의 갤러리 항목 전체 삭제 (다른 소유자의 항목은 그대로)"""
+        with self._db() as conn:
+            item_ids = [row[0] for row in conn.execute("SELECT id FROM gallery_items WHERE owner = ?", (owner,)).fetchall()]
+        for item_id in item_ids:
+            self.delete(owner, item_id)
+
+# --- END OF FILE gallery.py ---
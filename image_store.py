@@ -0,0 +1,187 @@
+# --- START OF FILE image_store.py ---
+
+import hashlib
+import os
+import threading
+import time
+
+# --- ⚙️ 기본 한도 설정 ---
+DEFAULT_SESSION_LIMIT_BYTES = 256 * 1024 * 1024 # 세션당 이미지 메모리 한도 (256MB)
+DEFAULT_IDLE_TIMEOUT = 60 * 60                  # 이 시간(초) 동안 접근 없는 세션의 참조 해제
+PROTECTED_SLOTS = ("original_image",)           # 한도 초과 시에도 제거하지 않는 슬롯 (원본)
+
+
+def image_digest(img_pil):
+    """이미지 내용(모드, 크기, 픽셀) 기반 해시 - 동일 이미지 판별용"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{img_pil.mode}:{img_pil.size[0]}x{img_pil.size[1]}:".encode())
+    h.update(img_pil.tobytes())
+    return h.hexdigest()
+
+
+def image_nbytes(img_pil):
+    """디코딩된 이미지의 대략적인 메모리 사용량 (바이트)"""
+    return img_pil.size[0] * img_pil.size[1] * len(img_pil.getbands())
+
+
+class ImageStore:
+    """세션 간 동일 이미지를 내용 해시로 공유(참조 카운트)하고 세션별 메모리를 집계하는 저장소"""
+
+    def __init__(self, session_limit_bytes=DEFAULT_SESSION_LIMIT_BYTES, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.session_limit_bytes = session_limit_bytes
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._images = {}       # digest -> {"image", "refs", "nbytes"}
+        self._sessions = {}     # session_id -> {"slots": {slot: digest}, "last_seen": float}
+        self._file_digests = {} # (path, mtime, size) -> digest (디코딩 없이 재사용하기 위함)
+        self._pinned = set()    # 세션과 관계없이 항상 유지하는 이미지 digest (워밍업한 예제)
+
+    # --- 내부 참조 관리 (self._lock 보유 상태에서 호출) ---
+    def _session(self, session_id):
+        session = self._sessions.setdefault(session_id, {"slots": {}, "last_seen": 0.0})
+        session["last_seen"] = time.monotonic()
+        return session
+
+    def _decref(self, digest):
+        entry = self._images.get(digest)
+        if entry is None:
+            return
+        entry["refs"] -= 1
+        if entry["refs"] <= 0:
+            del self._images[digest]
+
+    def _session_bytes(self, session):
+        return sum(self._images[d]["nbytes"] for d in session["slots"].values() if d in self._images)
+
+    # --- 공개 API ---
+    def load_file(self, path, loader):
+        """파일 이미지 로드 - 같은 파일이 이미 다른 세션에 올라와 있으면 디코딩 없이 공유본 반환
+
+        Returns:
+            tuple: (PIL Image 또는 None, digest 또는 None)
+        """
+        try:
+            stat = os.stat(path)
+            file_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_key = None
+
+        if file_key is not None:
+            with self._lock:
+                digest = self._file_digests.get(file_key)
+                entry = self._images.get(digest) if digest else None
+                if entry is not None:
+                    return entry["image"], digest
+
+        img = loader(path)
+        if img is None:
+            return None, None
+        digest = image_digest(img)
+        if file_key is not None:
+            with self._lock:
+                self._file_digests[file_key] = digest
+        return img, digest
+
+    def pin_file(self, path, loader):
+        """파일 이미지를 로드해 세션 참조가 없어도 유지 (예제 워밍업용) - 이후 load_file 은 디코딩 없이 공유본 반환
+
+        Returns:
+            tuple: (PIL Image 또는 None, digest 또는 None)
+        """
+        img, digest = self.load_file(path, loader)
+        if img is None:
+            return None, None
+        with self._lock:
+            entry = self._images.get(digest)
+            if entry is None:
+                entry = {"image": img, "refs": 0, "nbytes": image_nbytes(img)}
+                self._images[digest] = entry
+            if digest not in self._pinned:
+                self._pinned.add(digest)
+                entry["refs"] += 1
+            return entry["image"], digest
+
+    def put(self, session_id, slot, img_pil, digest=None):
+        """세션의 이미지 슬롯을 갱신하고 공유본을 반환
+
+        Returns:
+            tuple: (공유 PIL Image, 메모리 한도 초과로 제거된 슬롯 이름 리스트)
+        """
+        digest = digest or image_digest(img_pil)
+        with self._lock:
+            session = self._session(session_id)
+            if session["slots"].get(slot) == digest:
+                return self._images[digest]["image"], []
+
+            entry = self._images.get(digest)
+            if entry is None:
+                entry = {"image": img_pil, "refs": 0, "nbytes": image_nbytes(img_pil)}
+                self._images[digest] = entry
+            entry["refs"] += 1
+
+            old_digest = session["slots"].pop(slot, None)
+            if old_digest is not None:
+                self._decref(old_digest)
+            session["slots"][slot] = digest # dict 순서 = 갱신 순서 (오래된 슬롯부터 제거)
+
+            # 세션 한도 초과 시 파생 결과(원본 제외)를 오래된 순서대로 제거
+            evicted = []
+            for other_slot in list(session["slots"]):
+                if self._session_bytes(session) <= self.session_limit_bytes:
+                    break
+                if other_slot == slot or other_slot in PROTECTED_SLOTS:
+                    continue
+                self._decref(session["slots"].pop(other_slot))
+                evicted.append(other_slot)
+            return entry["image"], evicted
+
+    def release(self, session_id, slot):
+        """세션의 특정 슬롯 참조 해제"""
+        with self._lock:
+            session = self._session(session_id)
+            digest = session["slots"].pop(slot, None)
+            if digest is not None:
+                self._decref(digest)
+
+    def release_session(self, session_id):
+        """세션의 모든 참조 해제"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session:
+                for digest in session["slots"].values():
+                    self._decref(digest)
+
+    def touch(self, session_id):
+        """세션 활동 시각 갱신"""
+        with self._lock:
+            self._session(session_id)
+
+    def sweep_idle(self):
+        """idle_timeout 동안 접근이 없던 세션의 참조를 해제하고 해제한 세션 수 반환"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle_ids = [sid for sid, s in self._sessions.items() if s["last_seen"] < cutoff]
+        for session_id in idle_ids:
+            self.release_session(session_id)
+        return len(idle_ids)
+
+    def session_bytes(self, session_id):
+        """세션이 참조하는 이미지 바이트 합계 (공유 이미지도 참조한 만큼 포함)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return self._session_bytes(session) if session else 0
+
+    def totals(self):
+        """프로세스 전체 집계 (고유 이미지 수/바이트, 참조 바이트 합, 세션 수)"""
+        with self._lock:
+            unique_bytes = sum(e["nbytes"] for e in self._images.values())
+            referenced_bytes = sum(self._session_bytes(s) for s in self._sessions.values())
+            return {
+                "unique_images": len(self._images),
+                "unique_bytes": unique_bytes,
+                "referenced_bytes": referenced_bytes,
+                "saved_bytes": referenced_bytes - unique_bytes, # 중복 제거로 절약된 바이트
+                "sessions": len(self._sessions),
+            }
+
+# --- END OF FILE image_store.py ---
@@ -0,0 +1,58 @@
+# --- START OF FILE lazy_imports.py ---
+
+import importlib
+import threading
+
+
+class _LazyModule:
+    """첫 속성 접근 시에 실제 모듈을 임포트하는 대리 객체 (cv2, mediapipe 등 무거운 모듈용)
+
+    `cv2 = lazy_module("cv2")` 처럼 모듈 변수 자리에 두면 나머지 코드는 그대로 `cv2.cvtColor(...)`로 사용 가능.
+    """
+
+    def __init__(self, name, on_load=None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_on_load", on_load)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = object.__getattribute__(self, "_module")
+        if module is None:
+            with object.__getattribute__(self, "_lock"):
+                module = object.__getattribute__(self, "_module")
+                if module is None:
+                    module = importlib.import_module(object.__getattribute__(self, "_name"))
+                    on_load = object.__getattribute__(self, "_on_load")
+                    if on_load is not None:
+                        on_load(module) # 다른 스레드가 쓰기 전에 설정 (예: cv2 스레드 수)
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        name = object.__getattribute__(self, "_name")
+        loaded = object.__getattribute__(self, "_module") is not None
+        return f"<lazy module '{name}' ({'loaded' if loaded else 'not loaded'})>"
+
+
+def lazy_module(name, on_load=None):
+    """모듈 대리 객체 반환 (임포트는 첫 사용 시점으로 미룸, on_load(module)은 임포트 직후 한 번 호출)"""
+    return _LazyModule(name, on_load)
+
+
+def is_loaded(module):
+    """대리 객체라면 실제 임포트가 끝났는지, 일반 모듈이면 항상 True"""
+    if isinstance(module, _LazyModule):
+        return object.__getattribute__(module, "_module") is not None
+    return True
+
+# --- END OF FILE lazy_imports.py ---
@@ -0,0 +1,191 @@
+# --- START OF FILE metrics.py ---
+"""
+단계별 소요 시간 계측 - span()으로 구간을 재고 연산별 히스토그램으로 집계
+
+환경 변수:
+    AI_STYLER_METRICS=1              계측 켜기 (기본 꺼짐, 꺼져 있으면 span()은 공유 no-op 객체만 반환)
+    AI_STYLER_METRICS_LOG=1          구간마다 JSON 한 줄 로그 출력 (구조화 로그)
+    AI_STYLER_METRICS_FILE=path.prom 앱이 스크립트 실행마다 Prometheus 텍스트 형식으로 기록
+
+사용 예:
+    with span("makeup.blur"):
+        ...
+"""
+
+import json
+import os
+import threading
+import time
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+ENABLED = os.environ.get("AI_STYLER_METRICS", "").lower() in _TRUE_VALUES
+LOG_SPANS = os.environ.get("AI_STYLER_METRICS_LOG", "").lower() in _TRUE_VALUES
+METRICS_FILE = os.environ.get("AI_STYLER_METRICS_FILE") or None
+
+# 히스토그램 버킷 상한 (초) - 수 ms의 마스크 연산부터 수십 초의 대형 이미지 처리까지
+BUCKET_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_NAME = "ai_styler_stage_duration_seconds"
+
+_lock = threading.Lock()
+_histograms = {} # 이름 -> Histogram
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (개수, 합계, 최소/최대 포함)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1) # 마지막 칸은 +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        index = len(BUCKET_BOUNDS)
+        for i, bound in enumerate(BUCKET_BOUNDS):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q):
+        """버킷 상한 기준 근사 분위수 (마지막 버킷은 관측 최대값)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if cumulative >= target:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class _NullSpan:
+    """계측이 꺼져 있을 때 쓰는 공유 no-op 컨텍스트 매니저"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+def span(name):
+    """이름 붙은 구간 계측 (with 문). 꺼져 있으면 아무 일도 하지 않음"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name):
+    """함수 전체를 span으로 감싸는 데코레이터 (호출 시점에 켜짐 여부 확인)"""
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def record(name, seconds, error=False):
+    """측정값 하나를 히스토그램에 추가"""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+    if LOG_SPANS:
+        print(json.dumps({"event": "span", "name": name, "ms": round(seconds * 1000, 3), "error": error}), flush=True)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """연산별 요약 {이름: {count, total_s, mean_s, p50_s, p95_s, min_s, max_s}} (이름순)"""
+    with _lock:
+        items = sorted(_histograms.items())
+        return {
+            name: {
+                "count": h.count,
+                "total_s": h.total,
+                "mean_s": h.total / h.count if h.count else None,
+                "p50_s": h.quantile(0.5),
+                "p95_s": h.quantile(0.95),
+                "min_s": h.min,
+                "max_s": h.max,
+            }
+            for name, h in items
+        }
+
+
+def prometheus_text():
+    """Prometheus 텍스트 노출 형식 (누적 버킷)"""
+    lines = [
+        f"# HELP {METRIC_NAME} Duration of AI stylist processing stages.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, c in zip(BUCKET_BOUNDS, h.counts):
+                cumulative += c
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="+Inf"}} {h.count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {h.total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {h.count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Prometheus 텍스트 파일 기록 (node_exporter textfile collector 등에서 읽도록 임시 파일 후 교체)"""
+    path = path or METRICS_FILE
+    if not path:
+        return False
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # 여러 프로세스/스레드가 동시에 기록해도 섞이지 않도록
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"Error writing metrics file {path}: {e}")
+        return False
+
+# --- END OF FILE metrics.py ---
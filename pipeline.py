@@ -0,0 +1,169 @@
+# --- START OF FILE pipeline.py ---
+
+import hashlib
+import json
+import threading
+import weakref
+from PIL import Image
+
+from utils import (
+    apply_fashion_filter, apply_makeup, apply_makeup_transfer, change_clothing_color, virtual_try_on
+)
+from compute_budget import compute_slot
+from image_store import image_digest
+from result_cache import ResultCache
+from worker_pool import WorkerTimeout
+
+# --- 🔗 파이프라인 단계 정의 ---
+# 적용 순서: 패션 필터 → 메이크업(직접 또는 스타일 전송) → 가상 피팅
+STAGE_ORDER = ("filter", "makeup", "makeup_transfer", "tryon")
+DEFAULT_PRIVATE_CACHE_BYTES = 128 * 1024 * 1024 # 공유 캐시 없이 만든 파이프라인의 자체 캐시 한도 (128MB)
+
+
+def _run_filter(img, params, pipeline):
+    return apply_fashion_filter(img, params.get("style", "casual"), params.get("intensity", 0.7)), True
+
+
+def _run_makeup(img, params, pipeline):
+    return apply_makeup(img, params, digest=pipeline.known_digest(img))
+
+
+def _run_makeup_transfer(img, params, pipeline):
+    return apply_makeup_transfer(img, params["style_image"], face_digest=pipeline.known_digest(img))
+
+
+def _run_tryon(img, params, pipeline):
+    garment = params["garment"]
+    if params.get("color"):
+        # 색상 변경된 의상도 캐시 - 위치/크기만 바뀌면 다시 계산하지 않음
+        garment = pipeline.cached(
+            ("garment_color", pipeline.digest_of(garment), params["color"]),
+            lambda: change_clothing_color(garment, params["color"])
+        )
+    position = tuple(params.get("position", (0, 0)))
+    return virtual_try_on(img, garment, position, params.get("scale", 1.0)), True
+
+
+STAGE_FUNCTIONS = {
+    "filter": _run_filter,
+    "makeup": _run_makeup,
+    "makeup_transfer": _run_makeup_transfer,
+    "tryon": _run_tryon,
+}
+
+
+class RenderPipeline:
+    """utils 연산을 단계별로 연결해 실행하고, 각 단계 결과를 (입력 해시, 단계, 파라미터) 키로 캐시
+
+    단계 결과의 식별자는 캐시 키 자체를 사용하므로 중간 결과의 픽셀을 다시 해시하지 않음.
+    하류 단계의 파라미터만 바뀌면 상류 단계는 캐시에서 재사용됨.
+    result_cache(ResultCache)를 여러 세션의 파이프라인이 함께 쓰면 같은 예제/같은 설정의 결과를 세션 간 재사용.
+    worker_pool(WorkerPool)을 주면 캐시에 없는 단계는 워커 프로세스에서 실행 (실패 시 현재 스레드에서 실행,
+    시간 초과는 워커가 아직 같은 작업을 실행 중이므로 다시 실행하지 않고 예외를 올림).
+    """
+
+    def __init__(self, result_cache=None, worker_pool=None):
+        self.result_cache = result_cache if result_cache is not None else ResultCache(max_bytes=DEFAULT_PRIVATE_CACHE_BYTES)
+        self.worker_pool = worker_pool
+        self._lock = threading.Lock()
+        self._digests = {}           # id(image) -> digest (원본/참조 이미지 해시 메모)
+        self.stats = {"hits": 0, "misses": 0} # 이 파이프라인(세션)의 요청 기준 집계
+
+    def digest_of(self, img_pil):
+        """이미지 내용 해시 (같은 객체는 한 번만 계산, 객체가 사라지면 메모 제거)"""
+        digest = self.known_digest(img_pil)
+        if digest is None:
+            digest = image_digest(img_pil)
+            self.remember_digest(img_pil, digest)
+        return digest
+
+    def known_digest(self, img_pil):
+        """이미 계산해 둔 내용 해시 (없으면 None - 새로 해시하지 않음, 랜드마크 캐시 키 재사용용)"""
+        with self._lock:
+            return self._digests.get(id(img_pil))
+
+    def remember_digest(self, img_pil, digest):
+        """다른 곳에서 계산한 해시 기록 (워커가 부모의 해시를 받은 경우 등)"""
+        image_id = id(img_pil)
+        with self._lock:
+            if image_id not in self._digests:
+                weakref.finalize(img_pil, self._digests.pop, image_id, None)
+            self._digests[image_id] = digest
+
+    def _canonical(self, value):
+        """캐시 키용 파라미터 정규화 (PIL 이미지는 내용 해시로, 순서 무관한 dict 정렬)"""
+        if isinstance(value, Image.Image):
+            return {"__image__": self.digest_of(value)}
+        if isinstance(value, dict):
+            return {str(k): self._canonical(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [self._canonical(v) for v in value]
+        if isinstance(value, float):
+            return round(value, 6)
+        return value
+
+    def stage_key(self, input_key, stage, params):
+        raw = json.dumps([input_key, stage, self._canonical(params)], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def cached(self, key, compute):
+        """키에 해당하는 결과가 있으면 재사용, 없으면 compute() 결과를 저장 후 반환"""
+        return self._cached(key, compute)[0]
+
+    def _cached(self, key, compute):
+        # 다른 세션이 같은 키를 계산 중이면 그 결과를 기다려 받음 (재사용으로 집계)
+        value, status = self.result_cache.get_or_compute(key, compute)
+        hit = status != "miss"
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+        return value, hit
+
+    def _run_stage(self, stage, img, params):
+        # 워커에서 실행해도 코어는 이 프로세스의 예산에서 받음 (세션 수와 관계없이 동시에 도는 연산 수 제한)
+        with compute_slot():
+            if self.worker_pool is not None:
+                try:
+                    return self.worker_pool.run_stage(stage, img, params, digest=self.known_digest(img))
+                except WorkerTimeout:
+                    raise
+                except Exception as e:
+                    print(f"Worker pool failed for stage '{stage}', running inline: {e}")
+            return STAGE_FUNCTIONS[stage](img, params, self)
+
+    def render(self, source_img, stages):
+        """원본에 단계들을 순서대로 적용
+
+        Args:
+            source_img (PIL.Image): 원본 이미지
+            stages (list): [(단계 이름, 파라미터 dict), ...] - 단계 이름은 STAGE_ORDER 중 하나
+
+        Returns:
+            tuple: (결과 이미지, 단계별 정보 리스트 [{"stage", "success", "cached"}, ...])
+        """
+        img = source_img
+        input_key = self.digest_of(source_img)
+        infos = []
+        for stage, params in stages:
+            if stage not in STAGE_FUNCTIONS:
+                raise ValueError(f"Unknown pipeline stage: {stage}")
+            key = self.stage_key(input_key, stage, params)
+            (img, success), hit = self._cached(key, lambda: self._run_stage(stage, img, params))
+            infos.append({"stage": stage, "success": success, "cached": hit})
+            input_key = key
+        return img, infos
+
+    def pending_stages(self, source_img, stages):
+        """render() 에서 실제로 계산해야 할(캐시에 없는) 단계 이름 목록 - 입장 제어 비용 추정용"""
+        input_key = self.digest_of(source_img)
+        pending = []
+        for stage, params in stages:
+            key = self.stage_key(input_key, stage, params)
+            if key not in self.result_cache:
+                pending.append(stage)
+            input_key = key
+        return pending
+
+    def clear(self):
+        self.result_cache.clear()
+
+# --- END OF FILE pipeline.py ---
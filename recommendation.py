@@ -0,0 +1,385 @@
+# --- START OF FILE recommendation.py ---
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# --- 🤖 GPT 추천 기본 설정 ---
+RECOMMENDATION_MODEL = "gpt-3.5-turbo" # 또는 "gpt-4" 등 사용 가능한 모델
+RECOMMENDATION_TEMPERATURE = 0.7      # 약간의 창의성 허용
+RECOMMENDATION_MAX_TOKENS = 300       # 응답 길이 제한
+SYSTEM_PROMPT_VERSION = "v1"          # 시스템 프롬프트 문구를 바꾸면 올려서 기존 캐시 무효화
+
+# --- ⏱️ 타임아웃 / 재시도 / 동시 호출 제한 ---
+REQUEST_TIMEOUT = 10.0      # API 호출 1회당 타임아웃 (초, 스트리밍은 토큰 사이 대기에도 적용)
+MAX_RETRIES = 3             # 호출 한도 초과(429) 및 일시적 오류 재시도 횟수
+BACKOFF_BASE = 0.5          # 지수 백오프 시작 대기 (초): 0.5, 1, 2, ...
+BACKOFF_MAX = 4.0           # 백오프 최대 대기 (초)
+MAX_CONCURRENT_REQUESTS = 4 # 프로세스 전체 동시 진행 API 호출 수 상한
+QUEUE_TIMEOUT = 5.0         # 호출 슬롯을 기다리는 최대 시간 (초)
+FIRST_TOKEN_DEADLINE = 8.0  # 요청 시작 ~ 첫 토큰 상한 (슬롯 대기, 모든 시도와 백오프 포함)
+RESPONSE_DEADLINE = 30.0    # 요청 시작 ~ 응답 완료 상한 - 넘으면 받은 내용까지만 두고 호출을 버림
+
+# --- 💾 캐시 기본 설정 ---
+DEFAULT_CACHE_TTL = 24 * 60 * 60 # 캐시 유효 시간 (초)
+DEFAULT_CACHE_MAX_ENTRIES = 512  # LRU 최대 항목 수
+CACHE_SAVE_DELAY = 5.0           # 디스크 저장 지연 (초) - 이 시간 안의 변경은 한 번의 쓰기로 모음
+
+
+def build_system_message(fashion_styles, clothing_types):
+    """GPT의 역할과 응답 방향을 정의하는 시스템 메시지 생성"""
+    return f"""
+    당신은 전문 패션 & 뷰티 AI 스타일리스트입니다. 사용자의 설명(피부톤, 선호 스타일, 상황 등)을 바탕으로 구체적이고 실용적인 스타일링 추천을 제공해주세요.
+    추천 내용은 다음 요소들을 포함할 수 있습니다:
+    - 메이크업: 어울리는 립, 아이섀도우, 블러셔 색상 및 스타일 (예: '쿨톤 피부에는 핑크 계열 립스틱과 회갈색 아이섀도우가 잘 어울립니다.')
+    - 패션 필터: 사용자가 앱에서 선택할 수 있는 필터 추천 ({', '.join(fashion_styles)}) (예: '차분한 느낌을 원하시면 'elegant' 필터를 적용해보세요.')
+    - 의상 종류/색상: 사용자가 앱에서 선택할 수 있는 의상 종류 ({', '.join(clothing_types)}) 또는 일반적인 의상 색상 추천 (예: '중요한 자리라면 'formal_dress'를 시도해보거나, 네이비 색상의 블라우스가 좋습니다.')
+    - 추천 이유를 간략하게 설명해주세요.
+    - 응답은 친절하고 이해하기 쉬운 한국어로 작성해주세요.
+    - 마크다운 형식을 활용하여 가독성을 높여주세요 (예: 항목별 리스트 사용).
+    """
+
+
+def system_prompt_version(system_message):
+    """프롬프트 버전 + 실제 시스템 메시지 해시 (의상 목록 등이 바뀌어도 캐시가 섞이지 않도록)"""
+    digest = hashlib.sha1(system_message.encode("utf-8")).hexdigest()[:8]
+    return f"{SYSTEM_PROMPT_VERSION}:{digest}"
+
+
+def normalize_prompt(user_prompt):
+    """캐시 키용 프롬프트 정규화 (대소문자, 공백, 끝 문장부호 차이 무시)"""
+    text = user_prompt.strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" .!?~")
+
+
+class RecommendationCache:
+    """정규화된 프롬프트/모델/온도/프롬프트 버전을 키로 하는 TTL + LRU 추천 응답 캐시 (선택적 디스크 저장)"""
+
+    def __init__(self, ttl=DEFAULT_CACHE_TTL, max_entries=DEFAULT_CACHE_MAX_ENTRIES, persist_path=None, save_delay=CACHE_SAVE_DELAY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # 파일 쓰기 직렬화 (조회/저장은 쓰는 동안에도 진행)
+        self._save_timer = None
+        self._entries = OrderedDict() # key -> {"value": str, "created_at": float}
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        if persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(user_prompt, model, temperature, prompt_version):
+        raw = json.dumps([normalize_prompt(user_prompt), model, round(float(temperature), 3), prompt_version], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """캐시 조회 (만료된 항목은 제거 후 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if time.time() - entry["created_at"] > self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["value"]
+
+    def set(self, key, value):
+        """캐시 저장 (최대 항목 수 초과 시 가장 오래 사용하지 않은 항목 제거)"""
+        with self._lock:
+            self._entries[key] = {"value": value, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._schedule_save()
+
+    def _schedule_save(self):
+        """self._lock 보유 상태에서 호출 - save_delay 뒤 한 번만 저장 (그 사이 변경은 같은 쓰기에 포함)"""
+        if not self.persist_path or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """예약된 저장을 바로 실행 (종료 시 atexit 으로도 호출)"""
+        with self._save_lock: # 스냅샷과 쓰기를 함께 직렬화 (오래된 스냅샷이 새 파일을 덮어쓰지 않도록)
+            with self._lock:
+                timer, self._save_timer = self._save_timer, None
+                if timer is None:
+                    return
+                timer.cancel()
+                entries = list(self._entries.items())
+            self._save(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def _load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            for key, entry in data.get("entries", []):
+                if now - entry["created_at"] <= self.ttl:
+                    self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            print(f"Loaded {len(self._entries)} cached recommendations from {self.persist_path}.")
+        except Exception as e:
+            print(f"Failed to load recommendation cache: {self.persist_path}, Error: {e}")
+
+    def _save(self, entries):
+        # 프로세스/스레드마다 다른 임시 파일에 쓴 뒤 교체 (쓰는 도중 종료되거나 동시에 저장해도 기존 파일 유지)
+        try:
+            folder = os.path.dirname(self.persist_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp_path = f"{self.persist_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"Failed to save recommendation cache: {self.persist_path}, Error: {e}")
+
+
+class RecommendationBusyError(Exception):
+    """동시 호출 상한에 걸려 QUEUE_TIMEOUT 안에 호출 슬롯을 얻지 못한 경우"""
+
+
+class RecommendationTimeoutError(TimeoutError):
+    """FIRST_TOKEN_DEADLINE / RESPONSE_DEADLINE 안에 응답을 받지 못한 경우 (그때까지 받은 내용은 stream.text 에 남음)"""
+
+
+class _RequestLimiter:
+    """프로세스 전체 동시 API 호출 수 제한 + 호출/재시도 통계"""
+
+    def __init__(self, max_concurrent):
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.stats = {"in_flight": 0, "peak_in_flight": 0, "calls": 0, "retries": 0, "failures": 0, "busy_rejections": 0, "timeouts": 0}
+
+    def configure(self, max_concurrent):
+        """상한 변경 (진행 중인 호출이 없을 때 호출)"""
+        with self._lock:
+            self._semaphore = threading.BoundedSemaphore(max_concurrent)
+            self.max_concurrent = max_concurrent
+
+    @contextmanager
+    def slot(self, timeout):
+        semaphore = self._semaphore
+        if not semaphore.acquire(timeout=timeout):
+            self.record("busy_rejections")
+            raise RecommendationBusyError(f"동시 추천 요청이 많아 {timeout:.0f}초 안에 처리하지 못했습니다.")
+        with self._lock:
+            self.stats["in_flight"] += 1
+            self.stats["calls"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+            semaphore.release()
+
+    def record(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+REQUEST_LIMITER = _RequestLimiter(MAX_CONCURRENT_REQUESTS)
+
+
+def _is_retryable(error):
+    """재시도할 오류인지 판단 (429, 타임아웃, 연결 오류, 5xx)"""
+    import openai
+    return isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError))
+
+
+def _backoff_delay(attempt, error=None):
+    """재시도 대기 시간 - 서버가 준 Retry-After 우선, 없으면 지터를 더한 지수 백오프"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0) # 여러 세션이 동시에 재시도하지 않도록 분산
+
+
+class RecommendationStream:
+    """스트리밍 추천 응답 - 반복하면 텍스트 조각을 순서대로 내보내고, 누적 텍스트/타이밍을 기록
+
+    API 호출(재시도/백오프 포함)은 백그라운드 스레드에서 진행되고, 반복하는 스레드(Streamlit 스크립트 스레드)는
+    받은 조각만 꺼내 씀. 첫 토큰은 first_token_deadline, 전체 응답은 deadline 안에 오지 않으면
+    RecommendationTimeoutError 로 즉시 돌아오며 백그라운드 호출은 버려짐 (스크립트 스레드는 최대 deadline 초 대기).
+    오류가 나도 그때까지 받은 내용은 `text`에 남아 있음.
+    """
+
+    def __init__(self, client, user_prompt, system_message, cache=None,
+                 model=RECOMMENDATION_MODEL, temperature=RECOMMENDATION_TEMPERATURE,
+                 max_tokens=RECOMMENDATION_MAX_TOKENS, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, queue_timeout=QUEUE_TIMEOUT,
+                 first_token_deadline=FIRST_TOKEN_DEADLINE, deadline=RESPONSE_DEADLINE):
+        self.client = client
+        self.user_prompt = user_prompt
+        self.system_message = system_message
+        self.cache = cache
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self.first_token_deadline = first_token_deadline
+        self.deadline = deadline
+        self.retries = 0                 # 이번 요청에서 재시도한 횟수
+        self.text = ""                   # 지금까지 받은 누적 텍스트
+        self.from_cache = False
+        self.completed = False
+        self.time_to_first_token = None  # 요청 시작 ~ 첫 텍스트 조각까지 (초)
+        self.total_time = None           # 요청 시작 ~ 완료까지 (초)
+
+    def __iter__(self):
+        started_at = time.perf_counter()
+        key = None
+        if self.cache is not None:
+            key = RecommendationCache.make_key(self.user_prompt, self.model, self.temperature, system_prompt_version(self.system_message))
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.from_cache = True
+                self.text = cached
+                self.time_to_first_token = self.total_time = time.perf_counter() - started_at
+                self.completed = True
+                yield cached
+                return
+
+        first_token_by = started_at + min(self.first_token_deadline, self.deadline)
+        finish_by = started_at + self.deadline
+        events = queue.Queue()
+        cancelled = threading.Event()
+        threading.Thread(
+            target=self._produce, args=(events, cancelled, first_token_by, finish_by),
+            name="recommendation-stream", daemon=True
+        ).start()
+
+        finish_reason = None
+        try:
+            while True:
+                wait_until = first_token_by if self.time_to_first_token is None else finish_by
+                try:
+                    kind, value = events.get(timeout=max(0.0, wait_until - time.perf_counter()))
+                except queue.Empty:
+                    REQUEST_LIMITER.record("timeouts")
+                    if self.time_to_first_token is None:
+                        raise RecommendationTimeoutError(f"{self.first_token_deadline:.0f}초 안에 응답이 시작되지 않았습니다.")
+                    raise RecommendationTimeoutError(f"{self.deadline:.0f}초 안에 응답이 끝나지 않았습니다.")
+                if kind == "error":
+                    raise value
+                if kind == "done":
+                    finish_reason = value
+                    break
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - started_at
+                self.text += value
+                yield value
+        finally:
+            cancelled.set() # 기한 초과, 오류, 반복 중단 시 백그라운드 호출 정리
+
+        self.total_time = time.perf_counter() - started_at
+        self.text = self.text.strip()
+        # finish_reason 없이 스트림이 끝나면 연결이 끊긴 것 - 부분 응답은 캐시하지 않음
+        self.completed = finish_reason is not None
+        if self.completed and self.cache is not None and self.text:
+            self.cache.set(key, self.text)
+
+    def _produce(self, events, cancelled, first_token_by, finish_by):
+        """백그라운드 스레드 - API 를 호출해 ("delta", 조각) 을 넣고 마지막에 ("done", finish_reason) 또는 ("error", 예외)
+
+        첫 토큰 전의 재시도 가능한 오류만 재시도 (이미 일부를 보냈다면 중복 출력을 피하기 위해 그대로 전달),
+        슬롯 대기/백오프/호출 타임아웃은 모두 남은 기한 안으로 줄임.
+        """
+        sent = False
+        attempt = 0
+        while not cancelled.is_set():
+            try:
+                with REQUEST_LIMITER.slot(max(0.0, min(self.queue_timeout, first_token_by - time.perf_counter()))):
+                    stream = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": self.system_message},
+                            {"role": "user", "content": self.user_prompt}
+                        ],
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        stream=True,
+                        timeout=max(0.1, min(self.timeout, finish_by - time.perf_counter()))
+                    )
+                    finish_reason = None
+                    try:
+                        for chunk in stream:
+                            if cancelled.is_set():
+                                return
+                            if not chunk.choices:
+                                continue
+                            finish_reason = chunk.choices[0].finish_reason or finish_reason
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                events.put(("delta", delta))
+                                sent = True
+                    finally:
+                        stream.close()
+                events.put(("done", finish_reason))
+                return
+            except RecommendationBusyError as e:
+                events.put(("error", e))
+                return
+            except Exception as e:
+                delay = _backoff_delay(attempt, e)
+                if (sent or cancelled.is_set() or not _is_retryable(e) or attempt >= self.max_retries
+                        or time.perf_counter() + delay >= first_token_by):
+                    REQUEST_LIMITER.record("failures")
+                    events.put(("error", e))
+                    return
+                print(f"Recommendation stream failed ({type(e).__name__}), retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                REQUEST_LIMITER.record("retries")
+                self.retries += 1
+                attempt += 1
+                cancelled.wait(delay)
+
+
+def stream_recommendation(client, user_prompt, system_message, cache=None, **kwargs):
+    """스트리밍으로 GPT 스타일 추천 요청 (캐시 적중 시 캐시된 전체 텍스트를 한 번에 내보냄)"""
+    return RecommendationStream(client, user_prompt, system_message, cache=cache, **kwargs)
+
+# --- END OF FILE recommendation.py ---
@@ -0,0 +1,138 @@
+# --- START OF FILE result_cache.py ---
+
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+from image_store import image_nbytes
+
+# --- ⚙️ 기본 한도 설정 ---
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024 # 결과 캐시 전체 메모리 한도 (512MB)
+
+
+def value_nbytes(value):
+    """캐시 값의 대략적인 메모리 사용량 - 안에 든 PIL 이미지 바이트 합계 (이미지가 아닌 값은 0)"""
+    if isinstance(value, Image.Image):
+        return image_nbytes(value)
+    if isinstance(value, dict):
+        return sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(v) for v in value)
+    return 0
+
+
+class _Flight:
+    """진행 중인 계산 하나 - 같은 키를 요청한 다른 스레드는 이 계산이 끝나기를 기다림"""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """세션 간 공유되는 연산 결과 캐시 (프로세스 전체 공유)
+
+    - 키: (원본 내용 해시, 연산, 정규화된 파라미터)를 해시한 문자열 (RenderPipeline.stage_key)
+    - 바이트 한도를 넘으면 가장 오래 사용하지 않은 결과부터 제거 (LRU)
+    - 같은 키를 동시에 요청하면 한 번만 계산하고 나머지는 그 결과를 기다림 (single-flight)
+
+    캐시된 이미지는 여러 세션이 함께 참조하므로 호출자는 결과를 제자리 수정하면 안 됨.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # key -> (value, nbytes)
+        self._flights = {}            # key -> _Flight
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "errors": 0}
+
+    def get_or_compute(self, key, compute):
+        """키의 결과가 있으면 재사용, 다른 스레드가 계산 중이면 기다리고, 없으면 compute()로 계산해 저장
+
+        Returns:
+            tuple: (값, 상태) - 상태는 "hit", "coalesced"(다른 요청의 계산 결과를 받음), "miss" 중 하나
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0], "hit"
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+                self.stats["misses"] += 1
+            else:
+                leader = False
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, "coalesced"
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._flights.pop(key, None)
+                self.stats["errors"] += 1
+            flight.error = e # 기다리던 요청에도 같은 예외 전달 (실패 결과는 캐시하지 않음)
+            flight.done.set()
+            raise
+
+        with self._lock:
+            self._store(key, value)
+            self._flights.pop(key, None)
+        flight.value = value
+        flight.done.set()
+        return value, "miss"
+
+    def _store(self, key, value):
+        """self._lock 보유 상태에서 호출 - 저장 후 한도를 넘으면 오래된 결과부터 제거"""
+        nbytes = value_nbytes(value)
+        if nbytes > self.max_bytes:
+            return # 한도보다 큰 결과는 저장하지 않음 (다른 결과를 모두 밀어내지 않도록)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[1]
+        self._entries[key] = (value, nbytes)
+        self.total_bytes += nbytes
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_bytes
+            self.stats["evictions"] += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def totals(self):
+        """캐시 집계 (결과 수, 바이트, 한도, 적중/계산/대기 횟수 등)"""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.total_bytes, "max_bytes": self.max_bytes,
+                    "in_flight": len(self._flights), **self.stats}
+
+# --- END OF FILE result_cache.py ---
@@ -1,10 +1,15 @@
-import cv2
 import numpy as np
 from PIL import Image, ImageFilter
-import requests
 from io import BytesIO
 import os
 
+from compute_budget import configure_cv2
+from lazy_imports import lazy_module
+from utils import prepare_garment
+
+cv2 = lazy_module("cv2", on_load=configure_cv2) # 첫 사용 시 임포트 (스레드 수는 코어 예산에 맞춤)
+requests = lazy_module("requests") # 샘플 다운로드(use_local=False)에서만 사용
+
 # --- 샘플 의상 이미지 URL 정의 ---
 CLOTHING_URLS = {
     "casual_tshirt": "https://www.publicdomainpictures.net/pictures/320000/nahled/t-shirt-transparent.png",
@@ -72,7 +77,7 @@ def load_images_from_folder(folder_path):
 
 
 def prepare_clothing_samples(use_local=True, local_dir="assets/clothes", fallback_to_url=True):
-    """샘플 의상 이미지 준비 (로컬 우선)"""
+    """샘플 의상 이미지 준비 (로컬 우선) - 배경 제거/크롭/premultiplied 전처리까지 마친 RGBa (prepare_garment)"""
     clothing_images = {}
     if use_local:
         clothing_images = load_images_from_folder(local_dir)
@@ -87,7 +92,7 @@ def prepare_clothing_samples(use_local=True, local_dir="assets/clothes", fallbac
                  loaded_count +=1
         print(f"Downloaded {loaded_count} clothing samples from URLs.")
 
-    return clothing_images
+    return {style: prepare_garment(img) for style, img in clothing_images.items()}
 
 def prepare_makeup_style_samples(local_dir="assets/makeup_styles"):
     """메이크업 스타일 참조 이미지 로드"""
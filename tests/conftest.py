@@ -0,0 +1,41 @@
+# --- START OF FILE tests/conftest.py ---
+"""테스트 공통 설정 - 저장소 루트의 모듈(result_cache, admission 등)을 패키지 설치 없이 임포트"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def wait_until(predicate, timeout=5.0, interval=0.005):
+    """predicate() 가 참이 될 때까지 대기 (스레드가 대기열에 들어갔는지 등 확인용), 시간 초과 시 AssertionError"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached within timeout")
+        time.sleep(interval)
+
+
+@pytest.fixture
+def fake_openai():
+    """tools/fake_openai_server 를 빈 포트에 띄우고 (server, client) 반환 - server 속성으로 지연/429/끊김 주입"""
+    openai = pytest.importorskip("openai")
+    from tools.fake_openai_server import create_server
+
+    server = create_server(port=0, first_token_delay=0.0, token_delay=0.0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    client = openai.OpenAI(api_key="test", base_url=f"http://{host}:{port}/v1", max_retries=0)
+    try:
+        yield server, client
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+# --- END OF FILE tests/conftest.py ---
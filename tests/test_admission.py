@@ -0,0 +1,145 @@
+# --- START OF FILE tests/test_admission.py ---
+
+import threading
+
+import pytest
+from PIL import Image
+
+from admission import (
+    VIDEO_UNKNOWN_FRAMES, AdmissionController, AdmissionRejected, estimate_cost, estimate_video_cost, image_megapixels,
+    preview_image, preview_megapixels
+)
+from conftest import wait_until
+
+
+class _Holder:
+    """입장한 채로 release() 될 때까지 자리를 차지하는 작업 (다른 작업을 대기열로 보내기 위해)"""
+
+    def __init__(self, controller, session_id="holder", cost=1.0):
+        self.entered = threading.Event()
+        self._release = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(controller, session_id, cost))
+        self._thread.start()
+        assert self.entered.wait(5)
+
+    def _run(self, controller, session_id, cost):
+        with controller.admit(session_id, cost):
+            self.entered.set()
+            self._release.wait(5)
+
+    def release(self):
+        self._release.set()
+        self._thread.join(5)
+
+
+def _enqueue(controller, session_id, name, order, cost=1.0, **kwargs):
+    """대기열에 작업 하나를 넣고 실제로 대기열에 들어갈 때까지 기다림 (입장하면 name 기록)"""
+    queued_before = controller.snapshot()["queued"]
+    result = {}
+
+    def run():
+        try:
+            with controller.admit(session_id, cost, **kwargs) as admission:
+                result["admission"] = admission
+                order.append(name)
+        except AdmissionRejected as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_until(lambda: controller.snapshot()["queued"] == queued_before + 1)
+    return thread, result
+
+
+def test_sessions_are_admitted_round_robin():
+    controller = AdmissionController(max_active=1, max_backlog=1000, policy="reject")
+    holder = _Holder(controller)
+    order = []
+    threads = [
+        _enqueue(controller, "A", "A1", order)[0],
+        _enqueue(controller, "A", "A2", order)[0],
+        _enqueue(controller, "A", "A3", order)[0],
+        _enqueue(controller, "B", "B1", order)[0],
+    ]
+    holder.release()
+    for thread in threads:
+        thread.join(5)
+
+    # A 가 먼저 여러 작업을 넣었어도 B 는 A 의 첫 작업 다음에 입장
+    assert order == ["A1", "B1", "A2", "A3"]
+    snapshot = controller.snapshot()
+    assert snapshot["active"] == 0 and snapshot["queued"] == 0 and snapshot["admitted"] == 5
+
+
+def test_zero_cost_jobs_skip_the_queue():
+    controller = AdmissionController(max_active=1, max_backlog=1000, policy="reject")
+    holder = _Holder(controller)
+    with controller.admit("other", 0.0) as admission:
+        assert not admission.degraded and admission.waited == 0.0
+    holder.release()
+
+
+def test_reject_policy_fails_fast_when_backlog_is_full():
+    controller = AdmissionController(max_active=1, max_backlog=1.0, policy="reject")
+    holder = _Holder(controller)
+    order = []
+    waiting, _ = _enqueue(controller, "A", "A1", order, cost=0.8)
+
+    with pytest.raises(AdmissionRejected):
+        with controller.admit("B", 0.5, preview_cost=0.1):
+            pytest.fail("should not be admitted")
+    assert controller.snapshot()["rejected"] == 1
+    assert controller.snapshot()["queued"] == 1 # 거절된 작업은 대기열에 남지 않음
+
+    holder.release()
+    waiting.join(5)
+    assert order == ["A1"]
+
+
+def test_degrade_policy_admits_at_preview_cost():
+    controller = AdmissionController(max_active=1, max_backlog=1.0, policy="degrade")
+    holder = _Holder(controller)
+    order = []
+    first, _ = _enqueue(controller, "A", "A1", order, cost=0.8)
+    degraded, result = _enqueue(controller, "B", "B1", order, cost=0.5, preview_cost=0.1)
+
+    assert controller.snapshot()["degraded"] == 1
+    holder.release()
+    first.join(5)
+    degraded.join(5)
+
+    assert result["admission"].degraded and result["admission"].cost == pytest.approx(0.1)
+    assert order == ["A1", "B1"]
+
+
+def test_degrade_policy_rejects_jobs_without_a_preview():
+    controller = AdmissionController(max_active=1, max_backlog=1.0, policy="degrade")
+    holder = _Holder(controller)
+    order = []
+    waiting, _ = _enqueue(controller, "A", "A1", order, cost=0.8)
+
+    with pytest.raises(AdmissionRejected):
+        with controller.admit("B", 0.5, preview_cost=None):
+            pytest.fail("should not be admitted")
+
+    holder.release()
+    waiting.join(5)
+
+
+def test_preview_megapixels_matches_preview_image_without_building_it():
+    large = Image.new("RGB", (4000, 3000))
+    assert preview_megapixels(large, max_side=1024) == pytest.approx(image_megapixels(preview_image(large, max_side=1024)))
+    assert preview_megapixels(Image.new("RGB", (1024, 700)), max_side=1024) is None # 이미 작으면 degrade 불가
+
+
+def test_video_cost_scales_with_frame_count():
+    per_frame = estimate_cost(["makeup"], 0.9)
+    assert estimate_video_cost(120, 0.9) == pytest.approx(120 * per_frame)
+    assert estimate_video_cost(None, 0.9) == pytest.approx(VIDEO_UNKNOWN_FRAMES * per_frame) # 프레임 수를 모르는 컨테이너
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        AdmissionController(policy="drop")
+
+# --- END OF FILE tests/test_admission.py ---
@@ -0,0 +1,101 @@
+# --- START OF FILE tests/test_asset_pack.py ---
+
+import pickle
+import random
+from multiprocessing import shared_memory
+
+import pytest
+from PIL import Image
+
+import worker_pool
+from asset_pack import AssetPack, build_asset_pack
+from display import get_display_image
+from pipeline import RenderPipeline
+from utils import GARMENT_OFFSET_KEY, change_clothing_color, is_premultiplied, prepare_garment, virtual_try_on
+
+GARMENT_SIZE = (90, 120)
+
+
+def _garment():
+    """반투명 가장자리가 있는 의상 - 알파가 0/255 가 아닌 픽셀이 있어야 premultiplied 해석 차이가 드러남"""
+    rng = random.Random(1)
+    img = Image.new("RGBA", GARMENT_SIZE, (0, 0, 0, 0))
+    for y in range(15, 110):
+        for x in range(10, 80):
+            alpha = min(255, 40 + 3 * min(x - 10, 79 - x, y - 15, 109 - y) * 4)
+            img.putpixel((x, y), (rng.randrange(256), rng.randrange(256), rng.randrange(256), alpha))
+    return img
+
+
+@pytest.fixture
+def garments(tmp_path):
+    """(에셋 팩에서 맵한 의상, 같은 원본을 prepare_garment 로 전처리한 RGBa 의상)"""
+    clothes_dir = tmp_path / "clothes"
+    clothes_dir.mkdir()
+    _garment().save(clothes_dir / "shirt.png")
+    pack_path = str(tmp_path / "assets.pack")
+    build_asset_pack(pack_path, {"clothing": str(clothes_dir)})
+    packed = AssetPack(pack_path).image("clothing", "shirt")
+    reference = prepare_garment(Image.open(clothes_dir / "shirt.png"))
+    assert reference.mode == "RGBa"
+    return packed, reference
+
+
+@pytest.fixture
+def person():
+    rng = random.Random(2)
+    return Image.frombytes("RGB", (200, 240), bytes(rng.randrange(256) for _ in range(200 * 240 * 3)))
+
+
+def test_packed_garment_is_mapped_without_copy(garments):
+    packed, reference = garments
+    assert packed.mode == "RGBA" and packed.readonly # 메모리 맵 위의 이미지 (복사 없음)
+    assert is_premultiplied(packed)
+    assert packed.info[GARMENT_OFFSET_KEY] == reference.info[GARMENT_OFFSET_KEY]
+    assert packed.tobytes() == reference.tobytes()
+    assert is_premultiplied(packed.copy()) # copy() 는 info 를 유지
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.73, 1.4])
+def test_try_on_matches_the_rgba_reference(garments, person, scale):
+    packed, reference = garments
+    expected = virtual_try_on(person, reference, (20, 30), scale)
+    assert virtual_try_on(person, packed, (20, 30), scale).tobytes() == expected.tobytes()
+
+
+def test_color_change_matches_the_rgba_reference(garments, person):
+    packed, reference = garments
+    recolored = change_clothing_color(packed, "#3366CC")
+    assert is_premultiplied(recolored)
+    expected = virtual_try_on(person, change_clothing_color(reference, "#3366CC"), (20, 30))
+    assert virtual_try_on(person, recolored, (20, 30)).tobytes() == expected.tobytes()
+
+
+def test_worker_round_trip_keeps_the_flag(garments, person, monkeypatch):
+    """부모 → 공유 메모리(pickle 되는 참조) → 워커의 tryon 단계 → 부모로 돌아온 결과가 RGBa 의상과 같음"""
+    packed, reference = garments
+    monkeypatch.setitem(worker_pool._worker, "pipeline", RenderPipeline())
+    blocks = []
+    try:
+        input_ref = worker_pool._image_to_shared(person, blocks)
+        output_block = shared_memory.SharedMemory(create=True, size=input_ref.nbytes)
+        blocks.append(output_block)
+        output_ref = worker_pool.SharedImageRef(output_block.name, "RGB", input_ref.size)
+        params = pickle.loads(pickle.dumps(worker_pool._share_params({"garment": packed, "position": (20, 30)}, blocks)))
+
+        assert is_premultiplied(worker_pool._unshare_params(params)["garment"])
+        assert worker_pool._run_stage_job("tryon", input_ref, output_ref, params)
+        result = worker_pool._copy_from_block(output_block, output_ref)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    assert result.tobytes() == virtual_try_on(person, reference, (20, 30)).tobytes()
+
+
+def test_display_proxy_matches_the_rgba_reference(garments):
+    packed, reference = garments
+    assert get_display_image(packed, 60).tobytes() == get_display_image(reference, 60).tobytes()
+
+# --- END OF FILE tests/test_asset_pack.py ---
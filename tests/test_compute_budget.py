@@ -0,0 +1,80 @@
+# --- START OF FILE tests/test_compute_budget.py ---
+
+import threading
+
+from compute_budget import ComputeBudget
+from conftest import wait_until
+
+
+def _run_in_slot(budget, cores, name, order, release=None):
+    """스레드에서 slot(cores) 를 잡고 name 기록 (release 가 있으면 그때까지 슬롯 유지)"""
+    def run():
+        with budget.slot(cores):
+            order.append(name)
+            if release is not None:
+                release.wait(5)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_requests_are_served_in_arrival_order():
+    budget = ComputeBudget(cores=2)
+    order = []
+    release = threading.Event()
+    holder = _run_in_slot(budget, 1, "holder", order, release)
+    wait_until(lambda: budget.stats()["busy"] == 1)
+
+    big = _run_in_slot(budget, 2, "big", order)
+    wait_until(lambda: budget.stats()["queued"] == 1)
+    small = _run_in_slot(budget, 1, "small", order)
+    wait_until(lambda: budget.stats()["queued"] == 2)
+
+    # 남은 1코어에 들어갈 수 있어도 먼저 온 큰 요청을 앞지르지 않음
+    assert order == ["holder"]
+
+    release.set()
+    for thread in (holder, big, small):
+        thread.join(5)
+    assert order == ["holder", "big", "small"]
+    stats = budget.stats()
+    assert stats["busy"] == 0 and stats["queued"] == 0
+    assert stats["runs"] == 3 and stats["peak_queued"] == 2
+
+
+def test_concurrent_slots_never_exceed_the_budget():
+    budget = ComputeBudget(cores=3)
+    lock = threading.Lock()
+    state = {"busy": 0, "peak": 0}
+
+    def run():
+        with budget.slot(2):
+            with lock:
+                state["busy"] += 2
+                state["peak"] = max(state["peak"], state["busy"])
+            with lock:
+                state["busy"] -= 2
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert state["peak"] <= 3
+    assert budget.stats()["runs"] == 8
+
+
+def test_requests_larger_than_the_budget_are_clamped():
+    budget = ComputeBudget(cores=2)
+    with budget.slot(8):
+        assert budget.stats()["busy"] == 2
+
+
+def test_nested_slots_reuse_the_outer_slot():
+    budget = ComputeBudget(cores=1)
+    with budget.slot(1):
+        with budget.slot(1): # 같은 스레드의 중첩 호출은 교착 없이 바깥 슬롯 사용
+            assert budget.stats()["busy"] == 1
+    assert budget.stats()["busy"] == 0 and budget.stats()["runs"] == 1
+
+# --- END OF FILE tests/test_compute_budget.py ---
@@ -0,0 +1,84 @@
+# --- START OF FILE tests/test_recommendation_cache.py ---
+
+import json
+
+import recommendation
+from recommendation import RecommendationCache, stream_recommendation
+
+SYSTEM_MESSAGE = "당신은 테스트용 스타일리스트입니다."
+
+
+def test_equivalent_prompts_share_a_key():
+    key = RecommendationCache.make_key("  가을 웜톤  데일리룩 추천!", "m", 0.7, "v1")
+    assert key == RecommendationCache.make_key("가을 웜톤 데일리룩 추천", "m", 0.7, "v1")
+    assert key != RecommendationCache.make_key("가을 웜톤 데일리룩 추천", "m", 0.2, "v1") # 온도가 다르면 다른 응답
+    assert key != RecommendationCache.make_key("가을 웜톤 데일리룩 추천", "m", 0.7, "v2")
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(recommendation.time, "time", lambda: now[0])
+    cache = RecommendationCache(ttl=60)
+    cache.set("k", "value")
+
+    now[0] += 59
+    assert cache.get("k") == "value"
+    now[0] += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+    assert cache.stats == {"hits": 1, "misses": 1, "expired": 1, "evictions": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RecommendationCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A" # a 를 최근 사용으로
+    cache.set("c", "C")
+
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats["evictions"] == 1
+    assert cache.hit_rate() == 3 / 4
+
+
+def test_writes_are_debounced_and_reloaded(tmp_path):
+    path = tmp_path / "recommendations.json"
+    cache = RecommendationCache(persist_path=str(path), save_delay=60)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert not path.exists() # save_delay 가 지나기 전에는 쓰지 않음
+
+    cache.flush()
+    assert [key for key, _ in json.loads(path.read_text(encoding="utf-8"))["entries"]] == ["a", "b"]
+    assert not list(tmp_path.glob("*.tmp")) # 임시 파일은 교체 후 남지 않음
+
+    reloaded = RecommendationCache(persist_path=str(path), save_delay=60)
+    assert reloaded.get("a") == "A" and reloaded.get("b") == "B"
+
+
+def test_expired_entries_are_not_reloaded(tmp_path, monkeypatch):
+    path = tmp_path / "recommendations.json"
+    cache = RecommendationCache(ttl=60, persist_path=str(path), save_delay=60)
+    cache.set("a", "A")
+    cache.flush()
+
+    later = recommendation.time.time() + 120
+    monkeypatch.setattr(recommendation.time, "time", lambda: later)
+    assert len(RecommendationCache(ttl=60, persist_path=str(path), save_delay=60)) == 0
+
+
+def test_repeated_prompt_is_served_from_cache(fake_openai):
+    server, client = fake_openai
+    cache = RecommendationCache()
+
+    first = stream_recommendation(client, "가을 웜톤 데일리룩", SYSTEM_MESSAGE, cache=cache)
+    first_text = "".join(first)
+    second = stream_recommendation(client, "  가을 웜톤   데일리룩!", SYSTEM_MESSAGE, cache=cache)
+    second_chunks = list(second)
+
+    assert server.request_count == 1 # 두 번째 요청은 서버를 호출하지 않음
+    assert second.from_cache and second.completed
+    assert second_chunks == [first.text] and first_text.strip() == first.text == server.reply
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+# --- END OF FILE tests/test_recommendation_cache.py ---
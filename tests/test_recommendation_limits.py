@@ -0,0 +1,103 @@
+# --- START OF FILE tests/test_recommendation_limits.py ---
+
+import threading
+import time
+
+import pytest
+
+from conftest import wait_until
+from recommendation import (
+    MAX_CONCURRENT_REQUESTS, REQUEST_LIMITER, RecommendationBusyError, RecommendationTimeoutError, stream_recommendation
+)
+
+SYSTEM_MESSAGE = "당신은 테스트용 스타일리스트입니다."
+
+
+@pytest.fixture
+def limiter():
+    """테스트마다 동시 호출 상한을 바꾸고 끝나면 되돌림 (REQUEST_LIMITER 는 프로세스 전체 공유)"""
+    yield REQUEST_LIMITER
+    REQUEST_LIMITER.configure(MAX_CONCURRENT_REQUESTS)
+
+
+def test_rate_limited_requests_are_retried(fake_openai):
+    server, client = fake_openai
+    server.rate_limit_first = 2
+    server.retry_after = 0
+    stream = stream_recommendation(client, "데일리룩", SYSTEM_MESSAGE)
+
+    assert "".join(stream).strip() == server.reply
+    assert stream.completed and stream.retries == 2
+    assert server.request_count == 3 and server.rate_limited_count == 2
+
+
+def test_retries_stop_at_the_first_token_deadline(fake_openai):
+    openai = pytest.importorskip("openai")
+    server, client = fake_openai
+    server.rate_limit_first = 100
+    server.retry_after = 1 # 한 번 더 기다리면 첫 토큰 기한을 넘김
+    stream = stream_recommendation(client, "데일리룩", SYSTEM_MESSAGE, max_retries=5, first_token_deadline=0.5)
+
+    started = time.perf_counter()
+    with pytest.raises(openai.RateLimitError):
+        list(stream)
+    assert time.perf_counter() - started < 0.5 # 기한 안에 끝날 수 없는 백오프는 기다리지 않음
+    assert stream.retries == 0 and server.request_count == 1
+
+
+def test_slow_first_token_times_out_without_blocking(fake_openai):
+    server, client = fake_openai
+    server.first_token_delay = 2.0
+    stream = stream_recommendation(client, "데일리룩", SYSTEM_MESSAGE, first_token_deadline=0.3)
+
+    started = time.perf_counter()
+    with pytest.raises(RecommendationTimeoutError):
+        list(stream)
+    assert time.perf_counter() - started < 1.0 # 서버 응답을 기다리지 않고 기한에 반환
+    assert stream.text == "" and not stream.completed
+
+
+def test_response_deadline_keeps_partial_text(fake_openai):
+    server, client = fake_openai
+    server.token_delay = 0.2
+    stream = stream_recommendation(client, "데일리룩", SYSTEM_MESSAGE, deadline=0.5)
+
+    with pytest.raises(RecommendationTimeoutError):
+        for _ in stream:
+            pass
+    assert stream.text and not stream.completed
+    assert server.reply.startswith(stream.text)
+
+
+def test_concurrent_calls_are_capped(fake_openai, limiter):
+    server, client = fake_openai
+    server.first_token_delay = 0.2
+    limiter.configure(2)
+
+    streams = [stream_recommendation(client, f"요청 {i}", SYSTEM_MESSAGE) for i in range(5)]
+    threads = [threading.Thread(target=list, args=(stream,)) for stream in streams]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert all(stream.completed for stream in streams)
+    assert server.peak_in_flight == 2 and server.rate_limited_count == 0
+
+
+def test_busy_error_when_no_slot_frees_up(fake_openai, limiter):
+    server, client = fake_openai
+    server.first_token_delay = 1.0
+    limiter.configure(1)
+    holder = stream_recommendation(client, "먼저 온 요청", SYSTEM_MESSAGE)
+    thread = threading.Thread(target=list, args=(holder,))
+    thread.start()
+    wait_until(lambda: server.in_flight == 1)
+
+    waiting = stream_recommendation(client, "나중 요청", SYSTEM_MESSAGE, queue_timeout=0.1)
+    with pytest.raises(RecommendationBusyError):
+        list(waiting)
+    thread.join(5)
+    assert holder.completed
+
+# --- END OF FILE tests/test_recommendation_limits.py ---
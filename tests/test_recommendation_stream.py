@@ -0,0 +1,46 @@
+# --- START OF FILE tests/test_recommendation_stream.py ---
+
+import pytest
+
+from recommendation import RecommendationCache, stream_recommendation
+from tools.fake_openai_server import split_tokens
+
+SYSTEM_MESSAGE = "당신은 테스트용 스타일리스트입니다."
+
+
+def test_tokens_are_yielded_as_they_arrive(fake_openai):
+    server, client = fake_openai
+    server.token_delay = 0.01
+    stream = stream_recommendation(client, "면접 메이크업", SYSTEM_MESSAGE)
+
+    chunks = list(stream)
+    assert chunks == split_tokens(server.reply) # 서버가 보낸 조각 그대로, 순서대로
+    assert stream.completed and stream.text == server.reply
+    assert 0 < stream.time_to_first_token < stream.total_time
+
+
+def test_dropped_stream_keeps_partial_text_and_is_not_cached(fake_openai):
+    server, client = fake_openai
+    server.drop_after = 3
+    cache = RecommendationCache()
+    stream = stream_recommendation(client, "여름 휴가룩", SYSTEM_MESSAGE, cache=cache)
+
+    chunks = list(stream)
+    assert len(chunks) == 3
+    assert not stream.completed
+    assert stream.text == "".join(split_tokens(server.reply)[:3]).strip()
+    assert len(cache) == 0 # 부분 응답은 캐시하지 않음
+
+
+def test_failed_request_has_no_first_token_time(fake_openai):
+    openai = pytest.importorskip("openai")
+    server, client = fake_openai
+    server.rate_limit_first = 1
+    stream = stream_recommendation(client, "데일리룩", SYSTEM_MESSAGE, max_retries=0)
+
+    with pytest.raises(openai.RateLimitError):
+        list(stream)
+    assert stream.text == "" and not stream.completed
+    assert stream.time_to_first_token is None
+
+# --- END OF FILE tests/test_recommendation_stream.py ---
@@ -0,0 +1,121 @@
+# --- START OF FILE tests/test_result_cache.py ---
+
+import threading
+
+import pytest
+from PIL import Image
+
+from conftest import wait_until
+from result_cache import ResultCache
+
+
+def _image(nbytes):
+    """nbytes 바이트짜리 L 모드 이미지 (image_nbytes = 너비 × 높이 × 밴드 수)"""
+    return Image.new("L", (nbytes, 1))
+
+
+def test_single_flight_propagates_leader_error_to_waiters():
+    cache = ResultCache(max_bytes=1000)
+    release = threading.Event()
+    calls = []
+
+    def failing_compute():
+        calls.append("leader")
+        release.wait(5)
+        raise ValueError("boom")
+
+    def follower_compute():
+        calls.append("follower") # 호출되면 안 됨 - 진행 중인 계산을 기다려야 함
+        return "unexpected"
+
+    errors = {}
+
+    def run(name, compute):
+        try:
+            cache.get_or_compute("k", compute)
+        except ValueError as e:
+            errors[name] = e
+
+    leader = threading.Thread(target=run, args=("leader", failing_compute))
+    leader.start()
+    wait_until(lambda: cache.totals()["in_flight"] == 1)
+    follower = threading.Thread(target=run, args=("follower", follower_compute))
+    follower.start()
+    wait_until(lambda: cache.totals()["coalesced"] == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert calls == ["leader"]
+    assert errors["leader"] is errors["follower"]
+    totals = cache.totals()
+    assert totals["errors"] == 1 and totals["in_flight"] == 0
+    assert "k" not in cache # 실패 결과는 캐시하지 않음
+
+    # 다음 요청은 새로 계산
+    value, status = cache.get_or_compute("k", lambda: "ok")
+    assert (value, status) == ("ok", "miss")
+
+
+def test_single_flight_computes_once_for_concurrent_requests():
+    cache = ResultCache(max_bytes=1000)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.totals()["coalesced"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["coalesced", "coalesced", "coalesced", "miss"]
+    assert all(value == "value" for value, _ in results)
+
+
+def test_lru_byte_accounting_and_eviction_order():
+    cache = ResultCache(max_bytes=250)
+    cache.get_or_compute("a", lambda: _image(100))
+    cache.get_or_compute("b", lambda: _image(100))
+    assert cache.total_bytes == 200
+
+    assert cache.get_or_compute("a", lambda: pytest.fail("cached"))[1] == "hit" # a 를 최근 사용으로
+    cache.get_or_compute("c", lambda: _image(100))
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.total_bytes == 200
+    assert cache.totals()["evictions"] == 1
+
+
+def test_values_are_sized_by_contained_images():
+    cache = ResultCache(max_bytes=1000)
+    cache.get_or_compute("pair", lambda: (_image(120), True))
+    cache.get_or_compute("plain", lambda: "text")
+    assert cache.total_bytes == 120
+
+
+def test_oversized_value_is_returned_but_not_stored():
+    cache = ResultCache(max_bytes=250)
+    cache.get_or_compute("small", lambda: _image(100))
+    value, status = cache.get_or_compute("huge", lambda: _image(300))
+
+    assert status == "miss" and value.width == 300
+    assert "huge" not in cache and "small" in cache # 다른 결과를 밀어내지 않음
+    assert cache.total_bytes == 100
+
+
+def test_clear_resets_byte_total():
+    cache = ResultCache(max_bytes=1000)
+    cache.get_or_compute("a", lambda: _image(100))
+    cache.clear()
+    assert len(cache) == 0 and cache.total_bytes == 0
+
+# --- END OF FILE tests/test_result_cache.py ---
@@ -0,0 +1,64 @@
+# --- START OF FILE tests/test_tiling.py ---
+
+import random
+
+import pytest
+from PIL import Image, ImageFilter
+
+from tiling import map_tiles, tile_rects, tiled_histogram
+
+
+def _noise_image(size, mode="RGB", seed=0):
+    """타일 경계 오류가 드러나도록 픽셀마다 다른 값의 이미지"""
+    rng = random.Random(seed)
+    return Image.frombytes(mode, size, bytes(rng.randrange(256) for _ in range(size[0] * size[1] * len(mode))))
+
+
+def test_tile_rects_cover_the_image_exactly():
+    rects = tile_rects((130, 70), tile_size=64)
+    assert rects[0] == (0, 0, 64, 64) and rects[-1] == (128, 64, 130, 70)
+    assert sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects) == 130 * 70
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_pointwise_op_is_bit_identical(workers):
+    img = _noise_image((203, 157))
+    expected = img.point(lambda v: 255 - v)
+    tiled = map_tiles(img, lambda tile: tile.point(lambda v: 255 - v), tile_size=64, workers=workers)
+    assert tiled.tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_neighbourhood_op_with_halo_is_bit_identical(workers):
+    img = _noise_image((203, 157))
+    blur = ImageFilter.BoxBlur(3)
+    expected = img.filter(blur)
+    tiled = map_tiles(img, lambda tile: tile.filter(blur), halo=8, tile_size=64, workers=workers)
+    assert tiled.tobytes() == expected.tobytes()
+
+
+def test_in_place_processing_without_halo():
+    img = _noise_image((150, 90), mode="L")
+    expected = img.point(lambda v: v // 2)
+    result = map_tiles(img, lambda tile: tile.point(lambda v: v // 2), dst=img, tile_size=64)
+    assert result is img and img.tobytes() == expected.tobytes()
+
+
+def test_in_place_processing_with_halo_is_rejected():
+    img = _noise_image((80, 80), mode="L")
+    with pytest.raises(ValueError):
+        map_tiles(img, lambda tile: tile, dst=img, halo=2, tile_size=32)
+
+
+def test_out_mode_converts_tiles():
+    img = _noise_image((100, 70))
+    tiled = map_tiles(img, lambda tile: tile, tile_size=32, out_mode="L")
+    assert tiled.mode == "L" and tiled.tobytes() == img.convert("L").tobytes()
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_tiled_histogram_matches_full_histogram(workers):
+    img = _noise_image((203, 157))
+    assert tiled_histogram(img, tile_size=64, workers=workers) == img.histogram()
+
+# --- END OF FILE tests/test_tiling.py ---
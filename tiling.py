@@ -0,0 +1,115 @@
+# --- START OF FILE tiling.py ---
+"""
+타일 단위 이미지 처리 엔진 - 아주 큰 이미지(48MP 이상 등)를 고정 크기 타일로 나눠 처리해 최대 메모리를 타일 크기에 묶음
+
+- map_tiles: 타일(+ 주변 halo)을 잘라 함수를 적용하고 halo를 뺀 결과를 출력 이미지에 바로 붙임
+  (출력 이미지 한 장 외에는 타일 크기의 임시 버퍼만 사용, halo가 없으면 입력과 출력이 같은 이미지여도 됨)
+- reduce_tiles: 타일별 부분 결과(히스토그램, 합계 등)를 모아 전역 통계 계산 (대비/색 전송처럼 이미지 전체 값이 필요한 연산용)
+- 타일은 스레드 풀에서 병렬 처리 가능 (PIL/OpenCV 연산은 GIL을 놓으므로 스레드로 충분). 동시에 처리 중인 타일 수를
+  제한하므로 병렬이어도 메모리는 (워커 수 × 타일 크기)에 비례.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from compute_budget import THREADS_PER_CALL
+
+# --- ⚙️ 타일 설정 ---
+TILE_SIZE = 1024                  # 타일 한 변 (px) - 1024² RGB 약 3MB
+TILED_MIN_PIXELS = 8_000_000      # 이 픽셀 수 이상인 이미지는 타일 모드로 처리 (utils 연산, 결과는 전체 처리와 동일)
+TILE_WORKERS = THREADS_PER_CALL   # 타일 병렬 처리 스레드 수 (1이면 순차 처리) - 연산 하나가 코어 예산에서 받는 코어 수와 같음
+
+
+def should_tile(img_pil):
+    """타일 모드로 처리할 만큼 큰 이미지인지"""
+    return img_pil.width * img_pil.height >= TILED_MIN_PIXELS
+
+
+def tile_rects(size, tile_size=TILE_SIZE):
+    """이미지 크기를 덮는 타일 영역 목록 [(x0, y0, x1, y1), ...] (행 우선)"""
+    width, height = size
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+
+def _expand(rect, halo, size):
+    """타일 영역을 halo만큼 넓힌 영역 (이미지 경계에서는 잘림 - 경계 처리는 전체 이미지와 동일해짐)"""
+    x0, y0, x1, y1 = rect
+    return (max(0, x0 - halo), max(0, y0 - halo), min(size[0], x1 + halo), min(size[1], y1 + halo))
+
+
+def _run_ordered(fn, items, workers):
+    """items 순서대로 fn 결과를 내보냄 - 병렬이어도 동시에 처리 중인 항목은 workers * 2 개 이하"""
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile") as executor:
+        pending = [executor.submit(fn, item) for item in items[:window]]
+        next_index = len(pending)
+        while pending:
+            result = pending.pop(0).result()
+            if next_index < len(items):
+                pending.append(executor.submit(fn, items[next_index]))
+                next_index += 1
+            yield result
+
+
+def map_tiles(src, fn, dst=None, halo=0, tile_size=TILE_SIZE, workers=TILE_WORKERS, out_mode=None):
+    """타일마다 fn(타일 이미지)을 적용해 출력 이미지에 기록
+
+    Args:
+        src (PIL.Image): 입력 이미지
+        fn (callable): fn(tile) -> 같은 크기의 PIL 이미지 (halo 포함 크기)
+        dst (PIL.Image): 결과를 기록할 이미지 (None이면 새로 만듦, halo가 0이면 src 자신도 가능 - 제자리 처리)
+        halo (int): 타일 주변에 함께 넘길 여유 폭 (블러/샤픈 등 이웃 픽셀이 필요한 연산의 반경 이상)
+        tile_size (int): 타일 한 변
+        workers (int): 병렬 스레드 수
+        out_mode (str): dst를 새로 만들 때의 모드 (None이면 src와 같음)
+
+    Returns:
+        PIL.Image: dst
+    """
+    if dst is None:
+        dst = Image.new(out_mode or src.mode, src.size)
+    elif dst is src and halo > 0:
+        raise ValueError("In-place tiled processing requires halo=0 (neighbouring tiles would read modified pixels).")
+    elif dst.size != src.size:
+        raise ValueError(f"Tiled output size {dst.size} does not match input size {src.size}")
+
+    def process(rect):
+        outer = _expand(rect, halo, src.size)
+        result = fn(src.crop(outer))
+        if result.mode != dst.mode:
+            result = result.convert(dst.mode)
+        if outer != rect: # halo 제거
+            result = result.crop((rect[0] - outer[0], rect[1] - outer[1], rect[2] - outer[0], rect[3] - outer[1]))
+        return rect, result
+
+    # 붙여넣기는 호출 스레드에서만 (출력 이미지에 동시에 쓰지 않음)
+    for rect, result in _run_ordered(process, tile_rects(src.size, tile_size), workers):
+        dst.paste(result, rect[:2])
+    return dst
+
+
+def reduce_tiles(src, fn, combine, initial, tile_size=TILE_SIZE, workers=TILE_WORKERS):
+    """타일마다 fn(타일 이미지)으로 부분 결과를 구해 combine(누적, 부분)으로 합침 (전역 통계용)"""
+    total = initial
+    for partial in _run_ordered(lambda rect: fn(src.crop(rect)), tile_rects(src.size, tile_size), workers):
+        total = combine(total, partial)
+    return total
+
+
+def tiled_histogram(src, tile_size=TILE_SIZE, workers=TILE_WORKERS):
+    """이미지 전체 히스토그램 (Image.histogram() 과 같은 값, 타일 단위로 계산)"""
+    return reduce_tiles(
+        src, lambda tile: tile.histogram(), lambda total, part: [a + b for a, b in zip(total, part)],
+        [0] * (256 * len(src.getbands())), tile_size, workers
+    )
+
+# --- END OF FILE tiling.py ---
@@ -0,0 +1,315 @@
+# --- START OF FILE tools/bench_ops.py ---
+"""
+이미지 처리 핫패스 벤치마크 - utils 연산별 소요 시간, 처리량, 최대 메모리 측정
+
+사용 예:
+    python tools/bench_ops.py                                 # 1/4/12/48MP, 결과는 bench_results.json
+    python tools/bench_ops.py --sizes 1 4 --repeat 5 --ops apply_makeup apply_fashion_filter
+    python tools/bench_ops.py --save-baseline bench_baseline.json
+    python tools/bench_ops.py --baseline bench_baseline.json --threshold 0.15   # 회귀 시 종료 코드 1
+
+픽스처:
+    - synthetic: 그라디언트 + 노이즈 + 단순 얼굴 모양 (얼굴 감지가 안 될 수 있어 '감지 실패' 경로도 측정됨)
+    - assets/examples 의 이미지 (있으면): 실제 얼굴 사진, 각 해상도로 리사이즈
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+DEFAULT_SIZES_MP = (1, 4, 12, 48)
+EXAMPLES_DIR = os.path.join(ROOT_DIR, "assets", "examples")
+CLOTHES_DIR = os.path.join(ROOT_DIR, "assets", "clothes")
+MAKEUP_STYLES_DIR = os.path.join(ROOT_DIR, "assets", "makeup_styles")
+
+MAKEUP_VARIANTS = {
+    "lips": {'intensity': 0.6, 'apply_lips': True, 'lip_color': '#E64E6B', 'lip_intensity': 0.7},
+    "eyeshadow": {'intensity': 0.6, 'apply_eyeshadow': True, 'eyeshadow_color': '#8A5A94', 'eyeshadow_intensity': 0.5},
+    "blush": {'intensity': 0.6, 'apply_blush': True, 'blush_color': '#F08080', 'blush_intensity': 0.4},
+    "full": {'intensity': 0.6, 'apply_lips': True, 'lip_color': '#E64E6B', 'lip_intensity': 0.7,
+             'apply_eyeshadow': True, 'eyeshadow_color': '#8A5A94', 'eyeshadow_intensity': 0.5,
+             'apply_blush': True, 'blush_color': '#F08080', 'blush_intensity': 0.4},
+}
+FASHION_STYLES = ("casual", "vintage", "elegant", "monochrome")
+
+
+# --- 🧪 픽스처 ---
+def size_for_megapixels(megapixels, aspect=4 / 3):
+    """목표 메가픽셀과 가로세로 비율에 맞는 (너비, 높이)"""
+    height = int(round((megapixels * 1_000_000 / aspect) ** 0.5))
+    return int(round(height * aspect)), height
+
+
+def synthetic_portrait(width, height, seed=0):
+    """재현 가능한 합성 인물 이미지 (그라디언트 배경 + 노이즈 + 타원 얼굴/눈/입)"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width * 180 + 40, y / height * 120 + 60, (x + y) / (width + height) * 100 + 80], axis=-1)
+    base += rng.normal(0, 8, base.shape).astype(np.float32)
+    img = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8), 'RGB')
+    draw = ImageDraw.Draw(img)
+    cx, cy, fw, fh = width // 2, height // 2, width // 5, height // 3
+    draw.ellipse((cx - fw, cy - fh, cx + fw, cy + fh), fill=(224, 180, 150))
+    for ex in (cx - fw // 2, cx + fw // 2):
+        draw.ellipse((ex - fw // 6, cy - fh // 3 - fh // 12, ex + fw // 6, cy - fh // 3 + fh // 12), fill=(60, 40, 30))
+    draw.ellipse((cx - fw // 3, cy + fh // 2 - fh // 10, cx + fw // 3, cy + fh // 2 + fh // 10), fill=(170, 80, 90))
+    return img
+
+
+def synthetic_garment(width, height):
+    """알파 채널이 있는 합성 의상 (티셔츠 모양)"""
+    garment = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(garment)
+    w, h = width, height
+    draw.polygon([(w * 0.2, 0), (w * 0.8, 0), (w, h * 0.22), (w * 0.83, h * 0.3), (w * 0.8, h),
+                  (w * 0.2, h), (w * 0.17, h * 0.3), (0, h * 0.22)], fill=(40, 90, 200, 255))
+    return garment
+
+
+def _first_image(folder, mode):
+    if not os.path.isdir(folder):
+        return None
+    for filename in sorted(os.listdir(folder)):
+        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+            try:
+                return filename, Image.open(os.path.join(folder, filename)).convert(mode)
+            except Exception as e:
+                print(f"Skipping fixture {filename}: {e}")
+    return None
+
+
+def load_fixtures(include_synthetic=True, include_examples=True):
+    """{이름: make(MP) -> PIL Image} 형태의 입력 픽스처 생성 함수
+
+    크기별 이미지는 측정 직전에 만들고 바로 버리도록 생성 함수만 반환 (큰 크기를 모두 미리 만들면
+    그 메모리가 측정 중인 연산의 최대 RSS 에 섞임).
+    """
+    fixtures = {}
+    if include_synthetic:
+        fixtures["synthetic"] = lambda mp_: synthetic_portrait(*size_for_megapixels(mp_))
+    if include_examples:
+        found = _first_image(EXAMPLES_DIR, 'RGB')
+        if found:
+            name, source = found
+            aspect = source.width / source.height
+            fixtures[f"example:{name}"] = lambda mp_: source.resize(size_for_megapixels(mp_, aspect), Image.Resampling.LANCZOS)
+    return fixtures
+
+
+def load_garment():
+    found = _first_image(CLOTHES_DIR, 'RGBA')
+    return found[1] if found else synthetic_garment(600, 720)
+
+
+def load_makeup_style():
+    found = _first_image(MAKEUP_STYLES_DIR, 'RGB')
+    return found[1] if found else synthetic_portrait(640, 480, seed=1)
+
+
+# --- 📋 벤치마크 케이스 ---
+def build_cases(utils, selected_ops=None):
+    """[(연산 이름, 옵션 이름, fn(img) -> None), ...]"""
+    garment = load_garment()
+    style = load_makeup_style()
+    cases = [("detect_face_landmarks", "default", lambda img: utils.detect_face_landmarks(img))]
+    for variant, options in MAKEUP_VARIANTS.items():
+        cases.append(("apply_makeup", variant, lambda img, o=options: utils.apply_makeup(img, o)))
+    cases.append(("apply_makeup_transfer", "default", lambda img: utils.apply_makeup_transfer(img, style)))
+    cases.append(("apply_color_transfer", "default", lambda img: utils.apply_color_transfer(style, img)))
+    for fashion_style in FASHION_STYLES:
+        cases.append(("apply_fashion_filter", fashion_style, lambda img, s=fashion_style: utils.apply_fashion_filter(img, s, 0.7)))
+
+    def garment_at(img):
+        # 의상은 인물 너비의 절반 크기로 맞춰 해상도와 함께 커지도록
+        scale = (img.width * 0.5) / garment.width
+        return garment.resize((max(1, int(garment.width * scale)), max(1, int(garment.height * scale))))
+    cases.append(("change_clothing_color", "default", lambda img: utils.change_clothing_color(garment_at(img), "#FF5733")))
+    cases.append(("virtual_try_on", "default", lambda img: utils.virtual_try_on(img, garment_at(img), (img.width // 4, img.height // 3), 1.0)))
+    prepared = {} # 인물 크기별 전처리된 의상 (앱처럼 에셋 로드 시 한 번만 전처리)
+    def prepared_at(img):
+        if img.size not in prepared:
+            prepared[img.size] = utils.prepare_garment(garment_at(img))
+        return prepared[img.size]
+    cases.append(("virtual_try_on", "prepared", lambda img: utils.virtual_try_on(img, prepared_at(img), (img.width // 4, img.height // 3), 1.0)))
+    if selected_ops:
+        cases = [c for c in cases if c[0] in selected_ops]
+    return cases
+
+
+# --- 📏 측정 ---
+def current_rss_bytes():
+    """현재 프로세스 RSS (리눅스 /proc, 그 외에는 None)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PeakRSSSampler:
+    """백그라운드 스레드로 RSS를 주기적으로 샘플링해 구간 최대값 기록 (네이티브 할당 포함)"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = self.start = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = current_rss_bytes()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    @property
+    def peak_delta(self):
+        if self.peak is None or self.start is None:
+            return None
+        return max(0, self.peak - self.start)
+
+
+def run_case(fn, img, repeat, warmup):
+    """케이스 반복 실행 - 시간 통계, 최대 RSS 증가량, tracemalloc 최대 할당량
+
+    tracemalloc은 시간 측정을 왜곡하므로 시간 측정이 끝난 뒤 한 번 더 따로 실행해서 잼.
+    (numpy/PIL 버퍼는 잡히지만 OpenCV/MediaPipe 내부 할당은 RSS 쪽에서만 보임)
+    """
+    for _ in range(warmup):
+        fn(img)
+    timings = []
+    gc.collect()
+    with PeakRSSSampler() as sampler:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(img)
+            timings.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(img)
+        _, peak_traced = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    megapixels = img.width * img.height / 1_000_000
+    median = statistics.median(timings)
+    return {
+        "median_s": median,
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "throughput_mp_s": megapixels / median if median > 0 else None,
+        "peak_rss_delta_bytes": sampler.peak_delta,
+        "peak_traced_bytes": peak_traced,
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """기준 결과 대비 중앙값 시간 비교 - 회귀 목록 반환"""
+    baseline_index = {(r["op"], r["variant"], r["fixture"], r["megapixels"]): r for r in baseline.get("results", [])}
+    regressions = []
+    print("\n=== 기준 대비 비교 (median) ===")
+    for r in results:
+        base = baseline_index.get((r["op"], r["variant"], r["fixture"], r["megapixels"]))
+        if not base:
+            continue
+        ratio = r["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "")
+        print(f"{r['op']:24s} {r['variant']:10s} {r['fixture'][:20]:20s} {r['megapixels']:>4}MP "
+              f"{base['median_s'] * 1000:9.1f}ms -> {r['median_s'] * 1000:9.1f}ms ({ratio:5.2f}x) {flag}")
+        if flag == "REGRESSION":
+            regressions.append((r, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="utils 이미지 처리 연산 벤치마크")
+    parser.add_argument("--sizes", type=float, nargs="+", default=list(DEFAULT_SIZES_MP), help="입력 크기 (메가픽셀)")
+    parser.add_argument("--ops", nargs="+", help="측정할 연산 이름 (기본: 전체)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--no-synthetic", action="store_true", help="합성 픽스처 제외")
+    parser.add_argument("--no-examples", action="store_true", help="assets/examples 픽스처 제외")
+    parser.add_argument("--output", default="bench_results.json", help="결과 JSON 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--save-baseline", help="이번 결과를 기준 파일로도 저장")
+    parser.add_argument("--threshold", type=float, default=0.10, help="회귀로 판단할 느려짐 비율 (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    import utils
+    sizes = [int(s) if float(s).is_integer() else s for s in args.sizes]
+    fixtures = load_fixtures(not args.no_synthetic, not args.no_examples)
+    cases = build_cases(utils, args.ops)
+
+    results = []
+    print(f"{'op':24s} {'variant':10s} {'fixture':20s} {'size':>6s} {'median':>10s} {'MP/s':>8s} {'peak alloc':>10s} {'peak RSS':>10s}")
+    for fixture_name, make_fixture in fixtures.items():
+        for megapixels in sizes:
+            img = make_fixture(megapixels)
+            for op, variant, fn in cases:
+                try:
+                    stats = run_case(fn, img, args.repeat, args.warmup)
+                except Exception as e:
+                    print(f"{op:24s} {variant:10s} {fixture_name[:20]:20s} {megapixels:>4}MP  FAILED: {e}")
+                    continue
+                result = {"op": op, "variant": variant, "fixture": fixture_name, "megapixels": megapixels,
+                          "width": img.width, "height": img.height, **stats}
+                results.append(result)
+                rss = stats["peak_rss_delta_bytes"]
+                print(f"{op:24s} {variant:10s} {fixture_name[:20]:20s} {megapixels:>4}MP "
+                      f"{stats['median_s'] * 1000:8.1f}ms {stats['throughput_mp_s'] or 0:8.2f} "
+                      f"{stats['peak_traced_bytes'] / 1024 ** 2:8.1f}MB "
+                      f"{(rss / 1024 ** 2 if rss is not None else float('nan')):8.1f}MB", flush=True)
+            del img # 다음 크기를 만들기 전에 해제
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "config": {"sizes": sizes, "repeat": args.repeat, "warmup": args.warmup},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved {len(results)} results to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE tools/bench_ops.py ---
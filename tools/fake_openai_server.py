@@ -0,0 +1,186 @@
+# --- START OF FILE tools/fake_openai_server.py ---
+"""
+로컬 테스트용 가짜 OpenAI Chat Completions 서버 (외부 API 호출/비용 없이 추천 기능 확인용)
+
+사용 예:
+    python tools/fake_openai_server.py --port 8765 --token-delay 0.05
+    python tools/fake_openai_server.py --first-token-delay 3 --rate-limit-ratio 0.3 --max-concurrent 4  # 지연/429 주입
+    # .streamlit/secrets.toml 에 OPENAI_BASE_URL = "http://127.0.0.1:8765/v1" 추가 후 앱 실행
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "### 💄 메이크업\n- 웜톤 피부에는 코랄 립과 브라운 아이섀도우가 잘 어울립니다.\n"
+    "### 🎨 패션 필터\n- 따뜻한 분위기를 원하시면 'vintage' 필터를 적용해보세요.\n"
+    "### 👕 의상\n- 데일리룩으로는 'casual_tshirt'에 베이지 계열 하의를 추천합니다."
+)
+
+
+def split_tokens(text):
+    """응답 텍스트를 단어 단위 조각으로 분할 (공백 포함, 이어 붙이면 원문)"""
+    tokens, current = [], ""
+    for ch in text:
+        current += ch
+        if ch in (" ", "\n"):
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}", "type": "invalid_request_error"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.request_count += 1
+            request_index = self.server.request_count
+            over_capacity = self.server.max_concurrent is not None and self.server.in_flight >= self.server.max_concurrent
+            rate_limited = (over_capacity or request_index <= self.server.rate_limit_first
+                            or random.random() < self.server.rate_limit_ratio)
+            if rate_limited:
+                self.server.rate_limited_count += 1
+            else:
+                self.server.in_flight += 1
+                self.server.peak_in_flight = max(self.server.peak_in_flight, self.server.in_flight)
+
+        # --- 429 주입 (처음 N개 요청, 확률, 또는 동시 요청 상한 초과) ---
+        if rate_limited:
+            body = json.dumps({"error": {"message": "Rate limit reached (fake server)", "type": "requests", "code": "rate_limit_exceeded"}}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if self.server.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        try:
+            self._respond(request)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # 클라이언트 타임아웃 등으로 먼저 연결을 끊은 경우
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _respond(self, request):
+        reply = self.server.reply
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "gpt-3.5-turbo")
+        created = int(time.time())
+
+        time.sleep(self.server.first_token_delay)
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        # --- SSE 스트리밍 응답 ---
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send_chunk(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send_chunk({"role": "assistant", "content": ""})
+        tokens = split_tokens(reply)
+        for i, token in enumerate(tokens):
+            if self.server.drop_after is not None and i >= self.server.drop_after:
+                return # 스트림 도중 연결 끊김 흉내 (부분 응답 보존 확인용)
+            send_chunk({"content": token})
+            time.sleep(self.server.token_delay)
+        send_chunk({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def create_server(host="127.0.0.1", port=8765, reply=DEFAULT_REPLY, first_token_delay=0.2, token_delay=0.03,
+                  drop_after=None, rate_limit_first=0, rate_limit_ratio=0.0, max_concurrent=None, retry_after=None,
+                  verbose=False):
+    """가짜 서버 생성 (serve_forever는 호출자가 실행, 테스트에서는 스레드로 띄워 사용)"""
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.reply = reply
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    server.drop_after = drop_after
+    server.rate_limit_first = rate_limit_first
+    server.rate_limit_ratio = rate_limit_ratio
+    server.max_concurrent = max_concurrent
+    server.retry_after = retry_after
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.rate_limited_count = 0
+    server.in_flight = 0
+    server.peak_in_flight = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 테스트용 가짜 OpenAI Chat Completions 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="첫 토큰 전 지연 (초)")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="토큰 사이 지연 (초)")
+    parser.add_argument("--drop-after", type=int, default=None, help="N개 토큰 전송 후 연결 끊기")
+    parser.add_argument("--rate-limit-first", type=int, default=0, help="처음 N개 요청에 429 응답")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="이 확률로 429 응답 (0~1)")
+    parser.add_argument("--max-concurrent", type=int, default=None, help="동시 요청이 이 수를 넘으면 429 응답")
+    parser.add_argument("--retry-after", type=float, default=None, help="429 응답의 Retry-After 헤더 (초)")
+    parser.add_argument("--reply", default=DEFAULT_REPLY, help="응답 텍스트")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.reply, args.first_token_delay, args.token_delay,
+                           args.drop_after, args.rate_limit_first, args.rate_limit_ratio, args.max_concurrent,
+                           args.retry_after, args.verbose)
+    print(f"Fake OpenAI server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
+
+# --- END OF FILE tools/fake_openai_server.py ---
@@ -0,0 +1,84 @@
+# --- START OF FILE tools/import_time.py ---
+"""
+앱 모듈 임포트 시간 측정 - 매번 새 파이썬 프로세스에서 임포트해 콜드 스타트 비용 비교
+
+사용 예:
+    python tools/import_time.py                 # 기본 모듈 목록, 5회 반복 중앙값
+    python tools/import_time.py utils cv2 mediapipe --repeat 10
+    python tools/import_time.py --first-detect  # 첫 얼굴 감지(FaceMesh 생성 포함)까지의 시간도 측정
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app.py 가 시작 시 임포트하는 로컬 모듈 + 무거운 외부 모듈
+DEFAULT_MODULES = (
+    "utils", "pipeline", "style_transfer", "recommendation", "display", "gallery", "image_store",
+    "cv2", "mediapipe", "openai", "streamlit_image_comparison", "streamlit_option_menu",
+)
+APP_STARTUP_IMPORTS = "utils,pipeline,style_transfer,gallery,display,image_store,metrics,recommendation,streamlit_option_menu"
+
+_TIMER = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+for name in {modules!r}.split(","):
+    __import__(name)
+print(time.perf_counter() - started)
+"""
+
+_FIRST_DETECT = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import utils
+from PIL import Image
+utils.detect_face_landmarks(Image.new("RGB", (64, 64)))
+print(time.perf_counter() - started)
+"""
+
+
+def measure(code, repeat):
+    """새 프로세스에서 code 실행을 repeat회 반복해 출력된 초 값 목록"""
+    timings = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT_DIR)
+        lines = [line for line in completed.stdout.strip().splitlines() if line]
+        if completed.returncode != 0 or not lines:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+        timings.append(float(lines[-1]))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="모듈 임포트 시간 측정 (새 프로세스 기준)")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--first-detect", action="store_true", help="utils 임포트 + 첫 detect_face_landmarks 시간")
+    args = parser.parse_args(argv)
+
+    rows = [(name, _TIMER.format(root=ROOT_DIR, modules=name)) for name in args.modules]
+    rows.append(("[app startup imports]", _TIMER.format(root=ROOT_DIR, modules=APP_STARTUP_IMPORTS)))
+    if args.first_detect:
+        rows.append(("[utils + first detect]", _FIRST_DETECT.format(root=ROOT_DIR)))
+
+    print(f"{'module':28s} {'median':>9s} {'min':>9s}")
+    for name, code in rows:
+        try:
+            timings = measure(code, args.repeat)
+        except RuntimeError as e:
+            print(f"{name:28s} FAILED: {e}")
+            continue
+        print(f"{name:28s} {statistics.median(timings) * 1000:7.0f}ms {min(timings) * 1000:7.0f}ms", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE tools/import_time.py ---
@@ -0,0 +1,291 @@
+# --- START OF FILE tools/load_test.py ---
+"""
+app.py 다중 세션 부하 테스트 - Streamlit AppTest 로 여러 세션을 동시에 실행하며 동작별 지연 시간과 RSS 추이 측정
+
+사용 예:
+    python tools/load_test.py --sessions 20                     # 세션 20개, 세션당 흐름 1회
+    python tools/load_test.py --sessions 50 --iterations 3 --ramp-up 10 --think-time 0.5
+    python tools/load_test.py --sessions 100 --no-recommend --metrics --output load_test.json
+
+흐름 (세션마다, 값은 세션별로 조금씩 달라 결과 캐시에 모두 적중하지는 않음):
+    open → upload(예제 이미지 선택) → makeup(메이크업 적용) → select_garment → tryon(가상 피팅 적용) → gallery_save → download → recommend
+    (모드 전환 재실행은 navigate 로 따로 집계)
+
+참고:
+    - 모든 세션이 이 프로세스 안에서 실행되므로 st.cache_resource 자원(결과 캐시, 워커 풀, 입장 제어 등)은 실제 서버처럼 공유되고
+      RSS 는 서버 프로세스의 RSS 와 같음. 하네스 자체의 오버헤드(스크립트 실행 스레드)도 같은 GIL 을 쓰므로 약간 비관적인 수치.
+    - AppTest 는 file_uploader 를 지원하지 않으므로 upload 는 예제 이미지 선택(디코딩 + 이미지 저장소 등록)으로 대신함.
+    - download 는 다운로드 버튼의 PNG 인코딩이 일어나는 재실행 시간 (브라우저의 미디어 파일 요청은 포함하지 않음).
+    - OpenAI 호출은 tools/fake_openai_server.py 를 이 프로세스 안에서 띄워 대신하고, 갤러리는 임시 폴더에 저장.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import compute_budget # numpy(streamlit 이 임포트) 전에 BLAS/OpenMP 스레드 수 고정 - 앱과 같은 조건
+
+from bench_ops import current_rss_bytes
+from fake_openai_server import create_server
+
+APP_PATH = os.path.join(ROOT_DIR, "app.py")
+DEFAULT_RUN_TIMEOUT = 120   # 스크립트 실행 1회 최대 대기 (초)
+RSS_SAMPLE_INTERVAL = 0.5   # RSS 샘플링 간격 (초)
+PERCENTILES = (50, 95, 99)
+RECOMMEND_PROMPTS = (
+    "저는 가을 웜톤이고 내추럴 메이크업을 선호해요. 데일리룩 추천해주세요.",
+    "면접에 어울리는 신뢰감 있는 스타일을 추천해주세요.",
+    "여름 휴가 때 해변에서 입을 밝은 색 옷 추천해주세요!",
+    "쿨톤 피부에 어울리는 립 색상과 필터가 궁금해요.",
+)
+
+
+def percentile(values, p):
+    """최근접 순위 백분위수 (values 는 정렬된 리스트)"""
+    if not values:
+        return None
+    rank = max(1, min(len(values), math.ceil(p / 100 * len(values))))
+    return values[rank - 1]
+
+
+class RSSSampler:
+    """백그라운드 스레드로 (경과 초, RSS 바이트) 를 주기적으로 기록"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = current_rss_bytes()
+            if rss is not None:
+                self.samples.append((round(time.perf_counter() - self._started, 2), rss))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Recorder:
+    """동작별 소요 시간과 실패 집계 (여러 세션 스레드에서 호출)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.failures = defaultdict(list)
+
+    def add(self, action, seconds, error=None):
+        with self._lock:
+            if error is None:
+                self.timings[action].append(seconds)
+            else:
+                self.failures[action].append(str(error)[:200])
+
+    def summary(self):
+        with self._lock:
+            rows = {}
+            for action in sorted(set(self.timings) | set(self.failures)):
+                values = sorted(self.timings.get(action, []))
+                row = {"ok": len(values), "failed": len(self.failures.get(action, []))}
+                for p in PERCENTILES:
+                    row[f"p{p}_s"] = percentile(values, p)
+                row["max_s"] = values[-1] if values else None
+                row["sample_errors"] = self.failures.get(action, [])[:3]
+                rows[action] = row
+            return rows
+
+
+class SessionFlow:
+    """세션 하나의 사용자 흐름 - AppTest 인스턴스 하나를 순서대로 조작"""
+
+    def __init__(self, index, args, recorder, secrets):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.args = args
+        self.recorder = recorder
+        self.rng = random.Random(args.seed + index)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.run_timeout)
+        for name, value in secrets.items():
+            self.at.secrets[name] = value
+        # AppTest 세션은 모두 같은 세션 ID를 쓰므로 이미지 저장소/입장 제어가 세션을 구분하도록 지정
+        self.at.session_state["load_test_session_id"] = f"load-test-{index}"
+
+    def _step(self, action, prepare=None):
+        """prepare() 로 위젯 값을 바꾸고 스크립트를 다시 실행, 소요 시간 기록 (예외/오류 메시지는 실패)"""
+        started = time.perf_counter()
+        error = None
+        try:
+            if prepare is not None:
+                prepare()
+            self.at.run()
+            if self.at.exception:
+                error = self.at.exception[0].value
+            elif self.at.error:
+                error = self.at.error[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.add(action, time.perf_counter() - started, error)
+        if self.args.think_time:
+            time.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+        return error is None
+
+    def _navigate(self, mode):
+        # option_menu(커스텀 컴포넌트)는 AppTest 에서 조작할 수 없으므로 현재 모드를 세션 상태로 지정 (default_index 로 반영됨)
+        self.at.session_state["app_mode"] = mode
+
+    def run_once(self):
+        at = self.at
+        rng = self.rng
+        if not self._step("open"):
+            return
+        # 선택지는 화면에 그려진 selectbox 에서 읽음 (첫 항목 "이미지 업로드"/"의상 선택..." 제외)
+        examples = at.selectbox(key="image_source_select").options[1:]
+        if not examples:
+            self.recorder.add("upload", 0.0, "no example images in assets/examples")
+            return
+        if not self._step("upload", lambda: at.selectbox(key="image_source_select").select(rng.choice(examples))):
+            return
+
+        lip_color = "#%02X%02X%02X" % (rng.randint(150, 240), rng.randint(40, 110), rng.randint(60, 130))
+        self._step("navigate", lambda: self._navigate("메이크업"))
+        def prepare_makeup():
+            at.color_picker(key="mu_lip_color").pick(lip_color)
+            at.button(key="apply_makeup").click()
+        self._step("makeup", prepare_makeup)
+
+        self._step("navigate", lambda: self._navigate("가상 피팅"))
+        garments = at.selectbox(key="clothing_select").options[1:]
+        # 의상을 고른 뒤에야 적용 버튼이 활성화되므로 선택과 적용은 별도 실행
+        if not garments or not self._step("select_garment", lambda: at.selectbox(key="clothing_select").select(rng.choice(garments))):
+            return
+        def prepare_tryon():
+            at.slider(key="vt_pos_x").set_value(rng.randint(20, 80))
+            at.button(key="apply_tryon").click()
+        if not self._step("tryon", prepare_tryon):
+            return
+
+        self._step("gallery_save", lambda: at.button(key="save_tryon_gallery").click())
+        if self._step("download") and not at.get("download_button"):
+            self.recorder.add("download_missing", 0.0, "download button not rendered")
+
+        if not self.args.no_recommend:
+            self._step("navigate", lambda: self._navigate("AI 추천"))
+            def prepare_recommend():
+                at.text_area(key="recommend_input").input(rng.choice(RECOMMEND_PROMPTS))
+                at.button(key="get_recommendation").click()
+            self._step("recommend", prepare_recommend)
+        self._navigate("홈")
+
+    def run(self, start_delay):
+        time.sleep(start_delay)
+        for _ in range(self.args.iterations):
+            self.run_once()
+
+
+def print_report(summary, rss_samples, wall_time):
+    print(f"\n{'action':16s} {'ok':>5s} {'fail':>5s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for action, row in summary.items():
+        cells = [f"{row[k] * 1000:7.0f}ms" if row[k] is not None else f"{'-':>9s}" for k in ("p50_s", "p95_s", "p99_s", "max_s")]
+        print(f"{action:16s} {row['ok']:5d} {row['failed']:5d} {' '.join(cells)}")
+        for message in row["sample_errors"]:
+            print(f"    ! {message}")
+    if rss_samples:
+        values = [rss for _, rss in rss_samples]
+        print(f"\nRSS: start {values[0] / 1024 ** 2:.0f}MB, peak {max(values) / 1024 ** 2:.0f}MB, end {values[-1] / 1024 ** 2:.0f}MB "
+              f"({len(values)} samples)")
+        step = max(1, len(rss_samples) // 10)
+        print("  " + "  ".join(f"{t:.0f}s:{rss / 1024 ** 2:.0f}MB" for t, rss in rss_samples[::step]))
+    print(f"Wall time {wall_time:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="app.py 다중 세션 부하 테스트 (Streamlit AppTest)")
+    parser.add_argument("--sessions", type=int, default=20, help="동시 세션 수")
+    parser.add_argument("--iterations", type=int, default=1, help="세션당 흐름 반복 횟수")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="모든 세션이 시작될 때까지의 시간 (초)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="동작 사이 평균 대기 (초, 0~2배 무작위)")
+    parser.add_argument("--run-timeout", type=float, default=DEFAULT_RUN_TIMEOUT, help="스크립트 실행 1회 타임아웃 (초)")
+    parser.add_argument("--no-recommend", action="store_true", help="AI 추천 단계 생략")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="가짜 OpenAI 서버의 토큰 사이 지연 (초)")
+    parser.add_argument("--metrics", action="store_true", help="앱 구간 계측(AI_STYLER_METRICS) 켜고 결과에 포함")
+    parser.add_argument("--no-warmup", action="store_true", help="앱 백그라운드 워밍업 끄기 (콜드 스타트 측정)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_test_results.json", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR) # 앱은 assets/ 등을 상대 경로로 읽음
+    gallery_dir = tempfile.mkdtemp(prefix="ai_styler_load_gallery_")
+    os.environ["AI_STYLER_GALLERY_DIR"] = gallery_dir
+    if args.metrics:
+        os.environ["AI_STYLER_METRICS"] = "1"
+    if args.no_warmup:
+        os.environ["AI_STYLER_WARMUP"] = "0"
+
+    server = create_server(port=0, token_delay=args.token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    secrets = {"OPENAI_API_KEY": "sk-load-test", "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1"}
+
+    recorder = Recorder()
+    flows = [SessionFlow(i, args, recorder, secrets) for i in range(args.sessions)]
+    print(f"Running {args.sessions} sessions x {args.iterations} iteration(s) "
+          f"(core budget {compute_budget.CORE_BUDGET}, gallery {gallery_dir}, fake OpenAI {secrets['OPENAI_BASE_URL']})...")
+    started = time.perf_counter()
+    with RSSSampler() as sampler:
+        threads = []
+        for i, flow in enumerate(flows):
+            delay = args.ramp_up * i / max(1, args.sessions - 1) if args.sessions > 1 else 0.0
+            thread = threading.Thread(target=flow.run, args=(delay,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+    wall_time = time.perf_counter() - started
+    server.shutdown()
+
+    summary = recorder.summary()
+    print_report(summary, sampler.samples, wall_time)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "machine": {"cpu_count": os.cpu_count(), "core_budget": compute_budget.CORE_BUDGET,
+                    "threads_per_call": compute_budget.THREADS_PER_CALL},
+        "wall_time_s": wall_time,
+        "actions": summary,
+        "rss_timeline": sampler.samples,
+        "fake_openai": {"requests": server.request_count, "peak_in_flight": server.peak_in_flight},
+        "compute_budget": compute_budget.COMPUTE_BUDGET.stats(),
+    }
+    if "admission" in sys.modules:
+        report["admission"] = sys.modules["admission"].ADMISSION.snapshot()
+    if args.metrics:
+        import metrics
+        report["metrics"] = metrics.snapshot()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Saved report to {args.output}")
+    return 0 if not any(row["failed"] for row in summary.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE tools/load_test.py ---
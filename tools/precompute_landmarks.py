@@ -0,0 +1,69 @@
+# --- START OF FILE tools/precompute_landmarks.py ---
+"""
+고정 에셋(예제 이미지) 랜드마크 사전 계산 - utils.LANDMARK_SIDECAR_DIR 에 이미지 digest 이름의 .npy 사이드카 저장
+
+detect_face_landmarks 는 사이드카가 있는 이미지에 대해 FaceMesh를 실행하지 않음.
+메이크업 스타일 이미지는 색상 전송의 색 분포로만 쓰이고 랜드마크를 감지하지 않으므로 대상이 아님.
+에셋 이미지를 바꾸면 digest가 바뀌므로 다시 실행해야 함 (이전 사이드카는 --prune 으로 정리).
+
+사용 예:
+    python tools/precompute_landmarks.py           # 사이드카가 없는 에셋만 계산
+    python tools/precompute_landmarks.py --force   # 전부 다시 계산
+    python tools/precompute_landmarks.py --prune   # 현재 에셋과 맞지 않는 사이드카 삭제
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+ASSET_DIRS = (os.path.join("assets", "examples"),)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="에셋 랜드마크 사이드카 생성")
+    parser.add_argument("--force", action="store_true", help="이미 있는 사이드카도 다시 계산")
+    parser.add_argument("--prune", action="store_true", help="현재 에셋에 해당하지 않는 사이드카 삭제")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR) # 앱과 같은 상대 경로 기준 (assets/...)
+    import utils
+    from image_store import image_digest
+
+    known = set()
+    for folder in ASSET_DIRS:
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(folder, filename)
+            img = utils.load_image(path)
+            if img is None:
+                continue
+            digest = image_digest(img) # load_image 는 RGB로 변환하므로 detect_face_landmarks 의 키와 같음
+            known.add(f"{digest}.npy")
+            sidecar = utils.landmark_sidecar_path(digest)
+            if os.path.exists(sidecar) and not args.force and utils.load_landmark_sidecar(digest) is not None:
+                print(f"  up to date  {path}")
+                continue
+            sidecar = utils.save_landmark_sidecar(img)
+            results = utils.load_landmark_sidecar(digest)
+            faces = len(results.multi_face_landmarks or []) if results else 0
+            print(f"  written     {path} -> {sidecar} ({faces} faces)")
+
+    if args.prune and os.path.isdir(utils.LANDMARK_SIDECAR_DIR):
+        for filename in os.listdir(utils.LANDMARK_SIDECAR_DIR):
+            if filename.endswith(".npy") and filename not in known:
+                os.remove(os.path.join(utils.LANDMARK_SIDECAR_DIR, filename))
+                print(f"  pruned      {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE tools/precompute_landmarks.py ---
@@ -0,0 +1,192 @@
+# --- START OF FILE tools/profile_memory.py ---
+"""
+연산별 최대 메모리 프로파일러 - tracemalloc + RSS 샘플링으로 입력 크기 대비 최대 사용량과 할당 위치 측정
+
+사용 예:
+    python tools/profile_memory.py                                  # 전체 연산, 1/2/4/8/12MP
+    python tools/profile_memory.py --ops apply_makeup --sizes 4 12 24 --top 8
+    python tools/profile_memory.py --isolate --output memory_profile.json   # 케이스마다 새 프로세스 (RSS 최대값이 깨끗함)
+
+지표:
+    peak_traced   tracemalloc 최대값 (numpy 버퍼 포함, PIL/OpenCV/MediaPipe 내부 할당은 제외)
+    peak_rss      RSS 샘플링 최대 증가량 (네이티브 할당 포함, 이미 확보된 힙 재사용 시 작게 보일 수 있음 → --isolate)
+    x input       최대값 / 입력 RGB 바이트 (전체 프레임 복사본이 몇 장 분량인지)
+    top sites     최대값 근처에서 찍은 스냅샷 기준 할당 위치 상위 N개 (실행 전 대비 증가분)
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import tracemalloc
+
+from bench_ops import ROOT_DIR, PeakRSSSampler, build_cases, load_fixtures
+
+DEFAULT_SIZES_MP = (1, 2, 4, 8, 12)
+TRACE_FRAMES = 10      # 할당 위치 추적 깊이 (깊을수록 느림)
+MIN_SITE_BYTES = 64 * 1024 # 이보다 작은 할당 위치는 목록에서 제외
+
+
+class PeakSnapshotter:
+    """tracemalloc 사용량이 이전 최대값을 넘을 때마다 스냅샷을 갱신 (최대 시점 근처의 할당 위치 파악용)
+
+    연산 도중의 정확한 최대 시점을 잡을 수는 없으므로 근사치. 5% 이상 늘었을 때만 다시 찍어 부담을 줄임.
+    """
+
+    def __init__(self, interval=0.002, growth=1.05):
+        self.interval = interval
+        self.growth = growth
+        self.snapshot = None
+        self.snapshot_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_bytes * self.growth:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_bytes = current
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _site_filters():
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, threading.__file__), # 샘플링 스레드 자체의 할당
+    ]
+
+
+def _format_site(stat):
+    """할당 위치 - 저장소 코드의 가장 안쪽 프레임 우선 (없으면 가장 안쪽 프레임)"""
+    frames = list(stat.traceback)
+    own = [f for f in frames if f.filename.startswith(ROOT_DIR) and "/tools/" not in f.filename]
+    frame = own[-1] if own else frames[-1]
+    filename = os.path.relpath(frame.filename, ROOT_DIR) if frame.filename.startswith(ROOT_DIR) else frame.filename
+    return f"{filename}:{frame.lineno}"
+
+
+def profile_case(fn, img, top):
+    """케이스 1회 실행의 메모리 프로파일 (dict)"""
+    fn(img) # 지연 초기화/캐시 등 1회성 할당 제외를 위한 예열
+    gc.collect()
+    tracemalloc.start(TRACE_FRAMES)
+    try:
+        baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        with PeakRSSSampler() as rss, PeakSnapshotter() as snapper:
+            fn(img)
+        _, peak_traced = tracemalloc.get_traced_memory()
+        peak_snapshot = snapper.snapshot
+    finally:
+        tracemalloc.stop()
+
+    sites = []
+    if peak_snapshot is not None:
+        diff = peak_snapshot.filter_traces(_site_filters()).compare_to(baseline.filter_traces(_site_filters()), "traceback")
+        merged = {}
+        for stat in diff:
+            if stat.size_diff < MIN_SITE_BYTES:
+                continue
+            site = _format_site(stat)
+            merged[site] = merged.get(site, 0) + stat.size_diff
+        sites = [{"site": site, "bytes": size} for site, size in sorted(merged.items(), key=lambda kv: -kv[1])[:top]]
+
+    input_bytes = img.width * img.height * 3
+    return {
+        "width": img.width,
+        "height": img.height,
+        "input_bytes": input_bytes,
+        "peak_traced_bytes": peak_traced,
+        "peak_rss_delta_bytes": rss.peak_delta,
+        "traced_x_input": peak_traced / input_bytes,
+        "rss_x_input": rss.peak_delta / input_bytes if rss.peak_delta is not None else None,
+        "top_sites": sites,
+    }
+
+
+def _run_isolated(op, variant, fixture, megapixels, top, include_examples):
+    """새 파이썬 프로세스에서 케이스 하나만 실행하고 JSON 결과를 받음"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--single", op, variant, fixture, str(megapixels), "--top", str(top)]
+    if not include_examples:
+        cmd.append("--no-examples")
+    completed = subprocess.run(cmd, capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "no result")
+
+
+def _print_result(op, variant, fixture, megapixels, result, top):
+    rss = result["peak_rss_delta_bytes"]
+    print(f"{op:24s} {variant:10s} {fixture[:20]:20s} {megapixels:>4}MP "
+          f"traced {result['peak_traced_bytes'] / 1024 ** 2:8.1f}MB ({result['traced_x_input']:5.2f}x input) "
+          f"rss {(rss / 1024 ** 2 if rss is not None else float('nan')):8.1f}MB", flush=True)
+    for site in result["top_sites"][:top]:
+        print(f"      {site['bytes'] / 1024 ** 2:8.1f}MB  {site['site']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="utils 연산별 최대 메모리 프로파일")
+    parser.add_argument("--sizes", type=float, nargs="+", default=list(DEFAULT_SIZES_MP), help="입력 크기 (메가픽셀, 작은 것부터)")
+    parser.add_argument("--ops", nargs="+", help="측정할 연산 이름 (기본: 전체)")
+    parser.add_argument("--top", type=int, default=5, help="표시할 할당 위치 개수")
+    parser.add_argument("--no-synthetic", action="store_true")
+    parser.add_argument("--no-examples", action="store_true")
+    parser.add_argument("--isolate", action="store_true", help="케이스마다 새 프로세스에서 실행")
+    parser.add_argument("--output", help="결과 JSON 경로")
+    parser.add_argument("--single", nargs=4, metavar=("OP", "VARIANT", "FIXTURE", "MP"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    import utils
+
+    if args.single:
+        op, variant, fixture, megapixels = args.single
+        megapixels = int(float(megapixels)) if float(megapixels).is_integer() else float(megapixels)
+        fixtures = load_fixtures(fixture == "synthetic", fixture != "synthetic" and not args.no_examples)
+        fn = next(c[2] for c in build_cases(utils, [op]) if c[1] == variant)
+        print(json.dumps(profile_case(fn, fixtures[fixture](megapixels), args.top)))
+        return 0
+
+    sizes = sorted(int(s) if float(s).is_integer() else s for s in args.sizes)
+    fixtures = load_fixtures(not args.no_synthetic, not args.no_examples)
+    cases = build_cases(utils, args.ops)
+    results = []
+    for op, variant, fn in cases:
+        for fixture_name, make_fixture in fixtures.items():
+            for megapixels in sizes:
+                try:
+                    if args.isolate:
+                        result = _run_isolated(op, variant, fixture_name, megapixels, args.top, not args.no_examples)
+                    else:
+                        result = profile_case(fn, make_fixture(megapixels), args.top) # 측정 후 바로 해제
+                except Exception as e:
+                    print(f"{op:24s} {variant:10s} {fixture_name[:20]:20s} {megapixels:>4}MP  FAILED: {e}")
+                    continue
+                _print_result(op, variant, fixture_name, megapixels, result, args.top)
+                results.append({"op": op, "variant": variant, "fixture": fixture_name, "megapixels": megapixels, **result})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"isolated": args.isolate, "results": results}, f, indent=2, ensure_ascii=False)
+        print(f"\nSaved {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE tools/profile_memory.py ---
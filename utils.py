@@ -1,17 +1,71 @@
 # --- START OF FILE utils.py ---
 
-import cv2
 import numpy as np
-from PIL import Image, ImageEnhance, ImageDraw, ImageFilter
+from PIL import Image, ImageChops, ImageEnhance, ImageDraw, ImageFilter
 import os
-import mediapipe as mp
-
-# --- MediaPipe 초기화 ---
-mp_face_mesh = mp.solutions.face_mesh
-# Ensure refine_landmarks=True for more detailed landmarks, especially around eyes/lips
-face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, min_detection_confidence=0.5, refine_landmarks=True)
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+import threading
+from collections import OrderedDict, namedtuple
+
+from compute_budget import compute_slot, configure_cv2 # 라이브러리 스레드 수/동시 실행 코어 예산
+from image_store import image_digest
+from lazy_imports import lazy_module
+from metrics import span, timed # 단계별 소요 시간 계측 (AI_STYLER_METRICS=1 일 때만)
+from tiling import map_tiles, reduce_tiles, should_tile # 아주 큰 이미지는 타일 단위로 처리 (최대 메모리 제한)
+
+# --- 무거운 모듈은 첫 사용 시 임포트 (utils 임포트만으로는 OpenCV/MediaPipe를 읽지 않음) ---
+cv2 = lazy_module("cv2", on_load=configure_cv2)
+mp = lazy_module("mediapipe")
+
+# --- MediaPipe 초기화 (첫 얼굴 감지 시 FaceMesh 그래프 생성) ---
+MAX_NUM_FACES = 6 # 단체 사진에서 메이크업/스타일 전송을 적용할 최대 얼굴 수
+_face_mesh = None
+_face_mesh_lock = threading.Lock()
+
+# --- 랜드마크 캐시 (같은 이미지 내용이면 FaceMesh 감지를 다시 하지 않음) ---
+LANDMARK_CACHE_SIZE = 32 # 기억할 이미지 수 (결과는 좌표뿐이라 작음)
+_landmark_cache = OrderedDict() # image digest -> MediaPipe 결과
+_landmark_cache_lock = threading.Lock()
+
+# --- 랜드마크 사이드카 (고정 에셋의 미리 계산한 랜드마크, tools/precompute_landmarks.py 로 생성) ---
+# 파일: LANDMARK_SIDECAR_DIR/<RGB 이미지 digest>.npy, float32 배열 (얼굴 수, 랜드마크 수, 3[x, y, z 정규화 좌표])
+LANDMARK_SIDECAR_DIR = os.path.join("assets", "landmarks")
+NUM_FACE_LANDMARKS = 478 # refine_landmarks=True 일 때 얼굴당 랜드마크 수
+
+# 사이드카에서 읽은 결과 - MediaPipe 결과와 같은 모양 (multi_face_landmarks[i].landmark[j].x/.y/.z)
+_Landmark = namedtuple("_Landmark", "x y z")
+_FaceLandmarks = namedtuple("_FaceLandmarks", "landmark")
+LandmarkResults = namedtuple("LandmarkResults", "multi_face_landmarks")
+
+
+def get_face_mesh():
+    """공유 FaceMesh 감지기 (처음 호출될 때 한 번만 생성)"""
+    global _face_mesh
+    if _face_mesh is None:
+        with _face_mesh_lock:
+            if _face_mesh is None:
+                with span("landmarks.facemesh_init"):
+                    # Ensure refine_landmarks=True for more detailed landmarks, especially around eyes/lips
+                    _face_mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, max_num_faces=MAX_NUM_FACES, min_detection_confidence=0.5, refine_landmarks=True)
+    return _face_mesh
+
+
+def warm_up():
+    """OpenCV/MediaPipe 임포트와 FaceMesh 생성을 미리 수행 (백그라운드 워밍업, 배치 워커 초기화용)"""
+    cv2.setUseOptimized(True)
+    get_face_mesh()
+
+
+def __getattr__(name):
+    # 예전 모듈 변수 이름 호환 (utils.face_mesh 등) - 접근할 때 생성
+    if name == "face_mesh":
+        return get_face_mesh()
+    if name == "mp_face_mesh":
+        return mp.solutions.face_mesh
+    if name == "mp_drawing":
+        return mp.solutions.drawing_utils
+    if name == "mp_drawing_styles":
+        return mp.solutions.drawing_styles
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- 랜드마크 인덱스 (더 상세하게 정의) ---
 # 주: 정확한 메이크업 영역은 인덱스 조합과 마스크 생성 방식에 따라 달라짐
@@ -29,6 +83,7 @@ LEFT_CHEEK = [117, 118, 119, 101, 147, 205, 213, 135, 136] # 왼쪽 광대뼈 
 RIGHT_CHEEK = [346, 347, 348, 330, 376, 425, 433, 364, 365] # 오른쪽 광대뼈 주변 (조금 더 넓게)
 
 
+@timed("load_image.decode")
 def load_image(image_file):
     """이미지 파일을 PIL Image 객체로 로드하고 RGB로 변환"""
     if image_file is None: return None
@@ -62,12 +117,14 @@ def cv2_to_pil(cv2_img):
 
 
 # ***** ADD THIS FUNCTION *****
-def detect_face_landmarks(img_pil):
+def detect_face_landmarks(img_pil, digest=None):
     """
     Detects face landmarks using MediaPipe Face Mesh.
 
     Args:
         img_pil (PIL.Image): Input image in PIL format (RGB).
+        digest (str): 호출자가 이미 계산한 image_digest(img_pil) (RenderPipeline 등) - 주면 픽셀을 다시 해시하지 않음.
+                      RGB 이미지일 때만 사용 (다른 모드는 RGB 변환본의 해시가 키)
 
     Returns:
         tuple: A tuple containing:
@@ -82,13 +139,31 @@ def detect_face_landmarks(img_pil):
         return None, 0, 0
 
     try:
-        # Convert PIL Image to NumPy array (RGB)
-        img_rgb = np.array(img_pil.convert('RGB'))
-        img_height, img_width, _ = img_rgb.shape
-
-        # Process the image and find face landmarks
-        # Make sure 'face_mesh' is initialized globally in utils.py
-        results = face_mesh.process(img_rgb)
+        # 같은 이미지(예: 워밍업한 예제)는 이전 감지 결과 재사용, 사이드카가 있는 에셋은 FaceMesh 생략
+        img_rgb_pil = img_pil if img_pil.mode == 'RGB' else img_pil.convert('RGB')
+        if digest is None or img_rgb_pil is not img_pil:
+            digest = image_digest(img_rgb_pil)
+        with _landmark_cache_lock:
+            results = _landmark_cache.get(digest)
+            if results is not None:
+                _landmark_cache.move_to_end(digest)
+                return results, img_pil.size[0], img_pil.size[1]
+
+        results = load_landmark_sidecar(digest)
+        if results is None:
+            # Convert PIL Image to NumPy array (RGB)
+            img_rgb = np.array(img_rgb_pil)
+
+            # Process the image and find face landmarks
+            face_mesh = get_face_mesh()
+            with compute_slot(), span("landmarks.facemesh"):
+                results = face_mesh.process(img_rgb)
+        img_width, img_height = img_pil.size
+
+        with _landmark_cache_lock:
+            _landmark_cache[digest] = results
+            while len(_landmark_cache) > LANDMARK_CACHE_SIZE:
+                _landmark_cache.popitem(last=False)
 
         # Check if landmarks were detected
         # if not results.multi_face_landmarks:
@@ -108,6 +183,58 @@ def detect_face_landmarks(img_pil):
 # ***** END OF ADDED FUNCTION *****
 
 
+def landmark_sidecar_path(digest):
+    return os.path.join(LANDMARK_SIDECAR_DIR, f"{digest}.npy")
+
+
+def landmarks_to_array(results):
+    """랜드마크 결과를 (얼굴 수, 랜드마크 수, 3) float32 배열로 변환 (얼굴이 없으면 얼굴 수 0)"""
+    faces = results.multi_face_landmarks if results is not None and results.multi_face_landmarks else []
+    if not faces:
+        return np.zeros((0, NUM_FACE_LANDMARKS, 3), dtype=np.float32)
+    return np.array([[(lm.x, lm.y, lm.z) for lm in face.landmark] for face in faces], dtype=np.float32)
+
+
+def landmarks_from_array(coords):
+    """landmarks_to_array 의 역변환 - MediaPipe 결과와 같은 모양의 LandmarkResults (얼굴이 없으면 None)"""
+    if len(coords) == 0:
+        return LandmarkResults(None)
+    return LandmarkResults([
+        _FaceLandmarks([_Landmark(float(x), float(y), float(z)) for x, y, z in face]) for face in coords
+    ])
+
+
+def save_landmark_sidecar(img_pil, results=None):
+    """이미지의 랜드마크를 사이드카 파일로 저장 (results가 없으면 FaceMesh로 감지) 후 경로 반환"""
+    img_rgb_pil = img_pil if img_pil.mode == 'RGB' else img_pil.convert('RGB')
+    if results is None:
+        results = get_face_mesh().process(np.array(img_rgb_pil))
+    path = landmark_sidecar_path(image_digest(img_rgb_pil))
+    os.makedirs(LANDMARK_SIDECAR_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, landmarks_to_array(results))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_landmark_sidecar(digest):
+    """digest 에 해당하는 사이드카를 읽어 LandmarkResults 반환 (없거나 형식이 맞지 않으면 None)"""
+    path = landmark_sidecar_path(digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        with span("landmarks.sidecar"):
+            coords = np.load(path, allow_pickle=False)
+        if (coords.dtype != np.float32 or coords.ndim != 3 or coords.shape[1:] != (NUM_FACE_LANDMARKS, 3)
+                or coords.shape[0] > MAX_NUM_FACES or not np.isfinite(coords).all()):
+            print(f"Ignoring invalid landmark sidecar: {path} (shape {coords.shape}, dtype {coords.dtype})")
+            return None
+        return landmarks_from_array(coords)
+    except Exception as e:
+        print(f"Failed to read landmark sidecar: {path}, Error: {e}")
+        return None
+
+
 def get_landmark_points(landmarks, indices, img_width, img_height):
     """랜드마크 결과에서 특정 인덱스의 좌표 리스트 추출"""
     points = []
@@ -148,14 +275,105 @@ def hex_to_rgb(hex_color):
         print(f"Invalid hex color: '{hex_color}'. Using default red. Error: {e}")
         return (255, 0, 0) # 오류 시 기본 색상 반환
 
-def apply_makeup(img_pil, makeup_options):
-    """얼굴 랜드마크 기반으로 다양한 메이크업 효과 적용"""
+# --- 부드러운 마스크 블러 (메이크업 경계) ---
+PYRAMID_MIN_SIGMA = 4.0 # 축소한 해상도에서도 남겨 둘 최소 블러 반경 (px) - 작을수록 빠르지만 근사 오차 증가
+
+
+def blur_soft_mask(mask, radius):
+    """단일 채널(L) 마스크용 빠른 가우시안 블러 - 축소(박스 평균) → 저해상도 블러 → 쌍선형 확대
+
+    반경이 클수록 더 많이 축소하므로 비용이 반경과 거의 무관함 (작은 반경은 원래 해상도에서 그대로 블러).
+    축소/확대 자체의 번짐(분산 약 factor²/4)을 블러 반경에서 빼서 전체 번짐 폭을 GaussianBlur(radius)와 맞춤.
+    """
+    factor = int(radius // PYRAMID_MIN_SIGMA)
+    if factor < 2:
+        return mask.filter(ImageFilter.GaussianBlur(radius=radius))
+    # 크기를 factor 배수로 맞춰야 축소/확대 격자가 정확히 겹침 (늘어난 부분은 잘라냄)
+    width, height = mask.size
+    padded_size = (-(-width // factor) * factor, -(-height // factor) * factor)
+    if padded_size != mask.size:
+        padded = Image.new('L', padded_size, 0)
+        padded.paste(mask, (0, 0))
+        mask = padded
+    small = mask.reduce(factor)
+    small_radius = float(np.sqrt(max(radius ** 2 - factor ** 2 / 4.0, 0.0))) / factor
+    if small_radius > 0:
+        small = small.filter(ImageFilter.GaussianBlur(radius=small_radius))
+    return small.resize(padded_size, Image.BILINEAR).crop((0, 0, width, height))
+
+
+def _composite_blurred_shapes(overlay, shapes, blur_radius):
+    """도형들을 감싸는 영역(블러 번짐 여유 포함)만 잘라 그리고 블러한 뒤 공유 오버레이에 합성
+
+    블러 비용이 이미지 전체가 아니라 얼굴 영역 크기에 비례하므로 얼굴 수가 늘어도 전체 프레임 블러를 반복하지 않음.
+    RGBA 레이어 대신 색상별 덮임 정도(L 마스크) 하나만 블러하고 (blur_soft_mask), 블러된 RGBA 레이어와 같은 값
+    (색상 × 덮임, 알파 × 덮임)으로 레이어를 만들어 합성.
+
+    Args:
+        overlay (PIL.Image): RGBA 공유 오버레이 (제자리에서 수정)
+        shapes (list): [("polygon", 점 리스트, fill) 또는 ("ellipse", (x0, y0, x1, y1), fill), ...] - 이미지 좌표
+        blur_radius (float): GaussianBlur 반경
+    """
+    xs, ys = [], []
+    for kind, coords, _ in shapes:
+        if kind == "polygon":
+            xs.extend(p[0] for p in coords)
+            ys.extend(p[1] for p in coords)
+        else:
+            xs.extend((coords[0], coords[2]))
+            ys.extend((coords[1], coords[3]))
+    margin = int(np.ceil(blur_radius * 3)) + 2 # 블러가 번지는 범위 (3σ)
+    x0, y0 = max(0, int(min(xs)) - margin), max(0, int(min(ys)) - margin)
+    x1, y1 = min(overlay.width, int(max(xs)) + margin + 1), min(overlay.height, int(max(ys)) + margin + 1)
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    shapes_by_fill = {}
+    for kind, coords, fill in shapes:
+        shapes_by_fill.setdefault(tuple(fill), []).append((kind, coords))
+    for fill, fill_shapes in shapes_by_fill.items():
+        with span("makeup.rasterize"):
+            mask = Image.new('L', (x1 - x0, y1 - y0), 0)
+            mask_draw = ImageDraw.Draw(mask)
+            for kind, coords in fill_shapes:
+                if kind == "polygon":
+                    mask_draw.polygon([(x - x0, y - y0) for x, y in coords], fill=255)
+                else:
+                    mask_draw.ellipse((coords[0] - x0, coords[1] - y0, coords[2] - x0, coords[3] - y0), fill=255)
+        with span("makeup.blur"):
+            coverage = blur_soft_mask(mask, blur_radius)
+        with span("makeup.composite"):
+            layer = Image.merge('RGBA', [coverage.point([(v * c + 127) // 255 for v in range(256)]) for c in fill])
+            overlay.alpha_composite(layer, dest=(x0, y0))
+
+
+# 얼굴 크기(두 눈 중심 사이 거리) 기준 블러/반경 비율 - 얼굴이 화면 너비의 약 1/4 인 인물 사진에서 이전의 이미지 너비 기준 값과 같음
+EYESHADOW_BLUR_PER_EYE_DIST = 0.08 # 아이섀도우 블러 반경 (이전: 이미지 너비 × 0.02)
+BLUSH_RADIUS_PER_EYE_DIST = 0.12   # 블러셔 기본 반경 (이전: 이미지 너비 × 0.03)
+
+
+def _eye_distance(left_eye_points, right_eye_points):
+    """두 눈 중심 사이 거리 (px) - 얼굴마다 크기를 맞추는 기준"""
+    return float(np.linalg.norm(np.mean(left_eye_points, axis=0) - np.mean(right_eye_points, axis=0)))
+
+
+@timed("apply_makeup")
+def apply_makeup(img_pil, makeup_options, landmarks_results=None, digest=None):
+    """얼굴 랜드마크 기반으로 다양한 메이크업 효과 적용
+
+    landmarks_results를 주면 감지를 건너뛰고 그 랜드마크를 사용 (동영상 추적/스무딩 결과 등,
+    multi_face_landmarks[i].landmark[j].x/.y 정규화 좌표 구조)
+    digest는 img_pil의 image_digest (알고 있으면 랜드마크 캐시 조회 시 다시 해시하지 않음)
+    """
     output_img_pil = img_pil.copy()
     intensity_factor = makeup_options.get('intensity', 0.5) # 전체 강도
 
     # --- 1. 얼굴 랜드마크 감지 ---
-    # Call the newly added function
-    landmarks_results, img_width, img_height = detect_face_landmarks(output_img_pil)
+    if landmarks_results is not None:
+        img_width, img_height = output_img_pil.size
+    else:
+        with span("makeup.landmarks"):
+            landmarks_results, img_width, img_height = detect_face_landmarks(img_pil, digest) # 사본과 픽셀이 같은 원본 기준
 
     # Check if landmarks were detected *and* if the results object exists
     if not landmarks_results or not landmarks_results.multi_face_landmarks:
@@ -168,9 +386,10 @@ def apply_makeup(img_pil, makeup_options):
         return output_img_pil, False # 실패 플래그 반환
 
     # Proceed only if landmarks are found
-    face_landmarks = landmarks_results.multi_face_landmarks[0] # 첫 번째 감지된 얼굴 사용
+    all_faces = landmarks_results.multi_face_landmarks # 감지된 모든 얼굴 (최대 MAX_NUM_FACES)
 
     # --- 2. 메이크업 효과 적용을 위한 오버레이 준비 ---
+    # 모든 얼굴의 효과를 하나의 공유 오버레이에 그린 뒤 마지막에 한 번만 원본과 합성
     overlay = Image.new('RGBA', output_img_pil.size, (0, 0, 0, 0))
     overlay_draw = ImageDraw.Draw(overlay)
 
@@ -179,61 +398,60 @@ def apply_makeup(img_pil, makeup_options):
 
     # 💄 입술 (Lips)
     if makeup_options.get('apply_lips', False):
-        # Use LIPS_OUTER for the boundary
-        lip_points = get_landmark_points(face_landmarks, LIPS_OUTER, img_width, img_height)
-        if lip_points:
-            lip_color_rgb = hex_to_rgb(makeup_options.get('lip_color', '#E64E6B'))
-            lip_intensity = makeup_options.get('lip_intensity', intensity_factor)
-            # Adjust alpha calculation (e.g., less transparency for lips)
-            lip_fill_color = lip_color_rgb + (int(255 * lip_intensity * 0.8),)
-            overlay_draw.polygon(lip_points, fill=lip_fill_color)
+        lip_color_rgb = hex_to_rgb(makeup_options.get('lip_color', '#E64E6B'))
+        lip_intensity = makeup_options.get('lip_intensity', intensity_factor)
+        # Adjust alpha calculation (e.g., less transparency for lips)
+        lip_fill_color = lip_color_rgb + (int(255 * lip_intensity * 0.8),)
+        lips_drawn = 0
+        with span("makeup.rasterize"):
+            for face_landmarks in all_faces:
+                # Use LIPS_OUTER for the boundary
+                lip_points = get_landmark_points(face_landmarks, LIPS_OUTER, img_width, img_height)
+                if lip_points:
+                    overlay_draw.polygon(lip_points, fill=lip_fill_color)
+                    lips_drawn += 1
+        if lips_drawn:
             applied_effects.append("입술")
         else:
             print("Warning: Not enough lip points detected to apply lip makeup.")
 
     # ✨ 아이섀도우 (Eyeshadow)
     if makeup_options.get('apply_eyeshadow', False):
-        # Define points slightly above the eye for shadow
-        # This requires more sophisticated landmark combinations or convex hull around eye area
-        # Simple approach using eye boundaries:
-        left_eye_points = get_landmark_points(face_landmarks, LEFT_EYE, img_width, img_height)
-        right_eye_points = get_landmark_points(face_landmarks, RIGHT_EYE, img_width, img_height)
-
-        if left_eye_points and right_eye_points:
-            eye_color_rgb = hex_to_rgb(makeup_options.get('eyeshadow_color', '#8A5A94'))
-            eye_intensity = makeup_options.get('eyeshadow_intensity', intensity_factor)
-            # Adjust alpha for eyeshadow (might need less transparency than lips)
-            eye_fill_color = eye_color_rgb + (int(255 * eye_intensity * 0.6),)
-
-            # Create a temporary mask for blurring the eyeshadow
-            eye_mask = Image.new('RGBA', overlay.size, (0,0,0,0))
-            eye_draw = ImageDraw.Draw(eye_mask)
-
-            # Draw polygons on the temporary mask
-            eye_draw.polygon(left_eye_points, fill=eye_fill_color)
-            eye_draw.polygon(right_eye_points, fill=eye_fill_color)
-
-            # Blur the eyeshadow mask for softer edges
-            blur_radius = max(5, int(img_width * 0.02)) # Adjust blur radius as needed
-            eye_mask_blurred = eye_mask.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-
-            # Composite the blurred eyeshadow onto the main overlay
-            overlay = Image.alpha_composite(overlay, eye_mask_blurred)
+        eye_color_rgb = hex_to_rgb(makeup_options.get('eyeshadow_color', '#8A5A94'))
+        eye_intensity = makeup_options.get('eyeshadow_intensity', intensity_factor)
+        # Adjust alpha for eyeshadow (might need less transparency than lips)
+        eye_fill_color = eye_color_rgb + (int(255 * eye_intensity * 0.6),)
+        eyes_drawn = 0
+        for face_landmarks in all_faces:
+            # Simple approach using eye boundaries:
+            left_eye_points = get_landmark_points(face_landmarks, LEFT_EYE, img_width, img_height)
+            right_eye_points = get_landmark_points(face_landmarks, RIGHT_EYE, img_width, img_height)
+            if left_eye_points and right_eye_points:
+                # Blur the eyeshadow for softer edges - 얼굴 크기에 비례 (단체 사진의 작은 얼굴이 뭉개지지 않도록)
+                blur_radius = max(2.0, _eye_distance(left_eye_points, right_eye_points) * EYESHADOW_BLUR_PER_EYE_DIST)
+                _composite_blurred_shapes(overlay, [
+                    ("polygon", left_eye_points, eye_fill_color),
+                    ("polygon", right_eye_points, eye_fill_color),
+                ], blur_radius)
+                eyes_drawn += 1
+        if eyes_drawn:
             applied_effects.append("아이섀도우")
         else:
             print("Warning: Not enough eye points detected to apply eyeshadow.")
 
     # 😊 블러셔 (Blush) - Gaussian blur approach
     if makeup_options.get('apply_blush', False):
-        left_cheek_points = get_landmark_points(face_landmarks, LEFT_CHEEK, img_width, img_height)
-        right_cheek_points = get_landmark_points(face_landmarks, RIGHT_CHEEK, img_width, img_height)
-
-        if left_cheek_points and right_cheek_points:
-            blush_color_rgb = hex_to_rgb(makeup_options.get('blush_color', '#F08080'))
-            blush_intensity = makeup_options.get('blush_intensity', intensity_factor)
-            # Blush alpha - typically more subtle
-            blush_alpha = int(255 * blush_intensity * 0.45)
-            blush_color_rgba = blush_color_rgb + (blush_alpha,)
+        blush_color_rgb = hex_to_rgb(makeup_options.get('blush_color', '#F08080'))
+        blush_intensity = makeup_options.get('blush_intensity', intensity_factor)
+        # Blush alpha - typically more subtle
+        blush_alpha = int(255 * blush_intensity * 0.45)
+        blush_color_rgba = blush_color_rgb + (blush_alpha,)
+        cheeks_drawn = 0
+        for face_landmarks in all_faces:
+            left_cheek_points = get_landmark_points(face_landmarks, LEFT_CHEEK, img_width, img_height)
+            right_cheek_points = get_landmark_points(face_landmarks, RIGHT_CHEEK, img_width, img_height)
+            if not (left_cheek_points and right_cheek_points):
+                continue
 
             # Calculate approximate cheek centers
             left_center = np.mean(left_cheek_points, axis=0).astype(int)
@@ -241,30 +459,23 @@ def apply_makeup(img_pil, makeup_options):
 
             # Determine blush radius based on face size/intensity
             # Distance between eyes can be a proxy for face scale
-            try:
-                left_eye_center = np.mean(get_landmark_points(face_landmarks, LEFT_EYE, img_width, img_height), axis=0)
-                right_eye_center = np.mean(get_landmark_points(face_landmarks, RIGHT_EYE, img_width, img_height), axis=0)
-                eye_dist = np.linalg.norm(left_eye_center - right_eye_center)
-                radius = int(eye_dist * 0.4 * blush_intensity + img_width * 0.03) # Combine factors
-            except: # Fallback if eye points fail
-                radius = int(img_width * 0.06 * blush_intensity + 10)
-            radius = max(10, radius) # Minimum radius
-
-            # Create a blush layer and apply Gaussian blur
-            blush_layer = Image.new('RGBA', output_img_pil.size, (0, 0, 0, 0))
-            blush_draw = ImageDraw.Draw(blush_layer)
-
-            # Draw filled ellipses at cheek centers (adjust size/shape as needed)
-            # Make ellipses slightly oval vertically
-            blush_draw.ellipse((left_center[0]-radius, left_center[1]-int(radius*1.2), left_center[0]+radius, left_center[1]+int(radius*1.2)), fill=blush_color_rgba)
-            blush_draw.ellipse((right_center[0]-radius, right_center[1]-int(radius*1.2), right_center[0]+radius, right_center[1]+int(radius*1.2)), fill=blush_color_rgba)
-
-            # Apply significant blur for a soft effect
-            blur_radius_blush = radius * 2.0 # Larger blur for blush
-            blush_layer_blurred = blush_layer.filter(ImageFilter.GaussianBlur(radius=blur_radius_blush))
-
-            # Composite the blurred blush onto the main overlay
-            overlay = Image.alpha_composite(overlay, blush_layer_blurred)
+            left_eye_points = get_landmark_points(face_landmarks, LEFT_EYE, img_width, img_height)
+            right_eye_points = get_landmark_points(face_landmarks, RIGHT_EYE, img_width, img_height)
+            if left_eye_points and right_eye_points:
+                eye_dist = _eye_distance(left_eye_points, right_eye_points)
+                radius = int(eye_dist * (0.4 * blush_intensity + BLUSH_RADIUS_PER_EYE_DIST)) # Combine factors
+            else: # Fallback if eye points fail - 볼 랜드마크 폭 기준
+                cheek_dist = float(np.linalg.norm(left_center - right_center))
+                radius = int(cheek_dist * 0.15 * blush_intensity + 4)
+            radius = max(3, radius) # Minimum radius
+
+            # Draw filled ellipses at cheek centers, slightly oval vertically, then apply significant blur for a soft effect
+            _composite_blurred_shapes(overlay, [
+                ("ellipse", (left_center[0]-radius, left_center[1]-int(radius*1.2), left_center[0]+radius, left_center[1]+int(radius*1.2)), blush_color_rgba),
+                ("ellipse", (right_center[0]-radius, right_center[1]-int(radius*1.2), right_center[0]+radius, right_center[1]+int(radius*1.2)), blush_color_rgba),
+            ], radius * 2.0) # Larger blur for blush
+            cheeks_drawn += 1
+        if cheeks_drawn:
             applied_effects.append("블러셔")
         else:
             print("Warning: Not enough cheek points detected to apply blush.")
@@ -275,9 +486,15 @@ def apply_makeup(img_pil, makeup_options):
         try:
             # The overlay already contains blurred elements where needed
             # No need for an overall blur here if elements are blurred individually
-            output_img_pil = output_img_pil.convert('RGBA')
-            output_img_pil = Image.alpha_composite(output_img_pil, overlay)
-            output_img_pil = output_img_pil.convert('RGB')
+            # Composite only the region the overlay actually covers (faces), not the whole frame
+            with span("makeup.composite"):
+                if output_img_pil.mode != 'RGB':
+                    output_img_pil = output_img_pil.convert('RGB')
+                bbox = overlay.getbbox()
+                if bbox:
+                    region = output_img_pil.crop(bbox).convert('RGBA')
+                    region.alpha_composite(overlay.crop(bbox))
+                    output_img_pil.paste(region.convert('RGB'), bbox[:2])
         except Exception as e:
             print(f"Error applying makeup overlay: {e}")
             # Return original image if compositing fails
@@ -294,12 +511,14 @@ def apply_makeup(img_pil, makeup_options):
     return output_img_pil, True # 성공 플래그 반환
 
 
-def apply_makeup_transfer(face_pil, style_pil):
-    """참조 스타일 이미지의 색감을 얼굴 이미지에 전송 (개선된 색상 전송)"""
+@timed("apply_makeup_transfer")
+def apply_makeup_transfer(face_pil, style_pil, face_digest=None):
+    """참조 스타일 이미지의 색감을 얼굴 이미지에 전송 (개선된 색상 전송) - face_digest는 face_pil의 image_digest (선택)"""
     if face_pil is None or style_pil is None: return face_pil, False
 
     # --- 1. 얼굴 랜드마크 감지 (얼굴 영역 마스크 생성용) ---
-    landmarks_results, img_width, img_height = detect_face_landmarks(face_pil)
+    with span("makeup_transfer.landmarks"):
+        landmarks_results, img_width, img_height = detect_face_landmarks(face_pil, face_digest)
     if not landmarks_results or not landmarks_results.multi_face_landmarks:
         print("랜드마크 감지 실패. 메이크업 전송을 위한 얼굴 영역을 찾을 수 없습니다.")
         # 전체 이미지에 색상 전송 시도 (대체 옵션)
@@ -311,16 +530,26 @@ def apply_makeup_transfer(face_pil, style_pil):
             print(f"전체 이미지 색상 전송 실패: {e}")
             return face_pil, False
 
-    face_landmarks = landmarks_results.multi_face_landmarks[0]
-
-    # --- 2. 얼굴 영역 마스크 생성 (더 정교하게) ---
-    # Get all landmark points for convex hull
-    all_points = []
-    if face_landmarks.landmark:
-         num_landmarks = len(face_landmarks.landmark)
-         all_points = get_landmark_points(face_landmarks, list(range(num_landmarks)), img_width, img_height)
+    # --- 2. 얼굴 영역 마스크 생성 (모든 얼굴의 합집합) ---
+    # 얼굴마다 전체 랜드마크의 convex hull을 하나의 마스크에 그린 뒤, 팽창/블러와 합성은 한 번만 수행
+    hulls = []
+    for face_landmarks in landmarks_results.multi_face_landmarks:
+        if not face_landmarks.landmark:
+            continue
+        num_landmarks = len(face_landmarks.landmark)
+        all_points = get_landmark_points(face_landmarks, list(range(num_landmarks)), img_width, img_height)
+        if not all_points:
+            continue
+        try:
+            # Create convex hull from all points
+            hull = cv2.convexHull(np.array(all_points), returnPoints=True)
+            hull_points = [tuple(p[0]) for p in hull]
+            if len(hull_points) > 2:
+                hulls.append(hull_points)
+        except Exception as e:
+            print(f"얼굴 마스크 생성 중 오류: {e}")
 
-    if not all_points:
+    if not hulls:
         print("랜드마크 포인트 추출 실패. 마스크를 생성할 수 없습니다.")
         # Fallback to full image transfer
         try:
@@ -330,30 +559,23 @@ def apply_makeup_transfer(face_pil, style_pil):
             print(f"전체 이미지 색상 전송 실패 (마스크 생성 불가): {e}")
             return face_pil, False
 
-
     final_mask = None
     try:
-        # Create convex hull from all points
-        hull = cv2.convexHull(np.array(all_points), returnPoints=True)
-        hull_points = [tuple(p[0]) for p in hull]
-
-        if len(hull_points) > 2:
-            face_mask = Image.new('L', face_pil.size, 0)
-            face_draw = ImageDraw.Draw(face_mask)
+        face_mask = Image.new('L', face_pil.size, 0)
+        face_draw = ImageDraw.Draw(face_mask)
+        for hull_points in hulls:
             face_draw.polygon(hull_points, fill=255)
 
-            # Dilate and blur the mask for softer edges
-            # Adjust kernel sizes and iterations for desired softness
-            kernel_dilate = np.ones((15,15), np.uint8) # Dilation kernel
-            kernel_blur = (31, 31)                    # Gaussian blur kernel size
+        # Dilate and blur the mask for softer edges
+        # Adjust kernel sizes and iterations for desired softness
+        kernel_dilate = np.ones((15,15), np.uint8) # Dilation kernel
+        kernel_blur = (31, 31)                    # Gaussian blur kernel size
 
+        with span("makeup_transfer.mask_blur"):
             mask_cv = np.array(face_mask)
             mask_dilated = cv2.dilate(mask_cv, kernel_dilate, iterations=3) # Increase iterations for more expansion
             mask_blurred = cv2.GaussianBlur(mask_dilated, kernel_blur, 0)
-            final_mask = Image.fromarray(mask_blurred)
-        else:
-             print("Convex Hull 생성 실패. 얼굴 마스크를 만들 수 없습니다.")
-
+        final_mask = Image.fromarray(mask_blurred)
     except Exception as e:
         print(f"얼굴 마스크 생성 중 오류: {e}")
         final_mask = None # Ensure mask is None on error
@@ -361,7 +583,8 @@ def apply_makeup_transfer(face_pil, style_pil):
     # --- 3. 색상 전송 적용 ---
     try:
         # Resize style image to match face image size for color stats
-        style_resized = style_pil.resize(face_pil.size, Image.Resampling.LANCZOS)
+        with span("makeup_transfer.resize_style"):
+            style_resized = style_pil.resize(face_pil.size, Image.Resampling.LANCZOS)
         # Apply color transfer
         transferred_face = apply_color_transfer(style_resized, face_pil)
     except Exception as e:
@@ -372,7 +595,8 @@ def apply_makeup_transfer(face_pil, style_pil):
     if final_mask:
         try:
             # Ensure both images are RGB before compositing with mask
-            output_img = Image.composite(transferred_face.convert('RGB'), face_pil.convert('RGB'), final_mask)
+            with span("makeup_transfer.composite"):
+                output_img = Image.composite(transferred_face.convert('RGB'), face_pil.convert('RGB'), final_mask)
             return output_img, True
         except Exception as e:
             print(f"마스크 합성 중 오류: {e}")
@@ -384,50 +608,78 @@ def apply_makeup_transfer(face_pil, style_pil):
         return transferred_face, True
 
 
+def _to_lab(rgb_array):
+    """RGB uint8 배열 -> Lab float32 배열 (OpenCV 8비트 Lab 범위)"""
+    return cv2.cvtColor(cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR), cv2.COLOR_BGR2LAB).astype(np.float32)
+
+
+def _lab_mean_std(rgb_pil):
+    """Lab 채널별 평균/표준편차 ((3, 1) 배열 두 개, cv2.meanStdDev 와 같은 모양) - 큰 이미지는 타일별 합계로 계산"""
+    if not should_tile(rgb_pil):
+        return cv2.meanStdDev(_to_lab(np.array(rgb_pil)))
+
+    def tile_sums(tile):
+        # 타일 평균/표준편차를 픽셀 수로 곱해 합계와 제곱합으로 되돌림 (합치기 쉬움)
+        mean, std = cv2.meanStdDev(_to_lab(np.array(tile)))
+        count = tile.width * tile.height
+        return np.stack([mean[:, 0] * count, (std[:, 0] ** 2 + mean[:, 0] ** 2) * count])
+
+    sums = reduce_tiles(rgb_pil, tile_sums, lambda total, part: total + part, np.zeros((2, 3)))
+    count = rgb_pil.width * rgb_pil.height
+    mean = sums[0] / count
+    std = np.sqrt(np.maximum(sums[1] / count - mean * mean, 0.0))
+    return mean.reshape(3, 1), std.reshape(3, 1)
+
+
+def _color_transfer_array(target_rgb, source_mean, source_std, target_mean, target_std):
+    """RGB uint8 배열에 Lab 통계 기반 색 전송 적용 (픽셀 단위 연산 - 전체 이미지나 타일에 동일하게 사용)"""
+    target_lab = _to_lab(target_rgb)
+
+    # Apply color transfer equation
+    # Subtract target mean, scale by std dev ratio, add source mean
+    l_target, a_target, b_target = cv2.split(target_lab)
+    l_mean_s, a_mean_s, b_mean_s = source_mean.flatten()
+    l_std_s, a_std_s, b_std_s = source_std.flatten()
+    l_mean_t, a_mean_t, b_mean_t = target_mean.flatten()
+    l_std_t, a_std_t, b_std_t = target_std.flatten()
+
+    l_transfer = ((l_target - l_mean_t) * (l_std_s / l_std_t)) + l_mean_s
+    a_transfer = ((a_target - a_mean_t) * (a_std_s / a_std_t)) + a_mean_s
+    b_transfer = ((b_target - b_mean_t) * (b_std_s / b_std_t)) + b_mean_s
+
+    # Merge channels and clip values
+    transferred_lab = cv2.merge([l_transfer, a_transfer, b_transfer])
+    transferred_lab = np.clip(transferred_lab, 0, 255) # Clip values to valid range
+
+    # Convert back to BGR uint8, then RGB
+    result_bgr = cv2.cvtColor(transferred_lab.astype(np.uint8), cv2.COLOR_LAB2BGR)
+    return cv2.cvtColor(result_bgr, cv2.COLOR_BGR2RGB)
+
+
+@timed("apply_color_transfer")
 def apply_color_transfer(source_pil, target_pil):
-    """OpenCV 컬러 전송 (Lab 색상 공간) - 소스 이미지 색감을 타겟에 적용"""
+    """OpenCV 컬러 전송 (Lab 색상 공간) - 소스 이미지 색감을 타겟에 적용
+
+    아주 큰 타겟은 통계를 타일별로 모은 뒤 타일 단위로 적용 (전체 크기 float 사본을 만들지 않음).
+    """
     try:
         # Ensure images are RGB PIL objects
         source_pil = source_pil.convert('RGB')
         target_pil = target_pil.convert('RGB')
 
-        # Convert to OpenCV BGR format
-        source = cv2.cvtColor(np.array(source_pil), cv2.COLOR_RGB2BGR)
-        target = cv2.cvtColor(np.array(target_pil), cv2.COLOR_RGB2BGR)
-
-        # Convert to LAB color space
-        source_lab = cv2.cvtColor(source, cv2.COLOR_BGR2LAB).astype(np.float32)
-        target_lab = cv2.cvtColor(target, cv2.COLOR_BGR2LAB).astype(np.float32)
-
         # Calculate statistics
-        source_mean, source_std = cv2.meanStdDev(source_lab)
-        target_mean, target_std = cv2.meanStdDev(target_lab)
+        source_mean, source_std = _lab_mean_std(source_pil)
+        target_mean, target_std = _lab_mean_std(target_pil)
 
         # Avoid division by zero or very small numbers
         target_std[target_std < 1e-6] = 1e-6
         source_std[source_std < 1e-6] = 1e-6 # Also check source_std
 
-        # Apply color transfer equation
-        # Subtract target mean, scale by std dev ratio, add source mean
-        l_target, a_target, b_target = cv2.split(target_lab)
-        l_mean_s, a_mean_s, b_mean_s = source_mean.flatten()
-        l_std_s, a_std_s, b_std_s = source_std.flatten()
-        l_mean_t, a_mean_t, b_mean_t = target_mean.flatten()
-        l_std_t, a_std_t, b_std_t = target_std.flatten()
-
-        l_transfer = ((l_target - l_mean_t) * (l_std_s / l_std_t)) + l_mean_s
-        a_transfer = ((a_target - a_mean_t) * (a_std_s / a_std_t)) + a_mean_s
-        b_transfer = ((b_target - b_mean_t) * (b_std_s / b_std_t)) + b_mean_s
-
-        # Merge channels and clip values
-        transferred_lab = cv2.merge([l_transfer, a_transfer, b_transfer])
-        transferred_lab = np.clip(transferred_lab, 0, 255) # Clip values to valid range
-
-        # Convert back to BGR uint8
-        result_bgr = cv2.cvtColor(transferred_lab.astype(np.uint8), cv2.COLOR_LAB2BGR)
-
+        stats = (source_mean, source_std, target_mean, target_std)
+        if should_tile(target_pil):
+            return map_tiles(target_pil, lambda tile: Image.fromarray(_color_transfer_array(np.array(tile), *stats)))
         # Convert back to PIL RGB
-        return Image.fromarray(cv2.cvtColor(result_bgr, cv2.COLOR_BGR2RGB))
+        return Image.fromarray(_color_transfer_array(np.array(target_pil), *stats))
 
     except cv2.error as e:
         print(f"OpenCV error during color transfer: {e}")
@@ -441,71 +693,157 @@ def apply_color_transfer(source_pil, target_pil):
         # raise e
 
 
+# --- 패션 필터 단계 ---
+# ("pixel", fn): 픽셀 단위, ("neighborhood", fn): 주변 픽셀 필요 (타일 halo), ("contrast", factor): 이미지 전체 밝기 평균 필요
+SHARPEN_HALO = 2 # Sharpness(SMOOTH 3x3 커널) 타일 halo
+
+
+def _sepia(img, intensity):
+    img_array = np.array(img.convert('RGB')) # Ensure RGB
+    # Normalize intensity for sepia matrix calculation
+    normalized_intensity = max(0.0, min(1.0, intensity)) # Clamp between 0 and 1
+
+    # Sepia matrix - values closer to identity matrix at lower intensity
+    identity = np.identity(3)
+    sepia_kernel = np.array([[0.272, 0.534, 0.131],
+                             [0.349, 0.686, 0.168],
+                             [0.393, 0.769, 0.189]])
+    # Blend sepia kernel with identity based on intensity
+    transform_matrix = identity * (1 - normalized_intensity) + sepia_kernel * normalized_intensity
+
+    # Apply the transformation
+    sepia_img_array = cv2.transform(img_array, transform_matrix)
+    sepia_img_array = np.clip(sepia_img_array, 0, 255).astype(np.uint8)
+    return Image.fromarray(sepia_img_array)
+
+
+def _fashion_filter_steps(style, intensity):
+    """스타일별 적용 단계 목록 (전체 이미지/타일 처리 공용)"""
+    if style == "casual":
+        return [
+            ("pixel", lambda img: ImageEnhance.Color(img).enhance(1.0 + 0.15 * intensity)),
+            ("pixel", lambda img: ImageEnhance.Brightness(img).enhance(1.0 + 0.1 * intensity)),
+        ]
+    if style == "vintage":
+        # Apply sepia first, then other vintage effects
+        return [
+            ("pixel", lambda img: _sepia(img, intensity)),
+            ("pixel", lambda img: ImageEnhance.Color(img).enhance(1.0 - 0.2 * intensity)), # Slightly less desaturation
+            ("contrast", 1.0 + 0.15 * intensity),
+            ("pixel", lambda img: ImageEnhance.Brightness(img).enhance(1.0 - 0.05 * intensity)), # Slight darkening
+        ]
+    if style == "elegant":
+        return [
+            ("contrast", 1.0 + 0.25 * intensity),
+            ("neighborhood", lambda img: ImageEnhance.Sharpness(img).enhance(1.0 + 0.4 * intensity)),
+            ("pixel", lambda img: ImageEnhance.Brightness(img).enhance(1.0 + 0.05 * intensity)),
+            # Slightly reduce color saturation for elegance
+            ("pixel", lambda img: ImageEnhance.Color(img).enhance(1.0 - 0.1 * intensity)),
+        ]
+    if style == "monochrome":
+        # Convert to grayscale using Pillow's L mode, back to RGB for consistency downstream
+        return [
+            ("pixel", lambda img: img.convert('L').convert('RGB')),
+            ("contrast", 1.0 + 0.3 * intensity), # Adjust contrast on the monochrome image
+        ]
+    return []
+
+
+def _luma_mean(img):
+    """ImageEnhance.Contrast 가 쓰는 밝기 평균 (정수) - 타일별 L 히스토그램을 합쳐 계산"""
+    histogram = reduce_tiles(
+        img, lambda tile: tile.convert('L').histogram(), lambda total, part: [a + b for a, b in zip(total, part)], [0] * 256
+    )
+    return int(sum(i * count for i, count in enumerate(histogram)) / sum(histogram) + 0.5)
+
+
+def _contrast_with_mean(img, factor, mean):
+    """ImageEnhance.Contrast(img).enhance(factor) 와 같은 결과 - 평균을 이미지 자신이 아닌 주어진 값으로 사용 (타일용)"""
+    degenerate = Image.new('L', img.size, mean)
+    if degenerate.mode != img.mode:
+        degenerate = degenerate.convert(img.mode)
+    if 'A' in img.getbands():
+        degenerate.putalpha(img.getchannel('A'))
+    return Image.blend(degenerate, img, factor)
+
+
+def _apply_steps_tiled(img, steps):
+    """필터 단계를 타일 단위로 실행 - 대비 단계마다 앞 단계 결과 전체의 평균을 먼저 구하고 이어지는 단계를 한 번에 적용
+
+    첫 패스만 새 출력 이미지를 만들고, 이후 패스는 (halo가 필요 없으면) 그 출력 위에서 제자리 처리.
+    """
+    passes = [] # [(대비 계수 또는 None, [fn], halo)]
+    factor, fns, halo = None, [], 0
+    for kind, arg in steps:
+        if kind == "contrast":
+            if fns or factor is not None:
+                passes.append((factor, fns, halo))
+            factor, fns, halo = arg, [], 0
+        else:
+            fns.append(arg)
+            if kind == "neighborhood":
+                halo = SHARPEN_HALO
+    passes.append((factor, fns, halo))
+
+    src, out = img, None
+    for factor, fns, halo in passes:
+        mean = _luma_mean(src) if factor is not None else None
+
+        def run(tile, factor=factor, mean=mean, fns=fns):
+            if factor is not None:
+                tile = _contrast_with_mean(tile, factor, mean)
+            for fn in fns:
+                tile = fn(tile)
+            return tile
+
+        out_mode = run(src.crop((0, 0, 1, 1))).mode # 단계가 모드를 바꿀 수 있음 (세피아/흑백 → RGB)
+        in_place = out is not None and halo == 0 and out_mode == out.mode
+        out = map_tiles(src, run, dst=out if in_place else None, halo=halo, out_mode=out_mode)
+        src = out
+    return out
+
+
+@timed("apply_fashion_filter")
 def apply_fashion_filter(img_pil, style="casual", intensity=0.7):
-    """선택된 스타일과 강도에 따라 패션 필터 효과 적용 (개선된 세피아)"""
-    img = img_pil.copy()
-    if intensity == 0: return img # 강도가 0이면 원본 반환
+    """선택된 스타일과 강도에 따라 패션 필터 효과 적용 (개선된 세피아)
+
+    아주 큰 이미지는 타일 단위로 처리해 최대 메모리를 타일 크기로 제한 (결과는 전체 처리와 동일).
+    """
+    if intensity == 0: return img_pil.copy() # 강도가 0이면 원본 반환
     try:
-        if style == "casual":
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.0 + 0.15 * intensity)
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(1.0 + 0.1 * intensity)
-        elif style == "vintage":
-            # Apply sepia first
-            img_array = np.array(img.convert('RGB')) # Ensure RGB
-            # Normalize intensity for sepia matrix calculation
-            normalized_intensity = max(0.0, min(1.0, intensity)) # Clamp between 0 and 1
-
-            # Sepia matrix - values closer to identity matrix at lower intensity
-            identity = np.identity(3)
-            sepia_kernel = np.array([[0.272, 0.534, 0.131],
-                                     [0.349, 0.686, 0.168],
-                                     [0.393, 0.769, 0.189]])
-            # Blend sepia kernel with identity based on intensity
-            transform_matrix = identity * (1 - normalized_intensity) + sepia_kernel * normalized_intensity
-
-            # Apply the transformation
-            sepia_img_array = cv2.transform(img_array, transform_matrix)
-            sepia_img_array = np.clip(sepia_img_array, 0, 255).astype(np.uint8)
-            img = Image.fromarray(sepia_img_array)
-
-            # Apply other vintage effects after sepia
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.0 - 0.2 * intensity) # Slightly less desaturation
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.0 + 0.15 * intensity)
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(1.0 - 0.05 * intensity) # Slight darkening
-
-        elif style == "elegant":
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.0 + 0.25 * intensity)
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(1.0 + 0.4 * intensity)
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(1.0 + 0.05 * intensity)
-            # Slightly reduce color saturation for elegance
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.0 - 0.1 * intensity)
-        elif style == "monochrome":
-            # Convert to grayscale using Pillow's L mode
-            img = img.convert('L')
-            # Convert back to RGB for consistency if needed downstream,
-            # or keep as L if the rest of the pipeline handles it.
-            img = img.convert('RGB')
-            # Adjust contrast on the monochrome image
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.0 + 0.3 * intensity)
+        steps = _fashion_filter_steps(style, intensity)
+        if should_tile(img_pil):
+            return _apply_steps_tiled(img_pil, steps)
+        img = img_pil.copy()
+        for kind, arg in steps:
+            img = ImageEnhance.Contrast(img).enhance(arg) if kind == "contrast" else arg(img)
         return img
     except Exception as e:
         print(f"Error applying fashion filter '{style}': {e}")
         return img_pil # Return original on error
 
 
+@timed("change_clothing_color")
 def change_clothing_color(clothing_img_pil, target_color_hex):
-    """의상 이미지의 색상을 변경 (HSV 기반 - 투명도 유지)"""
+    """의상 이미지의 색상을 변경 (HSV 기반 - 투명도 유지), 아주 큰 이미지는 타일 단위로 처리"""
     if clothing_img_pil is None: return None
+    prepared = is_premultiplied(clothing_img_pil)
+    if prepared:
+        offset = clothing_img_pil.info.get(GARMENT_OFFSET_KEY, (0, 0))
+        clothing_img_pil = unpremultiply(clothing_img_pil) # HSV 편집은 일반 알파 색상 기준
+    if should_tile(clothing_img_pil):
+        result = map_tiles(clothing_img_pil, lambda tile: _change_clothing_color(tile, target_color_hex), out_mode="RGBA")
+    else:
+        result = _change_clothing_color(clothing_img_pil, target_color_hex)
+    if prepared and result is not None:
+        # 전처리된 의상은 결과도 같은 형태로 (피팅 시 변환 없음, 크롭 오프셋 유지)
+        result = result.convert("RGBa")
+        result.info[GARMENT_OFFSET_KEY] = offset
+    return result
+
+
+def _change_clothing_color(clothing_img_pil, target_color_hex):
+    """change_clothing_color 본체 (픽셀 단위 연산이라 전체 이미지/타일에 동일하게 적용)"""
     try:
         target_color_rgb = hex_to_rgb(target_color_hex)
         # Convert target RGB to HSV for Hue comparison
@@ -594,20 +932,99 @@ def change_clothing_color(clothing_img_pil, target_color_hex):
         return clothing_img_pil # Return original on other errors
 
 
+# --- 👕 의상 전처리 (에셋 로드 시 한 번 - 알파 매트 + 타이트 크롭 + premultiplied RGBa) ---
+GARMENT_OFFSET_KEY = "garment_offset" # 전처리된 의상 info: 크롭 전 원본 좌상단 기준 (x, y) - 피팅 위치를 원본 기준으로 유지
+PREMULTIPLIED_KEY = "premultiplied"   # RGBA 모드지만 픽셀은 premultiplied 인 의상 info (에셋 팩의 복사 없는 메모리 맵 - RGBa 는 맵 불가)
+MATTE_BG_TOLERANCE = 40       # 테두리 배경색과의 RGB 거리 이하이면 배경 후보
+MATTE_BORDER_MAX_STD = 30     # 테두리 색 표준편차가 이보다 크면 단색 배경이 아니라고 보고 매트 생략 (불투명 유지)
+MATTE_FEATHER_SIGMA = 1.0     # 매트 경계 부드럽게 (가우시안 sigma, px)
+MATTE_MIN_TRANSPARENT = 0.01  # 이미 투명한 픽셀이 이 비율 이상이면 원본 알파를 그대로 사용
+
+
+def is_premultiplied(img_pil):
+    """전처리된(premultiplied) 의상인지 - RGBa 이거나 PREMULTIPLIED_KEY 표시가 있는 RGBA"""
+    return img_pil.mode == "RGBa" or (img_pil.mode == "RGBA" and bool(img_pil.info.get(PREMULTIPLIED_KEY)))
+
+
+def unpremultiply(img_pil):
+    """premultiplied 의상을 일반 RGBA 로 (색상 편집/표시용 - PREMULTIPLIED_KEY 표시 RGBA 는 픽셀을 RGBa 로 다시 읽어 변환)"""
+    if img_pil.mode == "RGBA" and img_pil.info.get(PREMULTIPLIED_KEY):
+        img_pil = Image.frombytes("RGBa", img_pil.size, img_pil.tobytes())
+    return img_pil.convert("RGBA")
+
+
+def _resize_premultiplied(garment, size):
+    """premultiplied 의상 리사이즈 - RGBA 모드는 PIL 이 알파를 다시 곱하므로 밴드별로 리사이즈 (RGBa 리사이즈와 같은 값)"""
+    if garment.mode == "RGBa":
+        return garment.resize(size, Image.Resampling.LANCZOS)
+    return Image.merge("RGBA", [band.resize(size, Image.Resampling.LANCZOS) for band in garment.split()])
+
+
+def compute_garment_matte(clothing_rgba):
+    """의상 알파 매트 (L) - 원본 알파가 있으면 그대로, 없으면 테두리와 이어진 단색 배경을 flood fill 로 제거"""
+    arr = np.asarray(clothing_rgba)
+    alpha = arr[:, :, 3]
+    if np.count_nonzero(alpha < 250) >= MATTE_MIN_TRANSPARENT * alpha.size:
+        return alpha.copy()
+
+    rgb = arr[:, :, :3]
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]]).astype(np.float32)
+    if border.std(axis=0).max() > MATTE_BORDER_MAX_STD:
+        print("Warning: Garment background is not uniform. Keeping opaque mask.")
+        return alpha.copy()
+    background_color = np.median(border, axis=0)
+    distance = np.sqrt(((rgb.astype(np.float32) - background_color) ** 2).sum(axis=2))
+    candidate = (distance <= MATTE_BG_TOLERANCE).astype(np.uint8)
+
+    # 배경 후보 중 테두리에 닿는 연결 영역만 배경 (의상 안쪽의 비슷한 색은 유지)
+    _, labels = cv2.connectedComponents(candidate, connectivity=4)
+    border_labels = np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+    background = np.isin(labels, border_labels[border_labels != 0])
+    matte = np.where(background, 0, 255).astype(np.uint8)
+    if MATTE_FEATHER_SIGMA > 0:
+        matte = cv2.GaussianBlur(matte, (0, 0), MATTE_FEATHER_SIGMA)
+    return np.minimum(matte, alpha)
+
+
+def prepare_garment(clothing_img_pil):
+    """가상 피팅용 의상 전처리 - 알파 매트, 불투명 영역 bounding box 로 크롭, premultiplied RGBa 로 변환
+
+    반환 이미지의 info[GARMENT_OFFSET_KEY] 에 크롭 오프셋을 기록하므로 virtual_try_on 의 위치는 원본 의상 기준 그대로.
+    이미 전처리된 의상(RGBa, 에셋 팩의 premultiplied RGBA)은 그대로 반환.
+    """
+    if clothing_img_pil is None or is_premultiplied(clothing_img_pil):
+        return clothing_img_pil
+    with span("tryon.prepare_garment"):
+        clothing_rgba = clothing_img_pil.convert("RGBA")
+        if clothing_rgba is clothing_img_pil:
+            clothing_rgba = clothing_rgba.copy() # putalpha 가 원본을 바꾸지 않도록
+        matte = Image.fromarray(compute_garment_matte(clothing_rgba))
+        clothing_rgba.putalpha(matte)
+        bbox = matte.getbbox() or (0, 0, clothing_rgba.width, clothing_rgba.height)
+        prepared = clothing_rgba.crop(bbox).convert("RGBa")
+    prepared.info[GARMENT_OFFSET_KEY] = (bbox[0], bbox[1])
+    return prepared
+
+
+@timed("virtual_try_on")
 def virtual_try_on(person_img_pil, clothing_img_pil, position=(0, 0), scale=1.0):
-    """가상 의상 입히기 (위치/크기 조절, 알파 블렌딩 개선)"""
+    """가상 의상 입히기 (위치/크기 조절, premultiplied 알파 합성)
+
+    prepare_garment() 로 전처리된 의상(RGBa 또는 에셋 팩의 PREMULTIPLIED_KEY 표시 RGBA)은 변환/알파 분리 없이 바로 합성하고,
+    겹치는 영역만 계산. 전처리되지 않은 의상은 여기서 RGBa 로 변환 (알파가 없으면 불투명 사각형으로 붙음).
+    """
     if person_img_pil is None or clothing_img_pil is None:
         print("Error: Input image(s) missing for virtual try-on.")
         return person_img_pil.convert('RGB') if person_img_pil else None
 
     try:
-        # Ensure person image is RGBA for compositing
-        person_rgba = person_img_pil.convert("RGBA")
-        p_width, p_height = person_rgba.size
-
-        # Ensure clothing image is RGBA
-        clothing_rgba = clothing_img_pil.convert("RGBA")
-        c_width, c_height = clothing_rgba.size
+        p_width, p_height = person_img_pil.size
+        if is_premultiplied(clothing_img_pil):
+            garment = clothing_img_pil # 메모리 맵 에셋도 복사하지 않음 (합성은 밴드 값을 그대로 사용)
+        else:
+            garment = clothing_img_pil.convert("RGBA").convert("RGBa")
+        offset_x, offset_y = clothing_img_pil.info.get(GARMENT_OFFSET_KEY, (0, 0))
+        c_width, c_height = garment.size
 
         # --- Scale Clothing ---
         new_c_width = int(c_width * scale)
@@ -618,44 +1035,38 @@ def virtual_try_on(person_img_pil, clothing_img_pil, position=(0, 0), scale=1.0)
             print(f"Warning: Invalid clothing scale resulted in zero/negative size ({new_c_width}x{new_c_height}). Skipping try-on.")
             return person_img_pil.convert('RGB') # Return original person image
 
-        # Use LANCZOS for high-quality resizing
-        clothing_resized = clothing_rgba.resize((new_c_width, new_c_height), Image.Resampling.LANCZOS)
-
         # --- Position Clothing ---
-        # position[0] = X (left offset), position[1] = Y (top offset)
-        paste_x = int(position[0])
-        paste_y = int(position[1])
-
-        # --- Create Background ---
-        # Start with the original person image
-        result_img = person_rgba.copy()
-
-        # --- Prepare Mask ---
-        # Get the alpha channel of the resized clothing item
-        try:
-            # clothing_resized.split() might return (R, G, B) if no alpha exists
-            if clothing_resized.mode == 'RGBA':
-                mask = clothing_resized.split()[3]
-            else:
-                # If clothing has no alpha, create a fully opaque mask
-                print("Warning: Clothing image does not have an alpha channel. Using opaque mask.")
-                mask = Image.new('L', clothing_resized.size, 255)
-        except IndexError:
-            print("Warning: Could not get alpha channel from clothing. Using opaque mask.")
-            mask = Image.new('L', clothing_resized.size, 255)
-        except Exception as e:
-            print(f"Error getting clothing mask: {e}. Using opaque mask.")
-            mask = Image.new('L', clothing_resized.size, 255)
-
+        # position[0] = X (left offset), position[1] = Y (top offset) - 크롭 전 원본 의상의 좌상단 기준
+        paste_x = int(position[0]) + int(round(offset_x * scale))
+        paste_y = int(position[1]) + int(round(offset_y * scale))
+
+        # 인물 이미지와 겹치는 영역 (밖으로 나간 부분은 계산하지 않음)
+        left, top = max(paste_x, 0), max(paste_y, 0)
+        right, bottom = min(paste_x + new_c_width, p_width), min(paste_y + new_c_height, p_height)
+        result_img = person_img_pil.convert('RGB')
+        if result_img is person_img_pil:
+            result_img = result_img.copy()
+        if right <= left or bottom <= top:
+            return result_img
+
+        # Use LANCZOS for high-quality resizing (premultiplied 상태로 리사이즈하므로 경계에 어두운 테두리가 생기지 않음)
+        with span("tryon.resize_garment"):
+            garment_resized = garment if garment.size == (new_c_width, new_c_height) else \
+                _resize_premultiplied(garment, (new_c_width, new_c_height))
 
         # --- Composite Images ---
-        # Paste the clothing onto the person image using the alpha mask
-        # The paste coordinates define the top-left corner of the clothing item
-        # PIL's paste handles pixels outside the bounds gracefully (they are ignored)
-        result_img.paste(clothing_resized, (paste_x, paste_y), mask)
-
-        # Convert final result back to RGB
-        return result_img.convert('RGB')
+        # premultiplied: 결과 = 의상 RGB + 배경 × (1 - 알파) - 겹치는 영역에서만 계산
+        with span("tryon.composite"):
+            box = (left, top, right, bottom)
+            visible = garment_resized
+            if (left, top, right, bottom) != (paste_x, paste_y, paste_x + new_c_width, paste_y + new_c_height):
+                visible = garment_resized.crop((left - paste_x, top - paste_y, right - paste_x, bottom - paste_y))
+            region = result_img.crop(box)
+            region.paste((0, 0, 0), (0, 0), visible) # 배경 × (1 - 알파) - 의상을 그대로 마스크로 사용 (알파 분리 없음)
+            premultiplied_rgb = Image.merge("RGB", visible.split()[:3]) # 밴드 값 그대로 (convert("RGB")는 알파로 다시 나눔)
+            result_img.paste(ImageChops.add(region, premultiplied_rgb), box)
+
+        return result_img
 
     except Exception as e:
         print(f"Error during virtual try-on: {e}")
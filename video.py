@@ -0,0 +1,282 @@
+# --- START OF FILE video.py ---
+"""
+동영상 메이크업 - FaceMesh 추적 모드 + 랜드마크 시간 스무딩 + 스트리밍 디코드 → 처리 → 인코드
+
+사용 예:
+    python video.py input.mp4 output.mp4
+    python video.py input.mp4 output.mp4 --makeup-options '{"apply_blush": true}' --smoothing 0.5 --max-frames 300
+
+프레임은 크기가 제한된 큐로만 전달되므로 동영상 길이와 관계없이 메모리 사용량이 일정함.
+프레임 처리(FaceMesh + 메이크업)는 프레임마다 compute_slot() 안에서 실행 - 긴 동영상도 코어 예산을 넘지 않고,
+다른 세션의 렌더는 프레임 사이에 도착 순서대로 끼어들 수 있음.
+(오디오 트랙은 OpenCV VideoWriter 특성상 보존되지 않음)
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+from compute_budget import compute_slot, configure_cv2
+from lazy_imports import lazy_module
+from metrics import span
+from utils import apply_makeup, MAX_NUM_FACES
+
+cv2 = lazy_module("cv2", on_load=configure_cv2)
+mp = lazy_module("mediapipe")
+
+DEFAULT_SMOOTHING = 0.6    # 랜드마크 EMA 계수 (0: 스무딩 없음, 1에 가까울수록 이전 프레임 비중이 큼)
+MATCH_DISTANCE = 0.15      # 이전 프레임 얼굴과 같은 얼굴로 볼 중심점 거리 (정규화 좌표)
+QUEUE_SIZE = 8             # 디코드/인코드 대기 프레임 수 상한 (메모리 상한)
+PROGRESS_EVERY = 10        # 진행 상황 콜백 간격 (프레임)
+
+# 앱의 기본 메이크업 옵션과 동일
+DEFAULT_MAKEUP_OPTIONS = {
+    'intensity': 0.6, 'apply_lips': True, 'lip_color': '#E64E6B', 'lip_intensity': 0.7,
+    'apply_eyeshadow': True, 'eyeshadow_color': '#8A5A94', 'eyeshadow_intensity': 0.5,
+    'apply_blush': False, 'blush_color': '#F08080', 'blush_intensity': 0.4,
+}
+
+# apply_makeup 이 받는 랜드마크 결과와 같은 모양 (multi_face_landmarks[i].landmark[j].x/.y)
+_Point = namedtuple("_Point", "x y")
+_FaceLandmarks = namedtuple("_FaceLandmarks", "landmark")
+TrackedFaces = namedtuple("TrackedFaces", "multi_face_landmarks")
+
+
+class FaceTracker:
+    """FaceMesh 추적 모드 (static_image_mode=False) + 얼굴별 랜드마크 EMA 스무딩
+
+    추적 모드에서는 앞 프레임의 얼굴 위치로 다음 프레임을 찾으므로 매 프레임 전체 감지를 하지 않음.
+    동영상마다 새로 만들어야 함 (추적 상태를 가짐).
+    """
+
+    def __init__(self, smoothing=DEFAULT_SMOOTHING, max_num_faces=MAX_NUM_FACES):
+        self.smoothing = min(max(float(smoothing), 0.0), 0.95)
+        self._face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=False, max_num_faces=max_num_faces, refine_landmarks=True,
+            min_detection_confidence=0.5, min_tracking_confidence=0.5
+        )
+        self._previous = [] # 이전 프레임의 스무딩된 (N, 2) 좌표 배열
+
+    def _smooth(self, coords_list):
+        smoothed = []
+        unmatched = list(range(len(self._previous)))
+        for coords in coords_list:
+            center = coords.mean(axis=0)
+            best, best_distance = None, MATCH_DISTANCE
+            for i in unmatched:
+                distance = float(np.linalg.norm(self._previous[i].mean(axis=0) - center))
+                if distance < best_distance:
+                    best, best_distance = i, distance
+            if best is not None and self._previous[best].shape == coords.shape:
+                unmatched.remove(best)
+                coords = self.smoothing * self._previous[best] + (1.0 - self.smoothing) * coords
+            smoothed.append(coords)
+        self._previous = smoothed
+        return smoothed
+
+    def process(self, frame_rgb):
+        """RGB 프레임(numpy)의 스무딩된 랜드마크 (TrackedFaces, 얼굴이 없으면 빈 리스트)"""
+        with span("video.facemesh"):
+            results = self._face_mesh.process(frame_rgb)
+        if not results.multi_face_landmarks:
+            self._previous = []
+            return TrackedFaces([])
+        coords_list = [
+            np.array([(lm.x, lm.y) for lm in face.landmark], dtype=np.float32)
+            for face in results.multi_face_landmarks
+        ]
+        faces = [_FaceLandmarks([_Point(float(x), float(y)) for x, y in coords]) for coords in self._smooth(coords_list)]
+        return TrackedFaces(faces)
+
+    def close(self):
+        self._face_mesh.close()
+
+
+def render_frame(frame_bgr, tracker, makeup_options):
+    """BGR 프레임 한 장에 메이크업 적용 (결과 BGR 프레임, 얼굴 감지 여부)"""
+    frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+    faces = tracker.process(frame_rgb)
+    if not faces.multi_face_landmarks:
+        return frame_bgr, False # 얼굴이 없는 프레임은 그대로 기록
+    result, success = apply_makeup(Image.fromarray(frame_rgb), makeup_options, landmarks_results=faces)
+    if not success:
+        return frame_bgr, False
+    return cv2.cvtColor(np.asarray(result), cv2.COLOR_RGB2BGR), True
+
+
+def _open_writer(output_path, fps, size):
+    """출력 확장자에 맞는 코덱으로 VideoWriter 생성 (브라우저 재생 가능한 H.264 우선)"""
+    codecs = ("MJPG",) if output_path.lower().endswith(".avi") else ("avc1", "mp4v")
+    for codec in codecs:
+        writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if writer.isOpened():
+            return writer, codec
+        writer.release()
+    raise ValueError(f"동영상 인코더를 열 수 없습니다: {output_path}")
+
+
+def probe_video(input_path):
+    """디코딩 없이 동영상 크기/프레임 수 확인 (입장 제어 비용 추정용) - {width, height, frames(모르면 None), fps}"""
+    capture = cv2.VideoCapture(input_path)
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"동영상을 열 수 없습니다: {input_path}")
+        return {
+            "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "frames": int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or None,
+            "fps": capture.get(cv2.CAP_PROP_FPS) or 30.0,
+        }
+    finally:
+        capture.release()
+
+
+def process_video(input_path, output_path, makeup_options=None, smoothing=DEFAULT_SMOOTHING,
+                  max_frames=None, queue_size=QUEUE_SIZE, progress_callback=None):
+    """동영상 파일의 모든 프레임에 메이크업을 적용해 저장
+
+    디코드(읽기 스레드) → 처리(호출 스레드) → 인코드(쓰기 스레드)를 크기 제한 큐로 연결해 겹쳐 실행.
+
+    Args:
+        input_path (str): 입력 동영상 경로
+        output_path (str): 출력 경로 (.mp4 또는 .avi)
+        makeup_options (dict): apply_makeup 옵션 (None이면 기본값)
+        smoothing (float): 랜드마크 EMA 계수
+        max_frames (int): 처리할 최대 프레임 수 (None이면 끝까지)
+        queue_size (int): 읽기/쓰기 큐 크기
+        progress_callback (callable): progress_callback(stats) - PROGRESS_EVERY 프레임마다 호출
+
+    Returns:
+        dict: frames, frames_with_faces, total_frames, seconds, fps, source_fps, realtime_factor, width, height, codec
+    """
+    makeup_options = {**DEFAULT_MAKEUP_OPTIONS, **(makeup_options or {})}
+    capture = cv2.VideoCapture(input_path)
+    if not capture.isOpened():
+        raise ValueError(f"동영상을 열 수 없습니다: {input_path}")
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    if max_frames:
+        total_frames = min(total_frames, max_frames) if total_frames else max_frames
+    try:
+        writer, codec = _open_writer(output_path, source_fps, (width, height))
+    except Exception:
+        capture.release()
+        raise
+
+    read_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def read_frames():
+        try:
+            count = 0
+            while not stop.is_set() and (not max_frames or count < max_frames):
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                read_queue.put(frame)
+                count += 1
+        except Exception as e:
+            errors.append(e)
+        finally:
+            read_queue.put(None)
+
+    def write_frames():
+        failed = False
+        while True:
+            frame = write_queue.get()
+            if frame is None:
+                break
+            if failed:
+                continue # 오류 후에도 큐를 비워 처리 스레드가 막히지 않도록
+            try:
+                writer.write(frame)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                failed = True
+
+    reader = threading.Thread(target=read_frames, name="video-reader", daemon=True)
+    writer_thread = threading.Thread(target=write_frames, name="video-writer", daemon=True)
+    tracker = FaceTracker(smoothing=smoothing)
+    stats = {"frames": 0, "frames_with_faces": 0, "total_frames": total_frames, "seconds": 0.0, "fps": 0.0,
+             "source_fps": source_fps, "realtime_factor": 0.0, "width": width, "height": height, "codec": codec}
+    started = time.perf_counter()
+    reader.start()
+    writer_thread.start()
+    try:
+        while not stop.is_set():
+            frame = read_queue.get()
+            if frame is None:
+                break
+            with compute_slot(), span("video.frame"):
+                result, has_face = render_frame(frame, tracker, makeup_options)
+            write_queue.put(result)
+            stats["frames"] += 1
+            stats["frames_with_faces"] += int(has_face)
+            if progress_callback and stats["frames"] % PROGRESS_EVERY == 0:
+                _update_rates(stats, started)
+                progress_callback(dict(stats))
+    finally:
+        stop.set()
+        while reader.is_alive(): # 읽기 스레드가 가득 찬 큐에서 막히지 않도록 비움
+            try:
+                read_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        write_queue.put(None)
+        writer_thread.join()
+        reader.join()
+        tracker.close()
+        capture.release()
+        writer.release()
+
+    if errors:
+        raise errors[0]
+    _update_rates(stats, started)
+    if progress_callback:
+        progress_callback(dict(stats))
+    return stats
+
+
+def _update_rates(stats, started):
+    stats["seconds"] = time.perf_counter() - started
+    stats["fps"] = stats["frames"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    stats["realtime_factor"] = stats["fps"] / stats["source_fps"] if stats["source_fps"] else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="동영상 메이크업 (FaceMesh 추적 + 스트리밍 처리)")
+    parser.add_argument("input", help="입력 동영상 파일")
+    parser.add_argument("output", help="출력 동영상 파일 (.mp4 / .avi)")
+    parser.add_argument("--makeup-options", help="메이크업 옵션 JSON 문자열 (기본 옵션에 덮어씀)")
+    parser.add_argument("--smoothing", type=float, default=DEFAULT_SMOOTHING, help="랜드마크 EMA 계수 (0~0.95)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        total = f"/{stats['total_frames']}" if stats["total_frames"] else ""
+        print(f"[{stats['frames']}{total}] {stats['fps']:.1f} fps ({stats['realtime_factor']:.2f}x real time) "
+              f"| faces in {stats['frames_with_faces']} frames", flush=True)
+
+    stats = process_video(args.input, args.output, json.loads(args.makeup_options) if args.makeup_options else None,
+                          args.smoothing, args.max_frames, progress_callback=report)
+    print(f"Done: {stats['frames']} frames in {stats['seconds']:.1f}s ({stats['fps']:.1f} fps, "
+          f"{stats['realtime_factor']:.2f}x real time, codec {stats['codec']}) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE video.py ---
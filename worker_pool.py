@@ -0,0 +1,245 @@
+# --- START OF FILE worker_pool.py ---
+
+import os
+import threading
+import multiprocessing as mp
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+# --- ⚙️ 워커 풀 설정 ---
+DEFAULT_JOB_TIMEOUT = 120 # 작업 하나의 최대 대기 시간 (초)
+
+# --- 워커 프로세스 상태 (프로세스마다 한 번 초기화) ---
+_worker = {}
+
+
+def _init_worker():
+    """워커 초기화 - OpenCV/MediaPipe 임포트와 FaceMesh 생성을 미리 수행, 단계 실행용 파이프라인 준비"""
+    import utils
+    from pipeline import RenderPipeline
+    utils.warm_up()
+    _worker["pipeline"] = RenderPipeline() # 워커 안의 보조 캐시 (색상 변경된 의상 등)
+
+
+def _noop():
+    """워커 프로세스를 미리 띄우기 위한 빈 작업 (초기화는 _init_worker 에서)"""
+    return None
+
+
+class WorkerTimeout(TimeoutError):
+    """작업이 job_timeout 안에 끝나지 않음 - 워커에서 아직 실행 중이므로 호출자가 같은 작업을 다시 실행하면 안 됨"""
+
+
+# --- 🧠 공유 메모리 이미지 전달 ---
+# 큰 픽셀 배열은 pickle 대신 공유 메모리 블록 이름과 (모드, 크기)만 넘김
+SHARED_MODES = ("RGB", "RGBA", "RGBa", "L")           # RGBa: 전처리된 의상 (premultiplied)
+SHARED_INFO_KEYS = ("garment_offset", "premultiplied") # 함께 전달할 image.info 항목 (utils.GARMENT_OFFSET_KEY, PREMULTIPLIED_KEY)
+
+
+class SharedImageRef:
+    """공유 메모리에 올린 이미지의 참조 (pickle 되는 것은 이름과 메타데이터뿐)"""
+    __slots__ = ("name", "mode", "size", "info")
+
+    def __init__(self, name, mode, size, info=None):
+        self.name = name
+        self.mode = mode
+        self.size = size
+        self.info = info or {}
+
+    def __getstate__(self):
+        return (self.name, self.mode, self.size, self.info)
+
+    def __setstate__(self, state):
+        self.name, self.mode, self.size, self.info = state
+
+    @property
+    def nbytes(self):
+        return self.size[0] * self.size[1] * len(self.mode)
+
+
+def _image_to_shared(img_pil, blocks):
+    """이미지를 새 공유 메모리 블록에 복사하고 참조 반환 (블록은 blocks에 모아 호출자가 해제)"""
+    info = {k: img_pil.info[k] for k in SHARED_INFO_KEYS if k in img_pil.info}
+    if img_pil.mode not in SHARED_MODES:
+        img_pil = img_pil.convert("RGBA" if "A" in img_pil.getbands() else "RGB")
+    ref = SharedImageRef(None, img_pil.mode, img_pil.size, info)
+    block = shared_memory.SharedMemory(create=True, size=max(1, ref.nbytes))
+    blocks.append(block)
+    ref.name = block.name
+    view = np.ndarray(_array_shape(ref), dtype=np.uint8, buffer=block.buf)
+    view[...] = np.asarray(img_pil)
+    del view
+    return ref
+
+
+def _array_shape(ref):
+    width, height = ref.size
+    return (height, width) if ref.mode == "L" else (height, width, len(ref.mode))
+
+
+def _copy_from_block(block, ref):
+    """공유 메모리 블록의 픽셀을 새 PIL 이미지로 한 번 복사 (블록을 닫기 전에 뷰를 해제)"""
+    data = block.buf[:ref.nbytes]
+    try:
+        img = Image.frombytes(ref.mode, ref.size, data)
+    finally:
+        data.release()
+    img.info.update(ref.info)
+    return img
+
+
+def _read_shared(ref):
+    """공유 메모리 참조에서 PIL 이미지를 복사해 옴 (블록은 닫지만 해제(unlink)는 하지 않음)"""
+    block = shared_memory.SharedMemory(name=ref.name)
+    try:
+        return _copy_from_block(block, ref)
+    finally:
+        block.close()
+
+
+def _write_shared(ref, img_pil):
+    """결과 이미지를 호출자가 미리 만들어 둔 공유 메모리 블록에 기록"""
+    if img_pil.size != ref.size:
+        raise ValueError(f"Unexpected result size {img_pil.size}, expected {ref.size}")
+    if img_pil.mode != ref.mode:
+        img_pil = img_pil.convert(ref.mode)
+    block = shared_memory.SharedMemory(name=ref.name)
+    try:
+        view = np.ndarray(_array_shape(ref), dtype=np.uint8, buffer=block.buf)
+        view[...] = np.asarray(img_pil)
+        del view
+    finally:
+        block.close()
+
+
+def _share_params(value, blocks):
+    """파라미터 안의 PIL 이미지(스타일 이미지, 의상 등)를 공유 메모리 참조로 교체"""
+    if isinstance(value, Image.Image):
+        return _image_to_shared(value, blocks)
+    if isinstance(value, dict):
+        return {k: _share_params(v, blocks) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_share_params(v, blocks) for v in value)
+    return value
+
+
+def _unshare_params(value):
+    if isinstance(value, SharedImageRef):
+        return _read_shared(value)
+    if isinstance(value, dict):
+        return {k: _unshare_params(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unshare_params(v) for v in value)
+    return value
+
+
+def _run_stage_job(stage, input_ref, output_ref, params, digest=None):
+    """워커에서 실행 - 공유 메모리의 입력에 단계를 적용하고 결과를 출력 블록에 기록 (성공 여부만 반환)"""
+    from pipeline import STAGE_FUNCTIONS
+    img = _read_shared(input_ref)
+    if digest is not None:
+        _worker["pipeline"].remember_digest(img, digest) # 랜드마크 캐시/사이드카 조회에 부모의 해시 재사용
+    result, success = STAGE_FUNCTIONS[stage](img, _unshare_params(params), _worker["pipeline"])
+    _write_shared(output_ref, result.convert("RGB") if result.mode != "RGB" else result)
+    return success
+
+
+class WorkerPool:
+    """무거운 단계(필터/메이크업/스타일 전송/가상 피팅)를 실행하는 프로세스 풀 (프로세스 전체 공유)
+
+    - 워커마다 FaceMesh를 미리 만들어 두므로 첫 작업부터 감지 그래프 생성 비용이 없음
+    - 입력/출력/참조 이미지의 픽셀은 공유 메모리로 전달하고 pickle 되는 것은 이름과 파라미터뿐
+    - 결과는 항상 입력과 같은 크기의 RGB (파이프라인 단계의 공통 규칙)
+    """
+
+    def __init__(self, processes=None, job_timeout=DEFAULT_JOB_TIMEOUT):
+        self.processes = processes or max(1, (os.cpu_count() or 2) - 1)
+        self.job_timeout = job_timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "restarts": 0, "in_flight": 0}
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: 부모(Streamlit) 프로세스 상태를 물려받지 않고 워커마다 새로 초기화
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=mp.get_context("spawn"), initializer=_init_worker
+                )
+            return self._executor
+
+    def start(self):
+        """워커 프로세스를 모두 미리 띄움 (기다리지 않음) - 첫 작업이 spawn/FaceMesh 초기화 비용을 치르지 않도록
+
+        ProcessPoolExecutor 는 제출된 작업 수만큼만 프로세스를 띄우므로 프로세스마다 빈 작업을 하나씩 제출.
+        """
+        executor = self._get_executor()
+        for _ in range(self.processes):
+            executor.submit(_noop)
+
+    def _reset_executor(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self.stats["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def run_stage(self, stage, img_pil, params, digest=None):
+        """워커에서 단계 하나 실행 (결과 이미지, 성공 여부). 워커가 죽으면 풀을 다시 만들고 예외를 올림
+
+        digest는 img_pil의 image_digest (알고 있으면 워커가 픽셀을 다시 해시하지 않음, RGB 이미지일 때만 전달)
+
+        Raises:
+            WorkerTimeout: job_timeout 안에 끝나지 않은 경우 (현재 스레드에서 다시 실행하지 말 것)
+        """
+        blocks = []
+        executor = self._get_executor()
+        with self._lock:
+            self.stats["submitted"] += 1
+            self.stats["in_flight"] += 1
+        try:
+            input_ref = _image_to_shared(img_pil.convert("RGB") if img_pil.mode != "RGB" else img_pil, blocks)
+            output_block = shared_memory.SharedMemory(create=True, size=max(1, input_ref.nbytes))
+            blocks.append(output_block)
+            output_ref = SharedImageRef(output_block.name, "RGB", input_ref.size)
+            shared_params = _share_params(params, blocks)
+            digest = digest if img_pil.mode == "RGB" else None # RGB로 변환해 보냈다면 해시가 달라짐
+            try:
+                success = executor.submit(_run_stage_job, stage, input_ref, output_ref, shared_params, digest).result(timeout=self.job_timeout)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                raise
+            except futures.TimeoutError:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise WorkerTimeout(f"Stage '{stage}' did not finish within {self.job_timeout}s") from None
+            result = _copy_from_block(output_block, output_ref)
+            with self._lock:
+                self.stats["completed"] += 1
+            return result, success
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+            for block in blocks:
+                block.close()
+                try:
+                    block.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+# --- END OF FILE worker_pool.py ---